@@ -0,0 +1,350 @@
+// Microbenchmarks for the order book's hot paths at a range of book depths.
+//
+// Every benchmark reports the best ns/op over several rounds; each round
+// times up to MAX_OPS operations and then puts the book back as it was, so
+// the depth stays fixed. Results are written as CSV (benchmark,depth,ns_per_op).
+// Given a baseline in the same format, the run fails when any benchmark's
+// throughput has dropped by more than the threshold.
+#include "core/Market.h"
+#include "core/OrderBook.h"
+#include <algorithm>
+#include <chrono>
+#include <cstdlib>
+#include <fstream>
+#include <functional>
+#include <iomanip>
+#include <iostream>
+#include <iterator>
+#include <map>
+#include <random>
+#include <sstream>
+#include <stdexcept>
+#include <string>
+#include <utility>
+#include <vector>
+
+using namespace trading;
+
+namespace {
+
+using Clock = std::chrono::steady_clock;
+
+// Most operations timed per round, so the largest books are not rebuilt
+constexpr size_t MAX_OPS = 100000;
+// Rounds continue until at least this many operations were timed in total
+constexpr size_t MIN_TOTAL_OPS = 200000;
+constexpr size_t MIN_ROUNDS = 3;
+constexpr size_t ORDERS_PER_LEVEL = 10;
+constexpr int64_t MID_PRICE = 1000000000;
+const Symbol SYMBOL = "BENCH";
+
+struct Options {
+    std::vector<size_t> depths = {1000, 10000, 100000, 1000000};
+    size_t symbols = 100;
+    std::string output;
+    std::string baseline;
+    double threshold = 0.25;
+};
+
+struct Result {
+    std::string name;
+    size_t depth;
+    double ns_per_op;
+};
+
+// Resting orders that never cross: bids below the mid and asks above it,
+// alternating sides, ORDERS_PER_LEVEL orders per price
+std::vector<Order> restingOrders(const Symbol& symbol, size_t depth, const std::string& prefix) {
+    std::vector<Order> orders;
+    orders.reserve(depth);
+    for (size_t i = 0; i < depth; ++i) {
+        const Side side = i % 2 == 0 ? Side::BUY : Side::SELL;
+        const int64_t offset = 1 + static_cast<int64_t>(i / 2 / ORDERS_PER_LEVEL);
+        const Price price{side == Side::BUY ? MID_PRICE - offset : MID_PRICE + offset};
+        orders.emplace_back(symbol, side, 1, price, prefix + std::to_string(i));
+    }
+    return orders;
+}
+
+// Runs `round` `rounds` times; each call returns the time its `ops`
+// operations took. Returns the best ns/op.
+double best(size_t ops, size_t rounds, const std::function<Clock::duration()>& round) {
+    double best_ns = 0;
+    for (size_t i = 0; i < rounds; ++i) {
+        const auto elapsed = std::chrono::duration<double, std::nano>(round()).count() / ops;
+        if (i == 0 || elapsed < best_ns) {
+            best_ns = elapsed;
+        }
+    }
+    return best_ns;
+}
+
+size_t roundsFor(size_t ops) {
+    return std::max(MIN_ROUNDS, (MIN_TOTAL_OPS + ops - 1) / ops);
+}
+
+// Indices of `count` distinct orders out of `depth`, in random order
+std::vector<size_t> sample(size_t depth, size_t count, std::mt19937_64& rng) {
+    std::vector<size_t> indices(depth);
+    for (size_t i = 0; i < depth; ++i) {
+        indices[i] = i;
+    }
+    std::shuffle(indices.begin(), indices.end(), rng);
+    indices.resize(count);
+    return indices;
+}
+
+void benchOrderBook(size_t depth, std::mt19937_64& rng, std::vector<Result>& results) {
+    const auto resting = restingOrders(SYMBOL, depth, "r");
+    OrderBook book(SYMBOL);
+    for (const auto& order : resting) {
+        book.addOrder(order);
+    }
+    const size_t ops = std::min(depth, MAX_OPS);
+
+    // addOrder: new passive orders at the existing price levels
+    {
+        std::vector<Order> orders;
+        orders.reserve(ops);
+        for (size_t i = 0; i < ops; ++i) {
+            const auto& level = resting[rng() % depth];
+            orders.emplace_back(SYMBOL, level.getSide(), 1, level.getPrice(), "a" + std::to_string(i));
+        }
+        results.push_back({"OrderBook::addOrder", depth, best(ops, roundsFor(ops), [&] {
+            const auto start = Clock::now();
+            for (const auto& order : orders) {
+                book.addOrder(order);
+            }
+            const auto elapsed = Clock::now() - start;
+            for (const auto& order : orders) {
+                book.cancelOrder(order.getId());
+            }
+            return elapsed;
+        })});
+    }
+
+    // cancelOrder: random resting orders, from anywhere in their queues
+    {
+        const auto picked = sample(depth, ops, rng);
+        results.push_back({"OrderBook::cancelOrder", depth, best(ops, roundsFor(ops), [&] {
+            const auto start = Clock::now();
+            for (size_t i : picked) {
+                book.cancelOrder(resting[i].getId());
+            }
+            const auto elapsed = Clock::now() - start;
+            for (size_t i : picked) {
+                book.addOrder(resting[i]);
+            }
+            return elapsed;
+        })});
+    }
+
+    // matchOrders: one aggressive buy filling the best ask per call
+    {
+        const size_t match_ops = std::min(depth / 2, MAX_OPS);
+        std::vector<Order> buys;
+        buys.reserve(match_ops);
+        for (size_t i = 0; i < match_ops; ++i) {
+            buys.emplace_back(SYMBOL, Side::BUY, 1, Price{MID_PRICE + static_cast<int64_t>(depth)},
+                              "m" + std::to_string(i));
+        }
+        std::vector<Trade> fills;
+        fills.reserve(match_ops);
+        results.push_back({"OrderBook::matchOrders", depth, best(match_ops, roundsFor(match_ops), [&] {
+            Clock::duration elapsed{0};
+            fills.clear();
+            for (const auto& buy : buys) {
+                book.addOrder(buy);
+                const auto start = Clock::now();
+                auto trades = book.matchOrders();
+                elapsed += Clock::now() - start;
+                fills.insert(fills.end(), trades.begin(), trades.end());
+            }
+            // Put the filled asks back
+            for (const auto& trade : fills) {
+                book.addOrder(Order(SYMBOL, Side::SELL, trade.getQuantity(), trade.getPrice(), trade.getSellOrderId()));
+            }
+            return elapsed;
+        })});
+    }
+
+    // getOrders: a copy of the whole book per call
+    {
+        const size_t rounds = std::max(MIN_ROUNDS, MIN_TOTAL_OPS / depth);
+        size_t copied = 0;
+        results.push_back({"OrderBook::getOrders", depth, best(1, rounds, [&] {
+            const auto start = Clock::now();
+            copied += book.getOrders().size();
+            return Clock::now() - start;
+        })});
+        if (copied != rounds * depth) {
+            throw std::runtime_error("getOrders returned the wrong number of orders");
+        }
+    }
+}
+
+void benchMarket(size_t depth, size_t symbol_count, std::mt19937_64& rng, std::vector<Result>& results) {
+    // The same depth in total, spread evenly over every symbol's book
+    Market market;
+    std::vector<Order> resting;
+    resting.reserve(depth);
+    for (size_t s = 0; s < symbol_count; ++s) {
+        const size_t share = depth / symbol_count + (s < depth % symbol_count ? 1 : 0);
+        auto orders = restingOrders("SYM" + std::to_string(s), share, std::to_string(s) + "-");
+        std::move(orders.begin(), orders.end(), std::back_inserter(resting));
+    }
+    for (const auto& order : resting) {
+        market.addOrder(order);
+    }
+
+    const size_t ops = std::min(depth, MAX_OPS);
+    const auto picked = sample(depth, ops, rng);
+    results.push_back({"Market::cancelOrder", depth, best(ops, roundsFor(ops), [&] {
+        const auto start = Clock::now();
+        for (size_t i : picked) {
+            market.cancelOrder(resting[i].getId());
+        }
+        const auto elapsed = Clock::now() - start;
+        for (size_t i : picked) {
+            market.addOrder(resting[i]);
+        }
+        return elapsed;
+    })});
+}
+
+std::vector<size_t> parseDepths(const std::string& list) {
+    std::vector<size_t> depths;
+    std::stringstream stream(list);
+    std::string item;
+    while (std::getline(stream, item, ',')) {
+        depths.push_back(std::stoull(item));
+        if (depths.back() < 2) {
+            throw std::invalid_argument("Depths must be at least 2");
+        }
+    }
+    return depths;
+}
+
+Options parseOptions(int argc, char** argv) {
+    Options options;
+    for (int i = 1; i < argc; ++i) {
+        const std::string arg = argv[i];
+        if (i + 1 >= argc) {
+            throw std::invalid_argument("Missing value for " + arg);
+        }
+        const std::string value = argv[++i];
+        if (arg == "--depths") {
+            options.depths = parseDepths(value);
+        } else if (arg == "--symbols") {
+            options.symbols = std::stoull(value);
+        } else if (arg == "--output") {
+            options.output = value;
+        } else if (arg == "--baseline") {
+            options.baseline = value;
+        } else if (arg == "--threshold") {
+            options.threshold = std::stod(value);
+        } else {
+            throw std::invalid_argument("Unknown option " + arg);
+        }
+    }
+    if (options.symbols == 0) {
+        throw std::invalid_argument("Symbols must be positive");
+    }
+    return options;
+}
+
+void writeResults(std::ostream& out, const std::vector<Result>& results) {
+    out << "benchmark,depth,ns_per_op\n";
+    for (const auto& result : results) {
+        out << result.name << ',' << result.depth << ',' << std::fixed << std::setprecision(1)
+            << result.ns_per_op << '\n';
+    }
+}
+
+// (benchmark, depth) -> ns/op; lines starting with '#' are comments
+std::map<std::pair<std::string, size_t>, double> readBaseline(const std::string& path) {
+    std::ifstream in(path);
+    if (!in) {
+        throw std::runtime_error("Cannot read baseline " + path);
+    }
+    std::map<std::pair<std::string, size_t>, double> baseline;
+    std::string line;
+    while (std::getline(in, line)) {
+        if (line.empty() || line[0] == '#' || line.rfind("benchmark,", 0) == 0) {
+            continue;
+        }
+        std::stringstream fields(line);
+        std::string name, depth, ns;
+        std::getline(fields, name, ',');
+        std::getline(fields, depth, ',');
+        std::getline(fields, ns, ',');
+        baseline[{name, std::stoull(depth)}] = std::stod(ns);
+    }
+    return baseline;
+}
+
+// Returns the number of benchmarks whose throughput fell by more than the threshold
+size_t compare(const std::vector<Result>& results, const std::string& path, double threshold) {
+    const auto baseline = readBaseline(path);
+    size_t regressions = 0;
+    std::cout << "\nAgainst " << path << " (fails below " << std::setprecision(0)
+              << (1 - threshold) * 100 << "% of baseline throughput)\n";
+    for (const auto& result : results) {
+        const auto it = baseline.find({result.name, result.depth});
+        std::cout << std::left << std::setw(24) << result.name << std::right << std::setw(9) << result.depth;
+        if (it == baseline.end()) {
+            std::cout << "  no baseline\n";
+            continue;
+        }
+        // Throughput relative to the baseline
+        const double ratio = it->second / result.ns_per_op;
+        const bool regressed = ratio < 1 - threshold;
+        regressions += regressed;
+        std::cout << std::fixed << std::setprecision(1) << std::setw(12) << it->second
+                  << std::setw(12) << result.ns_per_op << std::setprecision(0) << std::setw(7)
+                  << ratio * 100 << '%' << (regressed ? "  REGRESSION" : "") << '\n';
+    }
+    return regressions;
+}
+
+}
+
+int main(int argc, char** argv) {
+    try {
+        const Options options = parseOptions(argc, argv);
+        std::mt19937_64 rng(42);
+        std::vector<Result> results;
+        for (size_t depth : options.depths) {
+            const size_t first = results.size();
+            benchOrderBook(depth, rng, results);
+            benchMarket(depth, options.symbols, rng, results);
+            for (size_t i = first; i < results.size(); ++i) {
+                std::cout << std::left << std::setw(24) << results[i].name << std::right << std::setw(9)
+                          << results[i].depth << std::fixed << std::setprecision(1) << std::setw(14)
+                          << results[i].ns_per_op << " ns/op" << std::endl;
+            }
+        }
+
+        if (!options.output.empty()) {
+            std::ofstream out(options.output);
+            writeResults(out, results);
+            if (!out) {
+                throw std::runtime_error("Cannot write " + options.output);
+            }
+        }
+
+        if (!options.baseline.empty()) {
+            const size_t regressions = compare(results, options.baseline, options.threshold);
+            if (regressions) {
+                std::cerr << regressions << " benchmark(s) regressed beyond the threshold\n";
+                return 1;
+            }
+        }
+        return 0;
+    } catch (const std::exception& e) {
+        std::cerr << "orderbook_bench: " << e.what() << '\n'
+                  << "usage: orderbook_bench [--depths N,N,...] [--symbols N] [--output FILE]"
+                     " [--baseline FILE] [--threshold FRACTION]\n";
+        return 2;
+    }
+}
\ No newline at end of file
@@ -1,15 +1,36 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h>
+#include <pybind11/numpy.h>
 #include "core/Order.h"
 #include "core/Trade.h"
 #include "core/OrderBook.h"
 #include "core/Market.h"
 #include "core/Position.h"
+#include "core/Portfolio.h"
+#include "core/Journal.h"
+#include "core/Snapshot.h"
 
 namespace py = pybind11;
 using namespace trading;
 
+namespace {
+// Hands a record vector to NumPy without copying; the array owns the buffer
+template <typename Record>
+py::array_t<Record> toArray(std::vector<Record>&& records) {
+    auto* owned = new std::vector<Record>(std::move(records));
+    py::capsule free_when_done(owned, [](void* p) {
+        delete static_cast<std::vector<Record>*>(p);
+    });
+    return py::array_t<Record>(owned->size(), owned->data(), free_when_done);
+}
+}
+
+// Calls that lock or do matching work release the GIL so other Python
+// threads keep running; arguments and results are converted while it is held.
 PYBIND11_MODULE(trading, m) {
+    PYBIND11_NUMPY_DTYPE(TradeRecord, sequence, price, quantity, timestamp, side);
+    PYBIND11_NUMPY_DTYPE(DepthRecord, price, quantity, order_count, side);
+
     py::enum_<Side>(m, "Side")
         .value("BUY", Side::BUY)
         .value("SELL", Side::SELL);
@@ -20,8 +41,15 @@ PYBIND11_MODULE(trading, m) {
         .value("CANCELLED", OrderStatus::CANCELLED)
         .value("REJECTED", OrderStatus::REJECTED);
 
+    py::enum_<EventType>(m, "EventType")
+        .value("LEVEL_UPDATE", EventType::LEVEL_UPDATE)
+        .value("ORDER_ADDED", EventType::ORDER_ADDED)
+        .value("ORDER_REMOVED", EventType::ORDER_REMOVED)
+        .value("TRADE", EventType::TRADE);
+
     py::class_<Price>(m, "Price")
         .def(py::init<>())
+        .def(py::init<int64_t>(), py::arg("value"))
         .def_readwrite("value", &Price::value)
         .def("__lt__", &Price::operator<)
         .def("__gt__", &Price::operator>)
@@ -31,10 +59,12 @@ PYBIND11_MODULE(trading, m) {
         
     py::class_<Order>(m, "Order")
         .def(py::init<const std::string&, Side, Quantity, Price>())
+        .def(py::init<const std::string&, Side, Quantity, Price, const OrderId&>())
         .def("getId", &Order::getId)
         .def("getSymbol", &Order::getSymbol)
         .def("getSide", &Order::getSide)
         .def("getQuantity", &Order::getQuantity)
+        .def("getRemainingQuantity", &Order::getRemainingQuantity)
         .def("getPrice", &Order::getPrice)
         .def("getStatus", &Order::getStatus)
         .def("setStatus", &Order::setStatus);
@@ -42,10 +72,26 @@ PYBIND11_MODULE(trading, m) {
     py::class_<Position>(m, "Position")
         .def(py::init<const std::string&>())
         .def("updatePosition", &Position::updatePosition)
+        .def("applyFill", &Position::applyFill, py::arg("side"), py::arg("quantity"), py::arg("price"))
         .def("getQuantity", &Position::getQuantity)
         .def("getAveragePrice", &Position::getAveragePrice)
         .def("getSymbol", &Position::getSymbol);
 
+    py::class_<AccountPosition>(m, "AccountPosition")
+        .def_readonly("symbol", &AccountPosition::symbol)
+        .def_readonly("quantity", &AccountPosition::quantity)
+        .def_readonly("average_price", &AccountPosition::average_price)
+        .def_readonly("realized_pnl", &AccountPosition::realized_pnl)
+        .def_readonly("unrealized_pnl", &AccountPosition::unrealized_pnl);
+
+    py::class_<Portfolio>(m, "Portfolio")
+        .def(py::init<>())
+        .def("applyTrade", &Portfolio::applyTrade,
+            py::arg("symbol"), py::arg("buyer"), py::arg("seller"), py::arg("quantity"), py::arg("price"))
+        .def("getPositions", &Portfolio::getPositions, py::arg("account"))
+        .def("getLastPrice", &Portfolio::getLastPrice)
+        .def("getAccountCount", &Portfolio::getAccountCount);
+
     py::class_<Trade>(m, "Trade")
         .def(py::init<const Order&, const Order&>())
         .def("getBuyOrderId", &Trade::getBuyOrderId)
@@ -54,6 +100,8 @@ PYBIND11_MODULE(trading, m) {
         .def("getQuantity", &Trade::getQuantity)
         .def("getPrice", &Trade::getPrice)
         .def("getTimestamp", &Trade::getTimestamp)
+        .def("getSequence", &Trade::getSequence)
+        .def("getEventSequence", &Trade::getEventSequence)
         .def("getSide", &Trade::getSide);
 
     py::class_<Timestamp>(m, "Timestamp")
@@ -62,20 +110,68 @@ PYBIND11_MODULE(trading, m) {
             return std::to_string(ts);
         });
 
+    py::class_<PriceLevel>(m, "PriceLevel")
+        .def_readonly("price", &PriceLevel::price)
+        .def_readonly("quantity", &PriceLevel::quantity)
+        .def_readonly("order_count", &PriceLevel::order_count);
+
+    py::class_<BookDepth>(m, "BookDepth")
+        .def_readonly("bids", &BookDepth::bids)
+        .def_readonly("asks", &BookDepth::asks)
+        .def_readonly("sequence", &BookDepth::sequence)
+        .def_readonly("version", &BookDepth::version);
+
+    py::class_<MarketSnapshot>(m, "MarketSnapshot")
+        .def_readonly("depth", &MarketSnapshot::depth)
+        .def_readonly("trades", &MarketSnapshot::trades);
+
+    py::class_<MarketEvent>(m, "MarketEvent")
+        .def_readonly("sequence", &MarketEvent::sequence)
+        .def_readonly("type", &MarketEvent::type)
+        .def_readonly("symbol", &MarketEvent::symbol)
+        .def_readonly("side", &MarketEvent::side)
+        .def_readonly("price", &MarketEvent::price)
+        .def_readonly("quantity", &MarketEvent::quantity)
+        .def_readonly("order_count", &MarketEvent::order_count)
+        .def_readonly("order_id", &MarketEvent::order_id)
+        .def_readonly("timestamp", &MarketEvent::timestamp);
+
     py::class_<OrderBook>(m, "OrderBook")
         .def(py::init<const Symbol&>())
-        .def("addOrder", &OrderBook::addOrder)
-        .def("cancelOrder", &OrderBook::cancelOrder)
-        .def("matchOrders", &OrderBook::matchOrders)
+        .def("addOrder", &OrderBook::addOrder, py::call_guard<py::gil_scoped_release>())
+        .def("cancelOrder", &OrderBook::cancelOrder, py::call_guard<py::gil_scoped_release>())
+        .def("matchOrders", &OrderBook::matchOrders, py::call_guard<py::gil_scoped_release>())
         .def("getSymbol", &OrderBook::getSymbol)
+        .def("getVersion", &OrderBook::getVersion)
         .def("hasOrder", &OrderBook::hasOrder)
         .def("getOrder", &OrderBook::getOrder)
-        .def("getOrders", &OrderBook::getOrders);
+        .def("getOrders", &OrderBook::getOrders, py::call_guard<py::gil_scoped_release>())
+        .def("getOrderCount", &OrderBook::getOrderCount)
+        .def("getBestBid", &OrderBook::getBestBid)
+        .def("getBestAsk", &OrderBook::getBestAsk)
+        .def("getDepth", &OrderBook::getDepth, py::arg("levels"), py::call_guard<py::gil_scoped_release>())
+        .def("getDepthArray", [](const OrderBook& book, size_t levels) {
+            std::vector<DepthRecord> records;
+            {
+                py::gil_scoped_release release;
+                records = book.getDepthRecords(levels);
+            }
+            return toArray(std::move(records));
+        }, py::arg("levels"));
 
     py::class_<Market>(m, "Market")
         .def(py::init<>())
-        .def("addOrder", &Market::addOrder)
-        .def("cancelOrder", &Market::cancelOrder)
+        .def(py::init<size_t, size_t>(),
+            py::arg("trade_history_capacity") = Market::DEFAULT_TRADE_HISTORY_CAPACITY,
+            py::arg("event_capacity") = 0)
+        .def("addOrder", &Market::addOrder, py::call_guard<py::gil_scoped_release>())
+        .def("addOrders", &Market::addOrders, py::call_guard<py::gil_scoped_release>())
+        .def("cancelOrder", &Market::cancelOrder, py::call_guard<py::gil_scoped_release>())
+        .def("hasOrder", &Market::hasOrder)
+        .def("getOrder", &Market::getOrder)
+        .def("restoreOrders", &Market::restoreOrders, py::arg("symbol"), py::arg("orders"),
+            py::call_guard<py::gil_scoped_release>())
+        .def("createOrderBook", &Market::createOrderBook)
         .def("hasOrderBook", &Market::hasOrderBook)
         .def("getOrderBook", 
             py::overload_cast<const Symbol&>(&Market::getOrderBook, py::const_),
@@ -83,8 +179,48 @@ PYBIND11_MODULE(trading, m) {
         .def("getOrderBook",
             py::overload_cast<const Symbol&>(&Market::getOrderBook),
             py::return_value_policy::reference)
-        .def("getTradesForSymbol", &Market::getTradesForSymbol)
-        .def("getPosition", py::overload_cast<const Symbol&>(&Market::getPosition, py::const_))
-        .def("getAllPositions", &Market::getAllPositions)
-        .def("matchOrders", &Market::matchOrders);
+        .def("getTradesForSymbol", &Market::getTradesForSymbol, py::call_guard<py::gil_scoped_release>())
+        .def("getTradesSince", &Market::getTradesSince,
+            py::arg("symbol"), py::arg("sequence"), py::arg("limit"),
+            py::call_guard<py::gil_scoped_release>())
+        .def("getLastTradeSequence", &Market::getLastTradeSequence, py::call_guard<py::gil_scoped_release>())
+        .def("getSnapshot", &Market::getSnapshot,
+            py::arg("symbol"), py::arg("levels"), py::arg("trade_count"),
+            py::call_guard<py::gil_scoped_release>())
+        .def("getTradesArray", [](const Market& market, const Symbol& symbol) {
+            std::vector<TradeRecord> records;
+            {
+                py::gil_scoped_release release;
+                records = market.getTradeRecords(symbol);
+            }
+            return toArray(std::move(records));
+        }, py::arg("symbol"))
+        .def("matchOrders", &Market::matchOrders, py::call_guard<py::gil_scoped_release>())
+        .def("drainEvents", &Market::drainEvents, py::arg("max_events"),
+            py::call_guard<py::gil_scoped_release>())
+        .def("getLastEventSequence", &Market::getLastEventSequence)
+        .def("getDroppedEventCount", &Market::getDroppedEventCount);
+
+    py::class_<Journal>(m, "Journal")
+        .def(py::init<const std::string&, JournalSequence>(), py::arg("path"), py::arg("next_sequence"))
+        .def("recordAdd", &Journal::recordAdd, py::call_guard<py::gil_scoped_release>())
+        .def("recordCancel", &Journal::recordCancel, py::call_guard<py::gil_scoped_release>())
+        .def("rotate", &Journal::rotate, py::arg("path"), py::call_guard<py::gil_scoped_release>())
+        .def("getLastSequence", &Journal::getLastSequence)
+        .def("getPath", &Journal::getPath)
+        .def_static("replay", &Journal::replay,
+            py::arg("path"), py::arg("market"), py::arg("covered"),
+            py::call_guard<py::gil_scoped_release>());
+
+    py::class_<SnapshotInfo>(m, "SnapshotInfo")
+        .def_readonly("symbol", &SnapshotInfo::symbol)
+        .def_readonly("sequence", &SnapshotInfo::sequence)
+        .def_readonly("order_count", &SnapshotInfo::order_count);
+
+    m.def("saveSnapshot", &saveSnapshot,
+        py::arg("book"), py::arg("sequence"), py::arg("path"),
+        py::call_guard<py::gil_scoped_release>());
+    m.def("loadSnapshot", &loadSnapshot,
+        py::arg("market"), py::arg("path"),
+        py::call_guard<py::gil_scoped_release>());
 }
\ No newline at end of file
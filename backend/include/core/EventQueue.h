@@ -0,0 +1,63 @@
+#pragma once
+#include "Types.h"
+#include <deque>
+#include <mutex>
+#include <vector>
+
+namespace trading {
+
+enum class EventType : uint8_t {
+    // The level at price on side now holds quantity across order_count
+    // orders; both are 0 once the level is empty
+    LEVEL_UPDATE,
+    // order_id started resting with quantity at price
+    ORDER_ADDED,
+    // order_id left the book, filled or cancelled, with quantity unfilled
+    ORDER_REMOVED,
+    // quantity traded at price; side and order_id are the aggressor's
+    TRADE
+};
+
+// One change to an order book
+struct MarketEvent {
+    EventSequence sequence;
+    EventType type;
+    Symbol symbol;
+    Side side;
+    Price price;
+    Quantity quantity;
+    size_t order_count;
+    OrderId order_id;
+    Timestamp timestamp;
+};
+
+// Bounded, thread-safe FIFO of market events, numbered across all symbols
+// in the order they were pushed. Once full, the oldest events are dropped;
+// consumers see that as a gap in sequence numbers.
+class EventQueue {
+public:
+    static constexpr size_t DEFAULT_CAPACITY = 65536;
+
+    explicit EventQueue(size_t capacity = DEFAULT_CAPACITY);
+
+    // Stamps the event with the next sequence number and queues it
+    EventSequence push(MarketEvent event);
+
+    // Removes and returns up to max_events of the oldest queued events
+    std::vector<MarketEvent> drain(size_t max_events);
+
+    size_t size() const;
+    size_t capacity() const { return capacity_; }
+    EventSequence getLastSequence() const;
+    // Events discarded because the queue was full
+    uint64_t getDroppedCount() const;
+
+private:
+    size_t capacity_;
+    std::deque<MarketEvent> events_;
+    EventSequence next_sequence_ = 1;
+    uint64_t dropped_ = 0;
+    mutable std::mutex mutex_;
+};
+
+}
\ No newline at end of file
@@ -0,0 +1,55 @@
+#pragma once
+#include "Types.h"
+#include "Order.h"
+#include <cstdio>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+
+namespace trading {
+
+class Market;
+
+// Sequence number of a journal record; numbering carries on across rotations
+using JournalSequence = uint64_t;
+
+// Append-only binary log of the inputs applied to a Market. Each record is
+// flushed to the OS as it is written, so it survives a process crash.
+// Replaying the log into an empty Market reproduces the books exactly.
+class Journal {
+public:
+    // Opens a new segment at `path`; the first record gets `next_sequence`
+    Journal(const std::string& path, JournalSequence next_sequence);
+    ~Journal();
+
+    Journal(const Journal&) = delete;
+    Journal& operator=(const Journal&) = delete;
+
+    JournalSequence recordAdd(const Order& order);
+    JournalSequence recordCancel(const Symbol& symbol, const OrderId& orderId);
+
+    // Closes the current segment and continues numbering in a new one
+    void rotate(const std::string& path);
+
+    JournalSequence getLastSequence() const;
+    std::string getPath() const;
+
+    // Applies every record of a segment whose sequence is greater than the
+    // one already covered for its symbol (see loadSnapshot). Records the
+    // engine rejected when they were written are rejected again and skipped.
+    // A torn record at the end of the file ends the replay.
+    // Returns the last sequence found in the segment, or 0 if it has none.
+    static JournalSequence replay(const std::string& path, Market& market,
+                                  const std::unordered_map<Symbol, JournalSequence>& covered);
+
+private:
+    void open(const std::string& path);
+    JournalSequence append(const std::string& record);
+
+    mutable std::mutex mutex_;
+    std::FILE* file_ = nullptr;
+    std::string path_;
+    JournalSequence next_sequence_;
+};
+
+}
\ No newline at end of file
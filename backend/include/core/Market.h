@@ -2,48 +2,111 @@
 #include "Types.h"
 #include "Order.h"
 #include "OrderBook.h"
-#include "Position.h"
 #include "Trade.h"
+#include "TradeHistory.h"
+#include "EventQueue.h"
 #include <map>
 #include <unordered_map>
 #include <vector>
 #include <memory>
+#include <mutex>
+#include <shared_mutex>
 
 namespace trading {
 
+// A book's depth together with its most recent trades, read at one point:
+// every trade whose event is at or below depth.sequence is included, and
+// none after it
+struct MarketSnapshot {
+    BookDepth depth;
+    std::vector<Trade> trades;
+};
+
+// Market is safe to call from multiple threads. Each OrderBook serialises its
+// own operations, so work on different symbols proceeds in parallel.
 class Market {
 public:
+    static constexpr size_t DEFAULT_TRADE_HISTORY_CAPACITY = 100000;
+
+    // Each symbol retains at most trade_history_capacity recent trades. With
+    // a non-zero event_capacity, book changes are recorded for drainEvents.
+    explicit Market(size_t trade_history_capacity = DEFAULT_TRADE_HISTORY_CAPACITY,
+                    size_t event_capacity = 0);
+
     // Order Processing
     void addOrder(const Order& order);
     void cancelOrder(const OrderId& orderId);
 
+    // Batch processing: validates the whole batch, then adds and matches each
+    // order in turn. Returns the trades produced by each order, in input order.
+    std::vector<std::vector<Trade>> addOrders(const std::vector<Order>& orders);
+
+    // Puts previously resting orders of one symbol back on its book without
+    // matching, keeping their remaining quantities and the given time priority
+    void restoreOrders(const Symbol& symbol, std::vector<Order> orders);
+
+    // Order lookup
+    bool hasOrder(const OrderId& orderId) const;
+    Order getOrder(const OrderId& orderId) const;
+
+    // Creates an empty order book for symbol unless it already has one
+    void createOrderBook(const Symbol& symbol);
+
     // Market Data Queries
     bool hasOrderBook(const Symbol& symbol) const;
     const OrderBook& getOrderBook(const Symbol& symbol) const;
     OrderBook& getOrderBook(const Symbol& symbol);
+    // Trade history only covers the retained window of recent trades
     std::vector<Trade> getTradesForSymbol(const Symbol& symbol) const;
+    std::vector<Trade> getTradesSince(const Symbol& symbol, TradeSequence sequence, size_t limit) const;
+    TradeSequence getLastTradeSequence(const Symbol& symbol) const;
+    std::vector<TradeRecord> getTradeRecords(const Symbol& symbol) const;
+    // Up to levels price levels per side and the last trade_count trades
+    MarketSnapshot getSnapshot(const Symbol& symbol, size_t levels, size_t trade_count) const;
 
-    // Position tracking
-    Position& getPosition(const Symbol& symbol);
-    const Position& getPosition(const Symbol& symbol) const;
-    std::vector<Position> getAllPositions() const;
-    
     // Order matching
     std::vector<Trade> matchOrders(const Symbol& symbol);
 
+    // Book change events across all symbols, oldest first. Empty when the
+    // market records no events.
+    std::vector<MarketEvent> drainEvents(size_t max_events);
+    EventSequence getLastEventSequence() const;
+    uint64_t getDroppedEventCount() const;
+
 private:
-    // Map of symbol to order book
+    // Shared by every book; null when events are disabled
+    std::unique_ptr<EventQueue> events_;
+
+    // Map of symbol to order book; books are never removed once created
     std::unordered_map<Symbol, std::unique_ptr<OrderBook>> order_books_;
+    mutable std::shared_mutex books_mutex_;
+
+    // Index of resting orders to the order book holding them
+    std::unordered_map<OrderId, OrderBook*> order_index_;
+    mutable std::mutex index_mutex_;
     
-    // Map of symbol to position
-    std::unordered_map<Symbol, std::unique_ptr<Position>> positions_;
-    
-    // Trade history
-    std::unordered_map<Symbol, std::vector<Trade>> trades_;
+    // Recent trade history of one symbol
+    struct SymbolTrades {
+        explicit SymbolTrades(size_t capacity) : history(capacity) {}
+
+        // Held across a match and the append of its trades, so a snapshot
+        // sees the book and its history either both before or both after
+        mutable std::mutex mutex;
+        TradeHistory history;
+    };
+
+    // Created with each order book and never removed
+    size_t trade_history_capacity_;
+    std::unordered_map<Symbol, std::unique_ptr<SymbolTrades>> trades_;
+
+    // Guards trades_ itself; each entry has its own mutex
+    mutable std::mutex history_mutex_;
     
     // Helper methods
+    void validateOrder(const Order& order) const;
     OrderBook& getOrCreateOrderBook(const Symbol& symbol);
-    Position& getOrCreatePosition(const Symbol& symbol);
+    // Null for a symbol without an order book
+    SymbolTrades* findTrades(const Symbol& symbol) const;
 };
 
 }
\ No newline at end of file
@@ -2,47 +2,128 @@
 #include "Types.h"
 #include "Order.h"
 #include "Trade.h"
+#include "EventQueue.h"
 #include <map>
 #include <unordered_map>
 #include <vector>
 #include <memory>
+#include <optional>
+#include <mutex>
+#include <atomic>
 
 namespace trading {
 
+// Aggregated view of all resting orders at a single price
+struct PriceLevel {
+    Price price;
+    Quantity quantity;
+    size_t order_count;
+};
+
+// Top-of-book levels for both sides, best price first. sequence is the last
+// event recorded when the depth was read, or 0 without an event queue;
+// version is the book's version at that point.
+struct BookDepth {
+    std::vector<PriceLevel> bids;
+    std::vector<PriceLevel> asks;
+    EventSequence sequence = 0;
+    BookVersion version = 0;
+};
+
+// Flat, fixed-width view of a price level for bulk export. side is 0 for
+// bids and 1 for asks.
+struct DepthRecord {
+    int64_t price;
+    int64_t quantity;
+    int64_t order_count;
+    int8_t side;
+};
+
+// All public methods are thread-safe; each book serialises access internally.
 class OrderBook {
 public:
-    explicit OrderBook(const Symbol& symbol);
+    // Changes are recorded to events when given; restoreOrders records none
+    explicit OrderBook(const Symbol& symbol, EventQueue* events = nullptr);
 
     // Order management
     void addOrder(const Order& order);
     void cancelOrder(const OrderId& orderId);
+    // Adds orders that were resting in this book, in time priority order,
+    // without matching them
+    void restoreOrders(std::vector<Order> orders);
 
     // Order matching
     std::vector<Trade> matchOrders();
 
     // Getters
     Symbol getSymbol() const { return symbol_; }
+    // Changes whenever the book's contents do; read without taking the book lock
+    BookVersion getVersion() const { return version_.load(std::memory_order_acquire); }
     bool hasOrder(const OrderId& orderId) const;
-    const Order& getOrder(const OrderId& orderId) const;
+    Order getOrder(const OrderId& orderId) const;
     std::vector<Order> getOrders() const;
+    size_t getOrderCount() const;
+    // Bids then asks, each best price first and in time priority within a level
+    std::vector<Order> getOrdersByPriority() const;
+
+    // Aggregated market data
+    std::optional<PriceLevel> getBestBid() const;
+    std::optional<PriceLevel> getBestAsk() const;
+    BookDepth getDepth(size_t levels) const;
+    // Bids then asks, each best price first
+    std::vector<DepthRecord> getDepthRecords(size_t levels) const;
 
 private:
+    struct Level;
+
+    // Resting order linked into the FIFO queue of its price level
+    struct OrderNode {
+        Order order;
+        uint64_t sequence;
+        Level* level;
+        OrderNode* prev;
+        OrderNode* next;
+    };
+
+    // Price level: aggregated totals plus the time-ordered queue of orders
+    struct Level {
+        PriceLevel summary;
+        OrderNode* head;
+        OrderNode* tail;
+    };
+
     // Symbol
     Symbol symbol_;
 
+    // Receives a record of every change, if set
+    EventQueue* events_;
+
+    // Guards all mutable state below
+    mutable std::mutex mutex_;
 
-    // Order Reference Storage
-    std::multimap<Price, std::reference_wrapper<Order>, std::greater<Price>> bids_;
-    std::multimap<Price, std::reference_wrapper<Order>, std::less<Price>> asks_;
+    // Price levels, best price first
+    std::map<Price, Level, std::greater<Price>> bids_;
+    std::map<Price, Level, std::less<Price>> asks_;
     
-    // Primary storage - owns the orders
-    std::unordered_map<OrderId, Order> orders_;
+    // Primary storage - owns the orders; nodes are stable across rehashes
+    std::unordered_map<OrderId, OrderNode> orders_;
+
+    // Arrival counter used for time priority between the two sides
+    uint64_t next_sequence_ = 0;
 
-    // Historical Trades
-    std::vector<Trade> trades_;
+    // Bumped under mutex_ after every change
+    std::atomic<BookVersion> version_{0};
 
     void removeOrder(const OrderId& orderId);
-    void matchOrder(const Order& bid, const Order& ask);
+    // Callers must hold mutex_
+    void bumpVersion() { version_.fetch_add(1, std::memory_order_release); }
+    // Event helpers; callers must hold mutex_ and check events_
+    void recordOrder(EventType type, const Order& order);
+    void recordLevel(Side side, Price price);
+    template <typename Levels>
+    void enqueue(Levels& levels, OrderNode& node);
+    template <typename Levels>
+    void unlink(Levels& levels, OrderNode& node);
 };
 
 }
\ No newline at end of file
@@ -0,0 +1,50 @@
+#pragma once
+#include "Types.h"
+#include <mutex>
+#include <optional>
+#include <unordered_map>
+#include <vector>
+
+namespace trading {
+
+// Price ticks times lots; wide enough that no quantity times price overflows
+using TickLots = __int128;
+
+// One account's holding in one symbol. quantity is in lots, positive when
+// long and negative when short. cost is what the open quantity was bought
+// or sold for, kept exactly; average_price is it per lot, rounded to a tick,
+// for display only. PnL is in price ticks times lots, with unrealized PnL
+// marked against the symbol's last trade price.
+struct AccountPosition {
+    Symbol symbol;
+    Quantity quantity = 0;
+    TickLots cost = 0;
+    Price average_price{0};
+    int64_t realized_pnl = 0;
+    int64_t unrealized_pnl = 0;
+};
+
+// Positions and PnL of every account, updated one trade at a time.
+// All public methods are thread-safe.
+class Portfolio {
+public:
+    // Applies one trade to the buying and selling accounts and makes its
+    // price the symbol's last price
+    void applyTrade(const Symbol& symbol, AccountId buyer, AccountId seller,
+                    Quantity quantity, Price price);
+
+    // The account's positions in every symbol it has traded, sorted by symbol
+    std::vector<AccountPosition> getPositions(AccountId account) const;
+    std::optional<Price> getLastPrice(const Symbol& symbol) const;
+    size_t getAccountCount() const;
+
+private:
+    // Signed quantity: positive buys, negative sells
+    static void applyFill(AccountPosition& position, Quantity quantity, Price price);
+
+    std::unordered_map<AccountId, std::unordered_map<Symbol, AccountPosition>> accounts_;
+    std::unordered_map<Symbol, Price> last_prices_;
+    mutable std::mutex mutex_;
+};
+
+}
\ No newline at end of file
@@ -10,6 +10,8 @@ public:
     Position(const std::string& symbol);
     
     void updatePosition(const Order& order);
+    // Applies one fill directly, with no order to validate
+    void applyFill(Side side, Quantity quantity, Price price);
     Quantity getQuantity() const { return quantity_; }
     Price getAveragePrice() const { return avg_price_; }
     std::string getSymbol() const { return symbol_; }
@@ -0,0 +1,28 @@
+#pragma once
+#include "Types.h"
+#include "Journal.h"
+#include "OrderBook.h"
+#include <string>
+
+namespace trading {
+
+class Market;
+
+struct SnapshotInfo {
+    Symbol symbol;
+    // Last journal record already reflected in the snapshot
+    JournalSequence sequence;
+    size_t order_count;
+};
+
+// Writes the resting orders of one book to `path` in priority order. The
+// file is written beside `path` and renamed into place, so a crash never
+// leaves a partial snapshot. The caller must keep the book from changing
+// relative to `sequence` while this runs.
+void saveSnapshot(const OrderBook& book, JournalSequence sequence, const std::string& path);
+
+// Memory-maps a snapshot and adds its orders to `market` with their
+// remaining quantities and original time priority
+SnapshotInfo loadSnapshot(Market& market, const std::string& path);
+
+}
\ No newline at end of file
@@ -5,9 +5,21 @@
 
 namespace trading {
 
+// Flat, fixed-width view of a trade for bulk export. side is 0 for BUY and
+// 1 for SELL and records the aggressor.
+struct TradeRecord {
+    uint64_t sequence;
+    int64_t price;
+    int64_t quantity;
+    int64_t timestamp;
+    int8_t side;
+};
+
 class Trade {
 public:
     Trade(const Order& buyOrder, const Order& sellOrder);
+    Trade(const Order& buyOrder, const Order& sellOrder, Quantity quantity, Price price);
+    Trade(const Order& buyOrder, const Order& sellOrder, Quantity quantity, Price price, Side aggressor);
 
     // Getters
     OrderId getBuyOrderId() const { return buy_order_id_; }
@@ -16,7 +28,16 @@ public:
     Quantity getQuantity() const { return quantity_; }
     Price getPrice() const { return price_; }
     Timestamp getTimestamp() const { return timestamp_; }
-    Side getSide() const { return Side::BUY; }
+    // Assigned when the trade is recorded in the market's history; 0 until then
+    TradeSequence getSequence() const { return sequence_; }
+    void setSequence(TradeSequence sequence) { sequence_ = sequence; }
+    // Sequence of the TRADE event recorded for this trade; 0 without an event queue
+    EventSequence getEventSequence() const { return event_sequence_; }
+    void setEventSequence(EventSequence sequence) { event_sequence_ = sequence; }
+    // Side of the incoming order that took liquidity
+    Side getSide() const { return aggressor_; }
+
+    TradeRecord toRecord() const;
 
 private:
     OrderId buy_order_id_;
@@ -25,5 +46,8 @@ private:
     Quantity quantity_;
     Price price_;
     Timestamp timestamp_;
+    Side aggressor_;
+    TradeSequence sequence_ = 0;
+    EventSequence event_sequence_ = 0;
 };
 }
\ No newline at end of file
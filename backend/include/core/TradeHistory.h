@@ -0,0 +1,45 @@
+#pragma once
+#include "Types.h"
+#include "Trade.h"
+#include <vector>
+
+namespace trading {
+
+// Fixed-capacity ring buffer of the most recent trades for one symbol.
+// Trades are numbered from 1 in the order they are appended; once the
+// buffer is full the oldest trade is overwritten.
+class TradeHistory {
+public:
+    explicit TradeHistory(size_t capacity);
+
+    // Stamps the trade with the next sequence number and stores it
+    TradeSequence append(Trade trade);
+
+    // Retained trades with a sequence greater than `sequence`, oldest first,
+    // at most `limit` of them
+    std::vector<Trade> since(TradeSequence sequence, size_t limit) const;
+    std::vector<Trade> all() const;
+
+    TradeSequence getLastSequence() const { return next_sequence_ - 1; }
+    TradeSequence getFirstSequence() const { return next_sequence_ - buffer_.size(); }
+    size_t size() const { return buffer_.size(); }
+    size_t capacity() const { return capacity_; }
+
+    template <typename Fn>
+    void forEach(Fn&& fn) const {
+        for (TradeSequence seq = getFirstSequence(); seq < next_sequence_; ++seq) {
+            fn(at(seq));
+        }
+    }
+
+private:
+    const Trade& at(TradeSequence sequence) const {
+        return buffer_[(sequence - 1) % capacity_];
+    }
+
+    size_t capacity_;
+    std::vector<Trade> buffer_;
+    TradeSequence next_sequence_ = 1;
+};
+
+}
\ No newline at end of file
@@ -15,8 +15,9 @@ namespace trading {
         REJECTED
     };
 
+    // Prices are integer multiples of the instrument's tick size
     struct Price {
-        double value;
+        int64_t value;
 
         bool operator<(const Price& other) const {
             return value < other.value;
@@ -40,7 +41,16 @@ namespace trading {
     };
 
     using OrderId = std::string;
-    using Quantity = double;
+    // Quantities are integer multiples of the instrument's lot size
+    using Quantity = int64_t;
     using Symbol = std::string;
     using Timestamp = int64_t;
+    // Per-symbol trade number, starting at 1
+    using TradeSequence = uint64_t;
+    // Market-wide event number, starting at 1
+    using EventSequence = uint64_t;
+    // Per-book count of changes, starting at 0
+    using BookVersion = uint64_t;
+    // Owner of positions; the web application's user id
+    using AccountId = int64_t;
 }
\ No newline at end of file
@@ -11,14 +11,14 @@ public:
 
     void test_ZeroQuantityOrders() {
         TS_ASSERT_THROWS(
-            market->addOrder(trading::Order("AAPL", trading::Side::BUY, 0, {100.0})),
+            market->addOrder(trading::Order("AAPL", trading::Side::BUY, 0, {100})),
             std::invalid_argument
         );
     }
 
     void test_NegativePriceOrders() {
         TS_ASSERT_THROWS(
-            market->addOrder(trading::Order("AAPL", trading::Side::BUY, 100, {-100.0})),
+            market->addOrder(trading::Order("AAPL", trading::Side::BUY, 100, {-100})),
             std::invalid_argument
         );
     }
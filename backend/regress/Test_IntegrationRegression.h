@@ -1,7 +1,6 @@
 #include <cxxtest/TestSuite.h>
 #include "core/Market.h"
 #include "core/OrderBook.h"
-#include "core/Position.h"
 
 class IntegrationRegressionTestSuite : public CxxTest::TestSuite {
 private:
@@ -11,19 +10,15 @@ public:
     void setUp() { market = new trading::Market(); }
     void tearDown() { delete market; }
 
-    void test_OrderBookPositionIntegration() {
+    void test_PartialFillLeavesRemainder() {
         // Add orders
-        market->addOrder(trading::Order("AAPL", trading::Side::BUY, 100, {150.0}));
-        market->addOrder(trading::Order("AAPL", trading::Side::SELL, 50, {150.0}));
+        market->addOrder(trading::Order("AAPL", trading::Side::BUY, 100, {150}));
+        market->addOrder(trading::Order("AAPL", trading::Side::SELL, 50, {150}));
         
         // Match orders
         auto trades = market->matchOrders("AAPL");
         TS_ASSERT_EQUALS(trades.size(), 1);
         
-        // Verify position
-        auto position = market->getPosition("AAPL");
-        TS_ASSERT_EQUALS(position.getQuantity(), 0);
-        
         // Verify order book
         auto& book = market->getOrderBook("AAPL");
         TS_ASSERT_EQUALS(book.getOrders().size(), 1);
@@ -14,7 +14,7 @@ public:
         std::vector<std::string> orderIds;
         
         for(int i = 0; i < NUM_ORDERS; i++) {
-            auto order = trading::Order("AAPL", trading::Side::BUY, 100, {150.0});
+            auto order = trading::Order("AAPL", trading::Side::BUY, 100, {150});
             orderIds.push_back(order.getId());
             market->addOrder(order);
         }
@@ -25,4 +25,17 @@ public:
         
         TS_ASSERT_EQUALS(market->getOrderBook("AAPL").getOrders().size(), 0);
     }
+
+    void test_TradeHistoryStaysBounded() {
+        trading::Market bounded(1000);
+        for(int i = 0; i < 20000; i++) {
+            bounded.addOrder(trading::Order("AAPL", trading::Side::SELL, 1, {150}));
+            bounded.addOrder(trading::Order("AAPL", trading::Side::BUY, 1, {150}));
+            bounded.matchOrders("AAPL");
+        }
+
+        TS_ASSERT_EQUALS(bounded.getLastTradeSequence("AAPL"), 20000);
+        TS_ASSERT_EQUALS(bounded.getTradesForSymbol("AAPL").size(), 1000);
+        TS_ASSERT_EQUALS(bounded.getTradesForSymbol("AAPL").front().getSequence(), 19001);
+    }
 };
\ No newline at end of file
@@ -0,0 +1,63 @@
+#include <cxxtest/TestSuite.h>
+#include "core/Market.h"
+#include "core/Journal.h"
+#include "core/Snapshot.h"
+#include <chrono>
+#include <filesystem>
+
+class RecoveryRegressionTestSuite : public CxxTest::TestSuite {
+private:
+    std::filesystem::path dir;
+
+    static double secondsSince(std::chrono::steady_clock::time_point start) {
+        return std::chrono::duration<double>(std::chrono::steady_clock::now() - start).count();
+    }
+
+public:
+    void setUp() {
+        dir = std::filesystem::temp_directory_path() /
+              ("recovery-test-" + trading::Order("X", trading::Side::BUY, 1, {1}).getId());
+        std::filesystem::create_directories(dir);
+    }
+
+    void tearDown() {
+        std::filesystem::remove_all(dir);
+    }
+
+    // Restoring a resting book from its snapshot must beat replaying the
+    // journal that built it, even when the journal holds nothing but adds
+    void test_SnapshotRestoreBeatsReplay() {
+        const int NUM_ORDERS = 200000;
+        const auto journal_path = (dir / "journal-1.bin").string();
+        const auto snapshot_path = (dir / "AAPL.snap").string();
+        {
+            trading::Market market;
+            trading::Journal journal(journal_path, 1);
+            for(int i = 0; i < NUM_ORDERS; i++) {
+                bool buy = i % 2 == 0;
+                trading::Order order("AAPL", buy ? trading::Side::BUY : trading::Side::SELL,
+                    100, {buy ? 10000 - (i / 2) % 1000 : 10001 + (i / 2) % 1000});
+                market.addOrder(order);
+                journal.recordAdd(order);
+            }
+            trading::saveSnapshot(market.getOrderBook("AAPL"), journal.getLastSequence(), snapshot_path);
+        }
+
+        auto start = std::chrono::steady_clock::now();
+        trading::Market replayed;
+        trading::Journal::replay(journal_path, replayed, {});
+        double replay_time = secondsSince(start);
+
+        start = std::chrono::steady_clock::now();
+        trading::Market restored;
+        auto info = trading::loadSnapshot(restored, snapshot_path);
+        double restore_time = secondsSince(start);
+
+        TS_ASSERT_EQUALS(info.order_count, NUM_ORDERS);
+        TS_ASSERT_EQUALS(restored.getOrderBook("AAPL").getBestBid()->price.value, 10000);
+        TS_ASSERT_EQUALS(restored.getOrderBook("AAPL").getBestAsk()->price.value, 10001);
+        TS_ASSERT_EQUALS(restored.getOrderBook("AAPL").getBestBid()->order_count,
+                         replayed.getOrderBook("AAPL").getBestBid()->order_count);
+        TS_ASSERT_LESS_THAN(restore_time, replay_time);
+    }
+};
\ No newline at end of file
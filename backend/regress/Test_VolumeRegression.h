@@ -1,10 +1,48 @@
 #include <cxxtest/TestSuite.h>
 #include "core/Market.h"
+#include "core/OrderBook.h"
+#include <chrono>
 
 class VolumeRegressionTestSuite : public CxxTest::TestSuite {
 private:
     trading::Market* market;
 
+    // Time one aggressive order sweeping `fills` resting orders queued at a single price
+    double timeCrowdedLevelSweep(int fills) {
+        trading::OrderBook book("AAPL");
+        for(int i = 0; i < fills; i++) {
+            book.addOrder(trading::Order("AAPL", trading::Side::SELL, 1, {150}));
+        }
+        book.addOrder(trading::Order("AAPL", trading::Side::BUY, fills, {150}));
+
+        auto start = std::chrono::steady_clock::now();
+        auto trades = book.matchOrders();
+        auto elapsed = std::chrono::steady_clock::now() - start;
+
+        TS_ASSERT_EQUALS(trades.size(), fills);
+        TS_ASSERT(!book.getBestAsk().has_value());
+        TS_ASSERT(!book.getBestBid().has_value());
+        return std::chrono::duration<double>(elapsed).count();
+    }
+
+    // Time one aggressive order sweeping `levels` deep price levels of `per_level` orders each
+    double timeDeepBookSweep(int levels, int per_level) {
+        trading::OrderBook book("AAPL");
+        for(int level = 0; level < levels; level++) {
+            for(int i = 0; i < per_level; i++) {
+                book.addOrder(trading::Order("AAPL", trading::Side::SELL, 1, {100 + level}));
+            }
+        }
+        book.addOrder(trading::Order("AAPL", trading::Side::BUY, levels * per_level, {100 + levels}));
+
+        auto start = std::chrono::steady_clock::now();
+        auto trades = book.matchOrders();
+        auto elapsed = std::chrono::steady_clock::now() - start;
+
+        TS_ASSERT_EQUALS(trades.size(), levels * per_level);
+        return std::chrono::duration<double>(elapsed).count();
+    }
+
 public:
     void setUp() { market = new trading::Market(); }
     void tearDown() { delete market; }
@@ -12,7 +50,7 @@ public:
     void test_HighFrequencyOrdering() {
         const int NUM_ORDERS = 10000;
         for(int i = 0; i < NUM_ORDERS; i++) {
-            market->addOrder(trading::Order("AAPL", trading::Side::BUY, 100, {150.0}));
+            market->addOrder(trading::Order("AAPL", trading::Side::BUY, 100, {150}));
         }
         TS_ASSERT_EQUALS(market->getOrderBook("AAPL").getOrders().size(), NUM_ORDERS);
     }
@@ -21,8 +59,8 @@ public:
         std::vector<std::string> symbols = {"AAPL", "MSFT", "GOOG", "AMZN"};
         for(const auto& sym : symbols) {
             for(int i = 0; i < 1000; i++) {
-                market->addOrder(trading::Order(sym, trading::Side::BUY, 100, {100.0}));
-                market->addOrder(trading::Order(sym, trading::Side::SELL, 100, {100.0}));
+                market->addOrder(trading::Order(sym, trading::Side::BUY, 100, {100}));
+                market->addOrder(trading::Order(sym, trading::Side::SELL, 100, {100}));
             }
         }
         for(const auto& sym : symbols) {
@@ -30,4 +68,32 @@ public:
             TS_ASSERT_EQUALS(trades.size(), 1000);
         }
     }
+
+    void test_CrowdedLevelMatchingIsLinear() {
+        // 8x the fills must cost well under the 64x a quadratic queue would
+        double small = timeCrowdedLevelSweep(25000);
+        double large = timeCrowdedLevelSweep(200000);
+        TS_ASSERT_LESS_THAN(large, small * 24);
+    }
+
+    void test_DeepBookMatchingIsLinear() {
+        double small = timeDeepBookSweep(250, 100);
+        double large = timeDeepBookSweep(2000, 100);
+        TS_ASSERT_LESS_THAN(large, small * 24);
+    }
+
+    void test_PartialFillsAcrossCrowdedLevel() {
+        const int NUM_ORDERS = 10000;
+        for(int i = 0; i < NUM_ORDERS; i++) {
+            market->addOrder(trading::Order("AAPL", trading::Side::SELL, 10, {150}));
+        }
+        // Each buy takes half of the order at the head of the queue
+        for(int i = 0; i < 2 * NUM_ORDERS; i++) {
+            market->addOrder(trading::Order("AAPL", trading::Side::BUY, 5, {150}));
+            auto trades = market->matchOrders("AAPL");
+            TS_ASSERT_EQUALS(trades.size(), 1);
+        }
+        TS_ASSERT(!market->getOrderBook("AAPL").getBestAsk().has_value());
+        TS_ASSERT_EQUALS(market->getTradesForSymbol("AAPL").size(), 2 * NUM_ORDERS);
+    }
 };
\ No newline at end of file
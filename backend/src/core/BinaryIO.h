@@ -0,0 +1,126 @@
+#pragma once
+#include <cstdint>
+#include <cstdio>
+#include <cstring>
+#include <stdexcept>
+#include <string>
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+// Little helpers shared by the journal and snapshot formats. Values are
+// written in host byte order; files are not meant to move between machines.
+namespace trading {
+namespace binary_io {
+
+class Writer {
+public:
+    explicit Writer(std::string& out) : out_(out) {}
+
+    template <typename T>
+    void put(T value) {
+        out_.append(reinterpret_cast<const char*>(&value), sizeof(T));
+    }
+
+    void putString(const std::string& value) {
+        if (value.size() > UINT16_MAX) {
+            throw std::invalid_argument("String too long to encode");
+        }
+        put<uint16_t>(static_cast<uint16_t>(value.size()));
+        out_.append(value);
+    }
+
+private:
+    std::string& out_;
+};
+
+// Bounds-checked cursor over a byte range; every read reports whether the
+// range still held enough bytes, so torn tails can be detected
+class Reader {
+public:
+    Reader(const char* data, size_t size) : data_(data), size_(size) {}
+
+    template <typename T>
+    bool get(T& value) {
+        if (size_ - pos_ < sizeof(T)) {
+            return false;
+        }
+        std::memcpy(&value, data_ + pos_, sizeof(T));
+        pos_ += sizeof(T);
+        return true;
+    }
+
+    bool getString(std::string& value) {
+        uint16_t length;
+        if (!get(length) || size_ - pos_ < length) {
+            return false;
+        }
+        value.assign(data_ + pos_, length);
+        pos_ += length;
+        return true;
+    }
+
+    bool skip(size_t bytes) {
+        if (size_ - pos_ < bytes) {
+            return false;
+        }
+        pos_ += bytes;
+        return true;
+    }
+
+    size_t position() const { return pos_; }
+    size_t remaining() const { return size_ - pos_; }
+    const char* current() const { return data_ + pos_; }
+
+private:
+    const char* data_;
+    size_t size_;
+    size_t pos_ = 0;
+};
+
+// Read-only memory mapping of a whole file
+class MappedFile {
+public:
+    explicit MappedFile(const std::string& path) {
+        int fd = ::open(path.c_str(), O_RDONLY);
+        if (fd < 0) {
+            throw std::runtime_error("Failed to open " + path);
+        }
+        struct stat st;
+        if (::fstat(fd, &st) != 0) {
+            ::close(fd);
+            throw std::runtime_error("Failed to stat " + path);
+        }
+        size_ = static_cast<size_t>(st.st_size);
+        if (size_ > 0) {
+            void* mapped = ::mmap(nullptr, size_, PROT_READ, MAP_PRIVATE, fd, 0);
+            if (mapped == MAP_FAILED) {
+                ::close(fd);
+                throw std::runtime_error("Failed to map " + path);
+            }
+            ::madvise(mapped, size_, MADV_SEQUENTIAL);
+            data_ = static_cast<const char*>(mapped);
+        }
+        ::close(fd);
+    }
+
+    ~MappedFile() {
+        if (data_) {
+            ::munmap(const_cast<char*>(data_), size_);
+        }
+    }
+
+    MappedFile(const MappedFile&) = delete;
+    MappedFile& operator=(const MappedFile&) = delete;
+
+    const char* data() const { return data_; }
+    size_t size() const { return size_; }
+
+private:
+    const char* data_ = nullptr;
+    size_t size_ = 0;
+};
+
+}
+}
\ No newline at end of file
@@ -0,0 +1,51 @@
+#include "core/EventQueue.h"
+#include <algorithm>
+#include <stdexcept>
+
+namespace trading {
+
+EventQueue::EventQueue(size_t capacity)
+    : capacity_(capacity)
+{
+    if (capacity_ == 0) {
+        throw std::invalid_argument("Event queue capacity must be greater than 0");
+    }
+}
+
+EventSequence EventQueue::push(MarketEvent event) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    EventSequence sequence = next_sequence_++;
+    event.sequence = sequence;
+    if (events_.size() == capacity_) {
+        events_.pop_front();
+        dropped_++;
+    }
+    events_.push_back(std::move(event));
+    return sequence;
+}
+
+std::vector<MarketEvent> EventQueue::drain(size_t max_events) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    size_t count = std::min(max_events, events_.size());
+    std::vector<MarketEvent> drained(std::make_move_iterator(events_.begin()),
+                                     std::make_move_iterator(events_.begin() + count));
+    events_.erase(events_.begin(), events_.begin() + count);
+    return drained;
+}
+
+size_t EventQueue::size() const {
+    std::lock_guard<std::mutex> lock(mutex_);
+    return events_.size();
+}
+
+EventSequence EventQueue::getLastSequence() const {
+    std::lock_guard<std::mutex> lock(mutex_);
+    return next_sequence_ - 1;
+}
+
+uint64_t EventQueue::getDroppedCount() const {
+    std::lock_guard<std::mutex> lock(mutex_);
+    return dropped_;
+}
+
+}
\ No newline at end of file
@@ -0,0 +1,160 @@
+#include "core/Journal.h"
+#include "core/Market.h"
+#include "BinaryIO.h"
+#include <stdexcept>
+
+namespace trading {
+
+namespace {
+const char JOURNAL_MAGIC[4] = {'T', 'E', 'J', '1'};
+
+enum class RecordType : uint8_t {
+    ADD = 1,
+    CANCEL = 2
+};
+
+// Record layout: u32 body length, then the body:
+//   u8 type, u64 sequence, symbol, order id
+//   ADD only: u8 side, i64 quantity, i64 price
+// Strings are a u16 length followed by the bytes.
+std::string encodeBody(RecordType type, JournalSequence sequence,
+                       const Symbol& symbol, const OrderId& orderId) {
+    std::string body;
+    binary_io::Writer writer(body);
+    writer.put<uint8_t>(static_cast<uint8_t>(type));
+    writer.put<uint64_t>(sequence);
+    writer.putString(symbol);
+    writer.putString(orderId);
+    return body;
+}
+}
+
+Journal::Journal(const std::string& path, JournalSequence next_sequence)
+    : next_sequence_(next_sequence)
+{
+    if (next_sequence_ == 0) {
+        throw std::invalid_argument("Journal sequences start at 1");
+    }
+    open(path);
+}
+
+Journal::~Journal() {
+    if (file_) {
+        std::fclose(file_);
+    }
+}
+
+void Journal::open(const std::string& path) {
+    std::FILE* file = std::fopen(path.c_str(), "wbx");
+    if (!file) {
+        throw std::runtime_error("Failed to create journal " + path);
+    }
+    if (std::fwrite(JOURNAL_MAGIC, 1, sizeof(JOURNAL_MAGIC), file) != sizeof(JOURNAL_MAGIC) ||
+        std::fflush(file) != 0) {
+        std::fclose(file);
+        throw std::runtime_error("Failed to write journal " + path);
+    }
+    if (file_) {
+        std::fclose(file_);
+    }
+    file_ = file;
+    path_ = path;
+}
+
+JournalSequence Journal::recordAdd(const Order& order) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    std::string body = encodeBody(RecordType::ADD, next_sequence_, order.getSymbol(), order.getId());
+    binary_io::Writer writer(body);
+    writer.put<uint8_t>(order.getSide() == Side::BUY ? 0 : 1);
+    writer.put<int64_t>(order.getQuantity());
+    writer.put<int64_t>(order.getPrice().value);
+    return append(body);
+}
+
+JournalSequence Journal::recordCancel(const Symbol& symbol, const OrderId& orderId) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    return append(encodeBody(RecordType::CANCEL, next_sequence_, symbol, orderId));
+}
+
+// Callers must hold mutex_
+JournalSequence Journal::append(const std::string& body) {
+    std::string record;
+    binary_io::Writer writer(record);
+    writer.put<uint32_t>(static_cast<uint32_t>(body.size()));
+    record.append(body);
+
+    if (std::fwrite(record.data(), 1, record.size(), file_) != record.size() ||
+        std::fflush(file_) != 0) {
+        throw std::runtime_error("Failed to write journal " + path_);
+    }
+    return next_sequence_++;
+}
+
+void Journal::rotate(const std::string& path) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    open(path);
+}
+
+JournalSequence Journal::getLastSequence() const {
+    std::lock_guard<std::mutex> lock(mutex_);
+    return next_sequence_ - 1;
+}
+
+std::string Journal::getPath() const {
+    std::lock_guard<std::mutex> lock(mutex_);
+    return path_;
+}
+
+JournalSequence Journal::replay(const std::string& path, Market& market,
+                                const std::unordered_map<Symbol, JournalSequence>& covered) {
+    binary_io::MappedFile file(path);
+    binary_io::Reader reader(file.data(), file.size());
+    if (!reader.skip(sizeof(JOURNAL_MAGIC)) ||
+        std::memcmp(file.data(), JOURNAL_MAGIC, sizeof(JOURNAL_MAGIC)) != 0) {
+        throw std::runtime_error("Not a journal file: " + path);
+    }
+
+    JournalSequence last = 0;
+    uint32_t length;
+    while (reader.get(length) && reader.remaining() >= length) {
+        binary_io::Reader body(reader.current(), length);
+        reader.skip(length);
+
+        uint8_t type;
+        JournalSequence sequence;
+        Symbol symbol;
+        OrderId orderId;
+        if (!body.get(type) || !body.get(sequence) ||
+            !body.getString(symbol) || !body.getString(orderId)) {
+            throw std::runtime_error("Corrupt journal record in " + path);
+        }
+        last = sequence;
+
+        auto it = covered.find(symbol);
+        if (it != covered.end() && sequence <= it->second) {
+            continue;
+        }
+
+        try {
+            if (type == static_cast<uint8_t>(RecordType::ADD)) {
+                uint8_t side;
+                int64_t quantity, price;
+                if (!body.get(side) || !body.get(quantity) || !body.get(price)) {
+                    throw std::runtime_error("Corrupt journal record in " + path);
+                }
+                market.addOrder(Order(symbol, side == 0 ? Side::BUY : Side::SELL,
+                                      quantity, Price{price}, orderId));
+                market.matchOrders(symbol);
+            } else if (type == static_cast<uint8_t>(RecordType::CANCEL)) {
+                market.cancelOrder(orderId);
+            } else {
+                throw std::runtime_error("Unknown journal record type in " + path);
+            }
+        } catch (const std::invalid_argument&) {
+            // Rejected by the engine when first applied as well
+        }
+    }
+    return last;
+}
+
+}
\ No newline at end of file
@@ -1,57 +1,172 @@
 #include "core/Market.h"
 #include <stdexcept>
+#include <unordered_set>
 
 namespace trading {
 
-OrderBook& Market::getOrCreateOrderBook(const Symbol& symbol) {
-    auto it = order_books_.find(symbol);
-    if (it == order_books_.end()) {
-        auto [inserted_it, success] = order_books_.emplace(symbol, std::make_unique<OrderBook>(symbol));
-        return *inserted_it->second;
+Market::Market(size_t trade_history_capacity, size_t event_capacity)
+    : trade_history_capacity_(trade_history_capacity)
+{
+    if (trade_history_capacity_ == 0) {
+        throw std::invalid_argument("Trade history capacity must be greater than 0");
+    }
+    if (event_capacity > 0) {
+        events_ = std::make_unique<EventQueue>(event_capacity);
     }
-    return *it->second;
 }
 
-Position& Market::getOrCreatePosition(const Symbol& symbol) {
-    auto it = positions_.find(symbol);
-    if (it == positions_.end()) {
-        auto [inserted_it, success] = positions_.emplace(symbol, std::make_unique<Position>(symbol));
-        return *inserted_it->second;
+OrderBook& Market::getOrCreateOrderBook(const Symbol& symbol) {
+    {
+        std::shared_lock<std::shared_mutex> lock(books_mutex_);
+        auto it = order_books_.find(symbol);
+        if (it != order_books_.end()) {
+            return *it->second;
+        }
+    }
+    std::unique_lock<std::shared_mutex> lock(books_mutex_);
+    auto [it, inserted] = order_books_.try_emplace(symbol, nullptr);
+    if (inserted) {
+        it->second = std::make_unique<OrderBook>(symbol, events_.get());
+        std::lock_guard<std::mutex> history_lock(history_mutex_);
+        trades_.emplace(symbol, std::make_unique<SymbolTrades>(trade_history_capacity_));
     }
     return *it->second;
 }
 
-void Market::addOrder(const Order& order) {
-    // Validate order parameters
+Market::SymbolTrades* Market::findTrades(const Symbol& symbol) const {
+    std::lock_guard<std::mutex> lock(history_mutex_);
+    auto it = trades_.find(symbol);
+    return it == trades_.end() ? nullptr : it->second.get();
+}
+
+void Market::validateOrder(const Order& order) const {
     if (order.getQuantity() <= 0) {
         throw std::invalid_argument("Order quantity must be greater than 0");
     }
-    if (order.getPrice().value <= 0.0) {
+    if (order.getPrice().value <= 0) {
         throw std::invalid_argument("Order price must be greater than 0");
     }
     if (order.getSymbol().empty()) {
         throw std::invalid_argument("Order symbol cannot be empty");
     }
+    if (hasOrder(order.getId())) {
+        throw std::invalid_argument("Order already exists");
+    }
+}
+
+void Market::addOrder(const Order& order) {
+    validateOrder(order);
 
     auto& orderbook = getOrCreateOrderBook(order.getSymbol());
-    orderbook.addOrder(order);
+    {
+        // Claim the id first so concurrent adds of the same id cannot both succeed
+        std::lock_guard<std::mutex> lock(index_mutex_);
+        if (!order_index_.emplace(order.getId(), &orderbook).second) {
+            throw std::invalid_argument("Order already exists");
+        }
+    }
+    try {
+        orderbook.addOrder(order);
+    } catch (...) {
+        std::lock_guard<std::mutex> lock(index_mutex_);
+        order_index_.erase(order.getId());
+        throw;
+    }
+}
+
+std::vector<std::vector<Trade>> Market::addOrders(const std::vector<Order>& orders) {
+    // Reject the whole batch before touching any book
+    std::unordered_set<OrderId> batch_ids;
+    for (const auto& order : orders) {
+        validateOrder(order);
+        if (!batch_ids.insert(order.getId()).second) {
+            throw std::invalid_argument("Duplicate order id in batch");
+        }
+    }
+
+    std::vector<std::vector<Trade>> trades;
+    trades.reserve(orders.size());
+    for (const auto& order : orders) {
+        addOrder(order);
+        trades.push_back(matchOrders(order.getSymbol()));
+    }
+    return trades;
+}
+
+void Market::restoreOrders(const Symbol& symbol, std::vector<Order> orders) {
+    for (const auto& order : orders) {
+        if (order.getQuantity() <= 0 || order.getRemainingQuantity() <= 0 || order.getPrice().value <= 0) {
+            throw std::invalid_argument("Invalid order in restore");
+        }
+        if (order.getSymbol() != symbol) {
+            throw std::invalid_argument("Order symbol does not match order book");
+        }
+    }
+
+    auto& orderbook = getOrCreateOrderBook(symbol);
+    {
+        std::lock_guard<std::mutex> lock(index_mutex_);
+        order_index_.reserve(order_index_.size() + orders.size());
+        for (size_t i = 0; i < orders.size(); ++i) {
+            if (!order_index_.emplace(orders[i].getId(), &orderbook).second) {
+                while (i-- > 0) {
+                    order_index_.erase(orders[i].getId());
+                }
+                throw std::invalid_argument("Order already exists");
+            }
+        }
+    }
+    orderbook.restoreOrders(std::move(orders));
 }
 
 void Market::cancelOrder(const OrderId& orderId) {
-    for (auto& [symbol, orderbook] : order_books_) {
-        if (orderbook->hasOrder(orderId)) {
-            orderbook->cancelOrder(orderId);
-            return;
+    OrderBook* orderbook;
+    {
+        std::lock_guard<std::mutex> lock(index_mutex_);
+        auto it = order_index_.find(orderId);
+        if (it == order_index_.end()) {
+            throw std::invalid_argument("Order not found");
+        }
+        orderbook = it->second;
+    }
+    orderbook->cancelOrder(orderId);
+
+    std::lock_guard<std::mutex> lock(index_mutex_);
+    order_index_.erase(orderId);
+}
+
+bool Market::hasOrder(const OrderId& orderId) const {
+    std::lock_guard<std::mutex> lock(index_mutex_);
+    return order_index_.find(orderId) != order_index_.end();
+}
+
+Order Market::getOrder(const OrderId& orderId) const {
+    OrderBook* orderbook;
+    {
+        std::lock_guard<std::mutex> lock(index_mutex_);
+        auto it = order_index_.find(orderId);
+        if (it == order_index_.end()) {
+            throw std::invalid_argument("Order not found");
         }
+        orderbook = it->second;
+    }
+    return orderbook->getOrder(orderId);
+}
+
+void Market::createOrderBook(const Symbol& symbol) {
+    if (symbol.empty()) {
+        throw std::invalid_argument("Order book symbol cannot be empty");
     }
-    throw std::invalid_argument("Order not found");
+    getOrCreateOrderBook(symbol);
 }
 
 bool Market::hasOrderBook(const Symbol& symbol) const {
+    std::shared_lock<std::shared_mutex> lock(books_mutex_);
     return order_books_.find(symbol) != order_books_.end();
 }
 
 const OrderBook& Market::getOrderBook(const Symbol& symbol) const {
+    std::shared_lock<std::shared_mutex> lock(books_mutex_);
     auto it = order_books_.find(symbol);
     if (it == order_books_.end()) {
         throw std::invalid_argument("OrderBook not found for symbol");
@@ -65,51 +180,99 @@ OrderBook& Market::getOrderBook(const Symbol& symbol) {
 }
 
 std::vector<Trade> Market::getTradesForSymbol(const Symbol& symbol) const {
-    auto it = trades_.find(symbol);
-    if (it == trades_.end()) {
+    auto* trades = findTrades(symbol);
+    if (!trades) {
         return std::vector<Trade>();
     }
-    return it->second;
+    std::lock_guard<std::mutex> lock(trades->mutex);
+    return trades->history.all();
 }
 
-Position& Market::getPosition(const Symbol& symbol) {
-    return getOrCreatePosition(symbol);
+std::vector<Trade> Market::getTradesSince(const Symbol& symbol, TradeSequence sequence, size_t limit) const {
+    auto* trades = findTrades(symbol);
+    if (!trades) {
+        return std::vector<Trade>();
+    }
+    std::lock_guard<std::mutex> lock(trades->mutex);
+    return trades->history.since(sequence, limit);
 }
 
-const Position& Market::getPosition(const Symbol& symbol) const {
-    auto it = positions_.find(symbol);
-    if (it == positions_.end()) {
-        throw std::invalid_argument("Position not found for symbol");
+TradeSequence Market::getLastTradeSequence(const Symbol& symbol) const {
+    auto* trades = findTrades(symbol);
+    if (!trades) {
+        return 0;
     }
-    return *it->second;
+    std::lock_guard<std::mutex> lock(trades->mutex);
+    return trades->history.getLastSequence();
 }
 
-std::vector<Position> Market::getAllPositions() const {
-    std::vector<Position> positions;
-    for (const auto& [symbol, position] : positions_) {
-        positions.push_back(*position);
+std::vector<TradeRecord> Market::getTradeRecords(const Symbol& symbol) const {
+    std::vector<TradeRecord> records;
+    auto* trades = findTrades(symbol);
+    if (!trades) {
+        return records;
     }
-    return positions;
+    std::lock_guard<std::mutex> lock(trades->mutex);
+    records.reserve(trades->history.size());
+    trades->history.forEach([&records](const Trade& trade) {
+        records.push_back(trade.toRecord());
+    });
+    return records;
+}
+
+MarketSnapshot Market::getSnapshot(const Symbol& symbol, size_t levels, size_t trade_count) const {
+    const auto& orderbook = getOrderBook(symbol);
+    auto* trades = findTrades(symbol);
+
+    MarketSnapshot snapshot;
+    std::lock_guard<std::mutex> lock(trades->mutex);
+    snapshot.depth = orderbook.getDepth(levels);
+    TradeSequence last = trades->history.getLastSequence();
+    snapshot.trades = trades->history.since(last > trade_count ? last - trade_count : 0, trade_count);
+    return snapshot;
 }
 
 std::vector<Trade> Market::matchOrders(const Symbol& symbol) {
     auto& orderbook = getOrCreateOrderBook(symbol);
-    auto new_trades = orderbook.matchOrders();
-    
-    // Update positions and trade history
+    auto* trades = findTrades(symbol);
+    std::vector<Trade> new_trades;
+    {
+        std::lock_guard<std::mutex> lock(trades->mutex);
+        new_trades = orderbook.matchOrders();
+        for (auto& trade : new_trades) {
+            trade.setSequence(trades->history.append(trade));
+        }
+    }
+    if (new_trades.empty()) {
+        return new_trades;
+    }
+
+    // Drop fully filled orders from the index
     for (const auto& trade : new_trades) {
-        auto& position = getOrCreatePosition(symbol);
-        // Create buy and sell orders using correct constructor
-        Order buyOrder(symbol, Side::BUY, trade.getQuantity(), trade.getPrice());
-        Order sellOrder(symbol, Side::SELL, trade.getQuantity(), trade.getPrice());
-        
-        position.updatePosition(buyOrder);
-        position.updatePosition(sellOrder);
-        
-        trades_[symbol].push_back(trade);
+        for (const auto& orderId : {trade.getBuyOrderId(), trade.getSellOrderId()}) {
+            if (!orderbook.hasOrder(orderId)) {
+                std::lock_guard<std::mutex> lock(index_mutex_);
+                order_index_.erase(orderId);
+            }
+        }
     }
     
     return new_trades;
 }
 
+std::vector<MarketEvent> Market::drainEvents(size_t max_events) {
+    if (!events_) {
+        return std::vector<MarketEvent>();
+    }
+    return events_->drain(max_events);
+}
+
+EventSequence Market::getLastEventSequence() const {
+    return events_ ? events_->getLastSequence() : 0;
+}
+
+uint64_t Market::getDroppedEventCount() const {
+    return events_ ? events_->getDroppedCount() : 0;
+}
+
 }
\ No newline at end of file
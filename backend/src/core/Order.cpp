@@ -1,6 +1,7 @@
 #include "core/Order.h"
 #include <chrono>
 #include <uuid/uuid.h>
+#include <stdexcept>
 
 namespace trading {
 
@@ -15,13 +16,32 @@ std::string generateOrderId() {
 }
 
 Order::Order(const std::string& symbol, Side side, Quantity qty, Price price)
-    : symbol_(symbol)
+    : Order(symbol, side, qty, price, generateOrderId())
+{}
+
+Order::Order(const std::string& symbol, Side side, Quantity qty, Price price, const OrderId& id)
+    : id_(id)
+    , symbol_(symbol)
     , side_(side)
     , quantity_(qty)
+    , remaining_quantity_(qty)
     , price_(price)
     , status_(OrderStatus::NEW)
-    , id_(generateOrderId())
     , created_at_(std::chrono::system_clock::now().time_since_epoch().count())
-{}
+{
+    if (id_.empty()) {
+        throw std::invalid_argument("Order id cannot be empty");
+    }
+}
+
+void Order::fill(Quantity qty) {
+    if (qty <= 0 || qty > remaining_quantity_) {
+        throw std::invalid_argument("Fill quantity exceeds remaining quantity");
+    }
+    remaining_quantity_ -= qty;
+    if (remaining_quantity_ == 0) {
+        status_ = OrderStatus::FILLED;
+    }
+}
 
 }
\ No newline at end of file
@@ -4,103 +4,312 @@
 #include <unordered_map>
 #include <stdexcept>
 #include <algorithm>
+#include <chrono>
 
 namespace trading {
 
-OrderBook::OrderBook(const Symbol& symbol)
+namespace {
+template <typename Levels>
+std::vector<PriceLevel> topLevels(const Levels& levels, size_t count) {
+    std::vector<PriceLevel> top;
+    top.reserve(std::min(count, levels.size()));
+    for (auto it = levels.begin(); it != levels.end() && top.size() < count; ++it) {
+        top.push_back(it->second.summary);
+    }
+    return top;
+}
+
+template <typename Levels>
+void appendRecords(std::vector<DepthRecord>& records, const Levels& levels, size_t count, int8_t side) {
+    for (auto it = levels.begin(); it != levels.end() && count > 0; ++it, --count) {
+        const PriceLevel& level = it->second.summary;
+        records.push_back(DepthRecord{level.price.value, level.quantity,
+                                      static_cast<int64_t>(level.order_count), side});
+    }
+}
+}
+
+namespace {
+Timestamp now() {
+    return std::chrono::system_clock::now().time_since_epoch().count();
+}
+}
+
+OrderBook::OrderBook(const Symbol& symbol, EventQueue* events)
     : symbol_(symbol)
+    , events_(events)
 {}
 
+void OrderBook::recordOrder(EventType type, const Order& order) {
+    events_->push(MarketEvent{0, type, symbol_, order.getSide(), order.getPrice(),
+                              order.getRemainingQuantity(), 0, order.getId(), now()});
+}
+
+void OrderBook::recordLevel(Side side, Price price) {
+    PriceLevel summary{price, 0, 0};
+    if (side == Side::BUY) {
+        auto it = bids_.find(price);
+        if (it != bids_.end()) {
+            summary = it->second.summary;
+        }
+    } else {
+        auto it = asks_.find(price);
+        if (it != asks_.end()) {
+            summary = it->second.summary;
+        }
+    }
+    events_->push(MarketEvent{0, EventType::LEVEL_UPDATE, symbol_, side, price,
+                              summary.quantity, summary.order_count, OrderId(), now()});
+}
+
+template <typename Levels>
+void OrderBook::enqueue(Levels& levels, OrderNode& node) {
+    const Price price = node.order.getPrice();
+    auto [it, inserted] = levels.try_emplace(price, Level{PriceLevel{price, 0, 0}, nullptr, nullptr});
+    Level& level = it->second;
+
+    node.level = &level;
+    node.prev = level.tail;
+    node.next = nullptr;
+    if (level.tail) {
+        level.tail->next = &node;
+    } else {
+        level.head = &node;
+    }
+    level.tail = &node;
+
+    level.summary.quantity += node.order.getRemainingQuantity();
+    level.summary.order_count++;
+}
+
+template <typename Levels>
+void OrderBook::unlink(Levels& levels, OrderNode& node) {
+    Level& level = *node.level;
+
+    if (node.prev) {
+        node.prev->next = node.next;
+    } else {
+        level.head = node.next;
+    }
+    if (node.next) {
+        node.next->prev = node.prev;
+    } else {
+        level.tail = node.prev;
+    }
+
+    level.summary.quantity -= node.order.getRemainingQuantity();
+    if (--level.summary.order_count == 0) {
+        levels.erase(level.summary.price);
+    }
+}
+
 void OrderBook::addOrder(const Order& order) {
-    auto [it, success] = orders_.emplace(order.getId(), order);
+    std::lock_guard<std::mutex> lock(mutex_);
+    auto [it, success] = orders_.emplace(order.getId(), OrderNode{order, next_sequence_, nullptr, nullptr, nullptr});
     if (!success) {
         throw std::invalid_argument("Order already exists");
     }
-    Order& stored_order = it->second;
+    next_sequence_++;
+
+    OrderNode& node = it->second;
     if (order.getSide() == Side::BUY) {
-        bids_.insert({order.getPrice(), std::ref(stored_order)});
+        enqueue(bids_, node);
     } else {
-        asks_.insert({order.getPrice(), std::ref(stored_order)});
+        enqueue(asks_, node);
+    }
+
+    if (events_) {
+        recordOrder(EventType::ORDER_ADDED, order);
+        recordLevel(order.getSide(), order.getPrice());
     }
+    bumpVersion();
 }
 
 void OrderBook::cancelOrder(const OrderId& orderId) {
-    if (orders_.find(orderId) == orders_.end()) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    auto it = orders_.find(orderId);
+    if (it == orders_.end()) {
         throw std::invalid_argument("Order does not exist");
     }
+    if (events_) {
+        recordOrder(EventType::ORDER_REMOVED, it->second.order);
+    }
+    const Side side = it->second.order.getSide();
+    const Price price = it->second.order.getPrice();
     removeOrder(orderId);
+    if (events_) {
+        recordLevel(side, price);
+    }
+    bumpVersion();
 }
 
 void OrderBook::removeOrder(const OrderId& orderId) {
-    const Order& order = orders_.at(orderId);
-    if (order.getSide() == Side::BUY) {
-        auto range = bids_.equal_range(order.getPrice());
-        for (auto it = range.first; it != range.second; ++it) {
-            if (it->second.get().getId() == orderId) {
-                bids_.erase(it);
-                break;
-            }
-        }
+    auto it = orders_.find(orderId);
+    OrderNode& node = it->second;
+    if (node.order.getSide() == Side::BUY) {
+        unlink(bids_, node);
     } else {
-        auto range = asks_.equal_range(order.getPrice());
-        for (auto it = range.first; it != range.second; ++it) {
-            if (it->second.get().getId() == orderId) {
-                asks_.erase(it);
-                break;
-            }
-        }
+        unlink(asks_, node);
     }
-    orders_.erase(orderId);
+    orders_.erase(it);
 }
 
 std::vector<Trade> OrderBook::matchOrders() {
+    std::lock_guard<std::mutex> lock(mutex_);
     std::vector<Trade> new_trades;
     
     while (!bids_.empty() && !asks_.empty()) {
-        auto bid_it = bids_.begin();
-        auto ask_it = asks_.begin();
+        Level& bid_level = bids_.begin()->second;
+        Level& ask_level = asks_.begin()->second;
         
-        if (bid_it->first.value < ask_it->first.value) {
+        if (bid_level.summary.price.value < ask_level.summary.price.value) {
             break;
         }
         
-        Order& bid = bid_it->second.get();
-        Order& ask = ask_it->second.get();
+        OrderNode& bid = *bid_level.head;
+        OrderNode& ask = *ask_level.head;
+        
+        // The order that arrived first was resting and sets the price
+        bool bid_resting = bid.sequence < ask.sequence;
+        Quantity fill_qty = std::min(bid.order.getRemainingQuantity(), ask.order.getRemainingQuantity());
+        Price fill_price = bid_resting ? bid.order.getPrice() : ask.order.getPrice();
+        
+        Trade trade(bid.order, ask.order, fill_qty, fill_price, bid_resting ? Side::SELL : Side::BUY);
         
-        Trade trade(bid, ask);
+        bid.order.fill(fill_qty);
+        ask.order.fill(fill_qty);
+        bid_level.summary.quantity -= fill_qty;
+        ask_level.summary.quantity -= fill_qty;
+
+        const Price bid_price = bid_level.summary.price;
+        const Price ask_price = ask_level.summary.price;
+        if (events_) {
+            const Order& aggressor = bid_resting ? ask.order : bid.order;
+            trade.setEventSequence(events_->push(MarketEvent{0, EventType::TRADE, symbol_, aggressor.getSide(), fill_price,
+                                                             fill_qty, 0, aggressor.getId(), trade.getTimestamp()}));
+        }
         new_trades.push_back(trade);
-        trades_.push_back(trade);
         
-        Quantity matched_qty = trade.getQuantity();
-        if (bid.getQuantity() == matched_qty) {
-            removeOrder(bid.getId());
+        if (bid.order.getRemainingQuantity() == 0) {
+            if (events_) {
+                recordOrder(EventType::ORDER_REMOVED, bid.order);
+            }
+            removeOrder(bid.order.getId());
         }
-        if (ask.getQuantity() == matched_qty) {
-            removeOrder(ask.getId());
+        if (ask.order.getRemainingQuantity() == 0) {
+            if (events_) {
+                recordOrder(EventType::ORDER_REMOVED, ask.order);
+            }
+            removeOrder(ask.order.getId());
+        }
+
+        if (events_) {
+            recordLevel(Side::BUY, bid_price);
+            recordLevel(Side::SELL, ask_price);
         }
     }
-    
+
+    if (!new_trades.empty()) {
+        bumpVersion();
+    }
     return new_trades;
 }
 
+void OrderBook::restoreOrders(std::vector<Order> orders) {
+    std::lock_guard<std::mutex> lock(mutex_);
+    orders_.reserve(orders_.size() + orders.size());
+    for (auto& order : orders) {
+        OrderId id = order.getId();
+        auto [it, success] = orders_.emplace(std::move(id), OrderNode{std::move(order), next_sequence_, nullptr, nullptr, nullptr});
+        if (!success) {
+            throw std::invalid_argument("Order already exists");
+        }
+        next_sequence_++;
+
+        OrderNode& node = it->second;
+        if (node.order.getSide() == Side::BUY) {
+            enqueue(bids_, node);
+        } else {
+            enqueue(asks_, node);
+        }
+    }
+    bumpVersion();
+}
+
 bool OrderBook::hasOrder(const OrderId& orderId) const {
+    std::lock_guard<std::mutex> lock(mutex_);
     return orders_.find(orderId) != orders_.end();
 }
 
-const Order& OrderBook::getOrder(const OrderId& orderId) const {
+Order OrderBook::getOrder(const OrderId& orderId) const {
+    std::lock_guard<std::mutex> lock(mutex_);
     auto it = orders_.find(orderId);
     if (it == orders_.end()) {
         throw std::invalid_argument("Order not found");
     }
-    return it->second;
+    return it->second.order;
 }
 
 std::vector<Order> OrderBook::getOrders() const {
+    std::lock_guard<std::mutex> lock(mutex_);
     std::vector<Order> all_orders;
+    all_orders.reserve(orders_.size());
     for (const auto& pair : orders_) {
-        all_orders.push_back(pair.second);
+        all_orders.push_back(pair.second.order);
     }
     return all_orders;
 }
 
+size_t OrderBook::getOrderCount() const {
+    std::lock_guard<std::mutex> lock(mutex_);
+    return orders_.size();
+}
+
+std::vector<Order> OrderBook::getOrdersByPriority() const {
+    std::lock_guard<std::mutex> lock(mutex_);
+    std::vector<Order> ordered;
+    ordered.reserve(orders_.size());
+    auto collect = [&ordered](const auto& levels) {
+        for (const auto& [price, level] : levels) {
+            for (const OrderNode* node = level.head; node; node = node->next) {
+                ordered.push_back(node->order);
+            }
+        }
+    };
+    collect(bids_);
+    collect(asks_);
+    return ordered;
+}
+
+std::optional<PriceLevel> OrderBook::getBestBid() const {
+    std::lock_guard<std::mutex> lock(mutex_);
+    if (bids_.empty()) {
+        return std::nullopt;
+    }
+    return bids_.begin()->second.summary;
+}
+
+std::optional<PriceLevel> OrderBook::getBestAsk() const {
+    std::lock_guard<std::mutex> lock(mutex_);
+    if (asks_.empty()) {
+        return std::nullopt;
+    }
+    return asks_.begin()->second.summary;
+}
+
+BookDepth OrderBook::getDepth(size_t levels) const {
+    std::lock_guard<std::mutex> lock(mutex_);
+    return BookDepth{topLevels(bids_, levels), topLevels(asks_, levels),
+                     events_ ? events_->getLastSequence() : 0, getVersion()};
+}
+
+std::vector<DepthRecord> OrderBook::getDepthRecords(size_t levels) const {
+    std::lock_guard<std::mutex> lock(mutex_);
+    std::vector<DepthRecord> records;
+    records.reserve(std::min(levels, bids_.size()) + std::min(levels, asks_.size()));
+    appendRecords(records, bids_, levels, 0);
+    appendRecords(records, asks_, levels, 1);
+    return records;
+}
+
 }
\ No newline at end of file
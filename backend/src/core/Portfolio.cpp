@@ -0,0 +1,90 @@
+#include "core/Portfolio.h"
+#include <algorithm>
+#include <stdexcept>
+
+namespace trading {
+
+void Portfolio::applyFill(AccountPosition& position, Quantity quantity, Price price) {
+    const Quantity held = position.quantity;
+    const TickLots value = static_cast<TickLots>(std::abs(quantity)) * price.value;
+    if (held == 0 || (held > 0) == (quantity > 0)) {
+        // Opening or adding to a position
+        position.cost += value;
+    } else {
+        // Reducing, closing or reversing the position. The closed part takes
+        // its share of the cost, so closing everything takes all of it.
+        const Quantity closed = std::min(std::abs(held), std::abs(quantity));
+        const TickLots closed_cost = position.cost * closed / std::abs(held);
+        const TickLots proceeds = static_cast<TickLots>(closed) * price.value;
+        position.realized_pnl += static_cast<int64_t>(held > 0 ? proceeds - closed_cost : closed_cost - proceeds);
+        position.cost -= closed_cost;
+        if (std::abs(quantity) > closed) {
+            // What is left over opened a position the other way at this price
+            position.cost = static_cast<TickLots>(std::abs(quantity) - closed) * price.value;
+        }
+    }
+
+    position.quantity += quantity;
+    const Quantity open = std::abs(position.quantity);
+    position.average_price.value = open == 0 ? 0 : static_cast<int64_t>((position.cost + open / 2) / open);
+}
+
+void Portfolio::applyTrade(const Symbol& symbol, AccountId buyer, AccountId seller,
+                           Quantity quantity, Price price) {
+    if (quantity <= 0) {
+        throw std::invalid_argument("Trade quantity must be greater than 0");
+    }
+    if (price.value <= 0) {
+        throw std::invalid_argument("Trade price must be greater than 0");
+    }
+
+    std::lock_guard<std::mutex> lock(mutex_);
+    auto& bought = accounts_[buyer].try_emplace(symbol).first->second;
+    bought.symbol = symbol;
+    applyFill(bought, quantity, price);
+
+    auto& sold = accounts_[seller].try_emplace(symbol).first->second;
+    sold.symbol = symbol;
+    applyFill(sold, -quantity, price);
+
+    last_prices_[symbol] = price;
+}
+
+std::vector<AccountPosition> Portfolio::getPositions(AccountId account) const {
+    std::lock_guard<std::mutex> lock(mutex_);
+    std::vector<AccountPosition> positions;
+    auto it = accounts_.find(account);
+    if (it == accounts_.end()) {
+        return positions;
+    }
+
+    positions.reserve(it->second.size());
+    for (const auto& [symbol, position] : it->second) {
+        positions.push_back(position);
+        auto last = last_prices_.find(symbol);
+        if (last != last_prices_.end()) {
+            const TickLots marked = static_cast<TickLots>(position.quantity) * last->second.value;
+            positions.back().unrealized_pnl =
+                static_cast<int64_t>(position.quantity > 0 ? marked - position.cost : marked + position.cost);
+        }
+    }
+    std::sort(positions.begin(), positions.end(),
+              [](const AccountPosition& a, const AccountPosition& b) { return a.symbol < b.symbol; });
+    return positions;
+}
+
+std::optional<Price> Portfolio::getLastPrice(const Symbol& symbol) const {
+    std::lock_guard<std::mutex> lock(mutex_);
+    auto it = last_prices_.find(symbol);
+    if (it == last_prices_.end()) {
+        return std::nullopt;
+    }
+    return it->second;
+}
+
+size_t Portfolio::getAccountCount() const {
+    std::lock_guard<std::mutex> lock(mutex_);
+    return accounts_.size();
+}
+
+}
\ No newline at end of file
@@ -16,16 +16,20 @@ void Position::updatePosition(const Order& order) {
         return;
     }
 
-    // Calculate position update
-    if (order.getSide() == Side::BUY) {
-        double total_value = quantity_ * avg_price_.value;
-        total_value += order.getQuantity() * order.getPrice().value;
-        quantity_ += order.getQuantity();
+    applyFill(order.getSide(), order.getQuantity(), order.getPrice());
+}
+
+void Position::applyFill(Side side, Quantity quantity, Price price) {
+    if (side == Side::BUY) {
+        int64_t total_value = quantity_ * avg_price_.value;
+        total_value += quantity * price.value;
+        quantity_ += quantity;
         if (quantity_ > 0) {
-            avg_price_.value = total_value / quantity_;
+            // Round the average to the nearest tick
+            avg_price_.value = (total_value + quantity_ / 2) / quantity_;
         }
     } else { // SELL
-        quantity_ -= order.getQuantity();
+        quantity_ -= quantity;
         // Average price stays the same on sells until position is closed
         if (quantity_ == 0) {
             avg_price_.value = 0;
@@ -0,0 +1,84 @@
+#include "core/Snapshot.h"
+#include "core/Market.h"
+#include "BinaryIO.h"
+#include <cstdio>
+#include <stdexcept>
+
+namespace trading {
+
+namespace {
+const char SNAPSHOT_MAGIC[4] = {'T', 'E', 'S', '1'};
+
+// Layout: magic, symbol, u64 journal sequence, u64 order count, then per
+// order: u8 side, i64 quantity, i64 remaining quantity, i64 price, order id.
+// Strings are a u16 length followed by the bytes.
+}
+
+void saveSnapshot(const OrderBook& book, JournalSequence sequence, const std::string& path) {
+    std::vector<Order> orders = book.getOrdersByPriority();
+
+    std::string data;
+    data.reserve(64 + orders.size() * 64);
+    data.append(SNAPSHOT_MAGIC, sizeof(SNAPSHOT_MAGIC));
+    binary_io::Writer writer(data);
+    writer.putString(book.getSymbol());
+    writer.put<uint64_t>(sequence);
+    writer.put<uint64_t>(orders.size());
+    for (const auto& order : orders) {
+        writer.put<uint8_t>(order.getSide() == Side::BUY ? 0 : 1);
+        writer.put<int64_t>(order.getQuantity());
+        writer.put<int64_t>(order.getRemainingQuantity());
+        writer.put<int64_t>(order.getPrice().value);
+        writer.putString(order.getId());
+    }
+
+    const std::string tmp_path = path + ".tmp";
+    std::FILE* file = std::fopen(tmp_path.c_str(), "wb");
+    if (!file) {
+        throw std::runtime_error("Failed to create snapshot " + tmp_path);
+    }
+    bool ok = std::fwrite(data.data(), 1, data.size(), file) == data.size() &&
+              std::fflush(file) == 0 &&
+              ::fsync(fileno(file)) == 0;
+    ok = (std::fclose(file) == 0) && ok;
+    if (!ok || std::rename(tmp_path.c_str(), path.c_str()) != 0) {
+        std::remove(tmp_path.c_str());
+        throw std::runtime_error("Failed to write snapshot " + path);
+    }
+}
+
+SnapshotInfo loadSnapshot(Market& market, const std::string& path) {
+    binary_io::MappedFile file(path);
+    binary_io::Reader reader(file.data(), file.size());
+
+    SnapshotInfo info;
+    uint64_t count;
+    if (!reader.skip(sizeof(SNAPSHOT_MAGIC)) ||
+        std::memcmp(file.data(), SNAPSHOT_MAGIC, sizeof(SNAPSHOT_MAGIC)) != 0 ||
+        !reader.getString(info.symbol) || !reader.get(info.sequence) || !reader.get(count)) {
+        throw std::runtime_error("Not a snapshot file: " + path);
+    }
+
+    std::vector<Order> orders;
+    orders.reserve(count);
+    for (uint64_t i = 0; i < count; ++i) {
+        uint8_t side;
+        int64_t quantity, remaining, price;
+        OrderId orderId;
+        if (!reader.get(side) || !reader.get(quantity) || !reader.get(remaining) ||
+            !reader.get(price) || !reader.getString(orderId)) {
+            throw std::runtime_error("Truncated snapshot file: " + path);
+        }
+        Order order(info.symbol, side == 0 ? Side::BUY : Side::SELL, quantity, Price{price}, orderId);
+        if (remaining < quantity) {
+            order.fill(quantity - remaining);
+        }
+        orders.push_back(std::move(order));
+    }
+
+    info.order_count = orders.size();
+    market.restoreOrders(info.symbol, std::move(orders));
+    return info;
+}
+
+}
\ No newline at end of file
@@ -5,12 +5,21 @@
 namespace trading {
 
 Trade::Trade(const Order& buyOrder, const Order& sellOrder) 
+    : Trade(buyOrder, sellOrder, buyOrder.getQuantity(), buyOrder.getPrice())
+{}
+
+Trade::Trade(const Order& buyOrder, const Order& sellOrder, Quantity quantity, Price price)
+    : Trade(buyOrder, sellOrder, quantity, price, Side::BUY)
+{}
+
+Trade::Trade(const Order& buyOrder, const Order& sellOrder, Quantity quantity, Price price, Side aggressor)
     : buy_order_id_(buyOrder.getId())
     , sell_order_id_(sellOrder.getId())
     , symbol_(buyOrder.getSymbol())
-    , quantity_(buyOrder.getQuantity())
-    , price_(buyOrder.getPrice())
+    , quantity_(quantity)
+    , price_(price)
     , timestamp_(std::chrono::system_clock::now().time_since_epoch().count())
+    , aggressor_(aggressor)
 {
     if (buyOrder.getSymbol() != sellOrder.getSymbol()) {
         throw std::invalid_argument("Orders must have matching symbols");
@@ -22,4 +31,9 @@ Trade::Trade(const Order& buyOrder, const Order& sellOrder)
         throw std::invalid_argument("Buy price must be >= sell price");
     }
 }
+
+TradeRecord Trade::toRecord() const {
+    return TradeRecord{sequence_, price_.value, quantity_, timestamp_,
+                       static_cast<int8_t>(aggressor_ == Side::BUY ? 0 : 1)};
+}
 }
\ No newline at end of file
@@ -0,0 +1,44 @@
+#include "core/TradeHistory.h"
+#include <algorithm>
+#include <stdexcept>
+
+namespace trading {
+
+TradeHistory::TradeHistory(size_t capacity)
+    : capacity_(capacity)
+{
+    if (capacity_ == 0) {
+        throw std::invalid_argument("Trade history capacity must be greater than 0");
+    }
+}
+
+TradeSequence TradeHistory::append(Trade trade) {
+    TradeSequence sequence = next_sequence_++;
+    trade.setSequence(sequence);
+    if (buffer_.size() < capacity_) {
+        buffer_.push_back(std::move(trade));
+    } else {
+        buffer_[(sequence - 1) % capacity_] = std::move(trade);
+    }
+    return sequence;
+}
+
+std::vector<Trade> TradeHistory::since(TradeSequence sequence, size_t limit) const {
+    std::vector<Trade> trades;
+    TradeSequence first = std::max(sequence + 1, getFirstSequence());
+    if (first >= next_sequence_) {
+        return trades;
+    }
+    TradeSequence end = first + std::min<TradeSequence>(limit, next_sequence_ - first);
+    trades.reserve(end - first);
+    for (TradeSequence seq = first; seq < end; ++seq) {
+        trades.push_back(at(seq));
+    }
+    return trades;
+}
+
+std::vector<Trade> TradeHistory::all() const {
+    return since(0, buffer_.size());
+}
+
+}
\ No newline at end of file
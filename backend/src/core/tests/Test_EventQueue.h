@@ -0,0 +1,68 @@
+#include <cxxtest/TestSuite.h>
+#include "core/EventQueue.h"
+#include <stdexcept>
+
+class EventQueueTestSuite : public CxxTest::TestSuite {
+private:
+    trading::EventQueue* queue;
+
+    trading::MarketEvent createEvent(int64_t price) {
+        return trading::MarketEvent{0, trading::EventType::LEVEL_UPDATE, "AAPL", trading::Side::BUY,
+                                    {price}, 10, 1, "", 0};
+    }
+
+public:
+    void setUp() {
+        queue = new trading::EventQueue(4);
+    }
+
+    void tearDown() {
+        delete queue;
+    }
+
+    void test_ZeroCapacity() {
+        TS_ASSERT_THROWS(trading::EventQueue(0), std::invalid_argument);
+    }
+
+    void test_SequenceNumbers() {
+        TS_ASSERT_EQUALS(queue->getLastSequence(), 0);
+        TS_ASSERT_EQUALS(queue->push(createEvent(100)), 1);
+        TS_ASSERT_EQUALS(queue->push(createEvent(101)), 2);
+        TS_ASSERT_EQUALS(queue->getLastSequence(), 2);
+
+        auto events = queue->drain(10);
+        TS_ASSERT_EQUALS(events.size(), 2);
+        TS_ASSERT_EQUALS(events[0].sequence, 1);
+        TS_ASSERT_EQUALS(events[0].price.value, 100);
+        TS_ASSERT_EQUALS(events[1].sequence, 2);
+    }
+
+    void test_DrainLimit() {
+        for (int64_t price = 100; price < 103; ++price) {
+            queue->push(createEvent(price));
+        }
+
+        auto first = queue->drain(2);
+        TS_ASSERT_EQUALS(first.size(), 2);
+        TS_ASSERT_EQUALS(queue->size(), 1);
+
+        auto rest = queue->drain(2);
+        TS_ASSERT_EQUALS(rest.size(), 1);
+        TS_ASSERT_EQUALS(rest[0].sequence, 3);
+        TS_ASSERT(queue->drain(2).empty());
+    }
+
+    void test_OverflowDropsOldest() {
+        for (int64_t price = 100; price < 106; ++price) {
+            queue->push(createEvent(price));
+        }
+
+        TS_ASSERT_EQUALS(queue->size(), 4);
+        TS_ASSERT_EQUALS(queue->getDroppedCount(), 2);
+
+        // The gap in sequence numbers shows what was lost
+        auto events = queue->drain(10);
+        TS_ASSERT_EQUALS(events.front().sequence, 3);
+        TS_ASSERT_EQUALS(events.back().sequence, 6);
+    }
+};
\ No newline at end of file
@@ -0,0 +1,121 @@
+#include <cxxtest/TestSuite.h>
+#include "core/Journal.h"
+#include "core/Market.h"
+#include <filesystem>
+#include <stdexcept>
+
+class JournalTestSuite : public CxxTest::TestSuite {
+private:
+    std::filesystem::path dir;
+    trading::Market* market;
+    trading::Journal* journal;
+
+    std::string segment(const std::string& name) {
+        return (dir / name).string();
+    }
+
+    // Applies an order the way MarketManager does: engine first, then journal
+    void add(const trading::Order& order) {
+        market->addOrder(order);
+        market->matchOrders(order.getSymbol());
+        journal->recordAdd(order);
+    }
+
+    void cancel(const trading::Order& order) {
+        market->cancelOrder(order.getId());
+        journal->recordCancel(order.getSymbol(), order.getId());
+    }
+
+    trading::Order createOrder(trading::Side side, int64_t price, int quantity,
+                               const std::string& symbol = "AAPL") {
+        return trading::Order(symbol, side, quantity, {price});
+    }
+
+public:
+    void setUp() {
+        dir = std::filesystem::temp_directory_path() /
+              ("journal-test-" + trading::Order("X", trading::Side::BUY, 1, {1}).getId());
+        std::filesystem::create_directories(dir);
+        market = new trading::Market();
+        journal = new trading::Journal(segment("journal-1.bin"), 1);
+    }
+
+    void tearDown() {
+        delete journal;
+        delete market;
+        std::filesystem::remove_all(dir);
+    }
+
+    void test_SequenceNumbers() {
+        TS_ASSERT_EQUALS(journal->getLastSequence(), 0);
+        auto order = createOrder(trading::Side::BUY, 100, 10);
+        TS_ASSERT_EQUALS(journal->recordAdd(order), 1);
+        TS_ASSERT_EQUALS(journal->recordCancel("AAPL", order.getId()), 2);
+        TS_ASSERT_EQUALS(journal->getLastSequence(), 2);
+        TS_ASSERT_THROWS(trading::Journal(segment("journal-1.bin"), 1), std::runtime_error);
+    }
+
+    void test_ReplayReproducesBooks() {
+        auto resting = createOrder(trading::Side::SELL, 101, 50);
+        auto cancelled = createOrder(trading::Side::BUY, 99, 10);
+        add(resting);
+        add(cancelled);
+        add(createOrder(trading::Side::BUY, 101, 20));
+        add(createOrder(trading::Side::SELL, 200, 5, "MSFT"));
+        cancel(cancelled);
+
+        trading::Market restored;
+        auto last = trading::Journal::replay(segment("journal-1.bin"), restored, {});
+        TS_ASSERT_EQUALS(last, 5);
+        TS_ASSERT(!restored.hasOrder(cancelled.getId()));
+        TS_ASSERT_EQUALS(restored.getOrder(resting.getId()).getRemainingQuantity(), 30);
+        TS_ASSERT_EQUALS(restored.getOrderBook("AAPL").getOrders().size(), 1);
+        TS_ASSERT_EQUALS(restored.getOrderBook("MSFT").getOrders().size(), 1);
+    }
+
+    void test_ReplaySkipsCoveredRecords() {
+        auto first = createOrder(trading::Side::BUY, 99, 10);
+        auto second = createOrder(trading::Side::BUY, 98, 10);
+        auto other = createOrder(trading::Side::BUY, 50, 10, "MSFT");
+        add(first);
+        add(other);
+        add(second);
+
+        trading::Market restored;
+        trading::Journal::replay(segment("journal-1.bin"), restored, {{"AAPL", 1}});
+        TS_ASSERT(!restored.hasOrder(first.getId()));
+        TS_ASSERT(restored.hasOrder(second.getId()));
+        TS_ASSERT(restored.hasOrder(other.getId()));
+    }
+
+    void test_TornTailIsIgnored() {
+        auto first = createOrder(trading::Side::BUY, 99, 10);
+        auto second = createOrder(trading::Side::BUY, 98, 10);
+        add(first);
+        add(second);
+
+        auto path = segment("journal-1.bin");
+        std::filesystem::resize_file(path, std::filesystem::file_size(path) - 3);
+
+        trading::Market restored;
+        TS_ASSERT_EQUALS(trading::Journal::replay(path, restored, {}), 1);
+        TS_ASSERT(restored.hasOrder(first.getId()));
+        TS_ASSERT(!restored.hasOrder(second.getId()));
+    }
+
+    void test_RotateContinuesNumbering() {
+        auto first = createOrder(trading::Side::BUY, 99, 10);
+        auto second = createOrder(trading::Side::SELL, 101, 10);
+        add(first);
+        journal->rotate(segment("journal-2.bin"));
+        add(second);
+        TS_ASSERT_EQUALS(journal->getLastSequence(), 2);
+        TS_ASSERT_EQUALS(journal->getPath(), segment("journal-2.bin"));
+
+        trading::Market restored;
+        TS_ASSERT_EQUALS(trading::Journal::replay(segment("journal-1.bin"), restored, {}), 1);
+        TS_ASSERT_EQUALS(trading::Journal::replay(segment("journal-2.bin"), restored, {}), 2);
+        TS_ASSERT(restored.hasOrder(first.getId()));
+        TS_ASSERT(restored.hasOrder(second.getId()));
+    }
+};
\ No newline at end of file
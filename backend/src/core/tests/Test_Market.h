@@ -6,13 +6,13 @@ private:
     trading::Market* market;
 
     trading::Order createBuyOrder(const std::string& symbol = "AAPL", 
-                                double price = 100.0, 
+                                int64_t price = 100, 
                                 int quantity = 100) {
         return trading::Order(symbol, trading::Side::BUY, quantity, {price});
     }
 
     trading::Order createSellOrder(const std::string& symbol = "AAPL", 
-                                 double price = 100.0, 
+                                 int64_t price = 100, 
                                  int quantity = 100) {
         return trading::Order(symbol, trading::Side::SELL, quantity, {price});
     }
@@ -32,6 +32,73 @@ public:
         TS_ASSERT(market->hasOrderBook("AAPL"));
     }
 
+    void test_CreateOrderBook() {
+        market->createOrderBook("AAPL");
+        TS_ASSERT(market->hasOrderBook("AAPL"));
+        TS_ASSERT(!market->getOrderBook("AAPL").getBestBid());
+
+        // Creating an existing book leaves its orders in place
+        auto order = createBuyOrder("AAPL");
+        market->addOrder(order);
+        market->createOrderBook("AAPL");
+        TS_ASSERT(market->getOrderBook("AAPL").hasOrder(order.getId()));
+
+        TS_ASSERT_THROWS(market->createOrderBook(""), std::invalid_argument);
+    }
+
+    void test_EventsDisabledByDefault() {
+        market->addOrder(createBuyOrder());
+        TS_ASSERT(market->drainEvents(100).empty());
+        TS_ASSERT_EQUALS(market->getLastEventSequence(), 0);
+        TS_ASSERT_EQUALS(market->getOrderBook("AAPL").getDepth(1).sequence, 0);
+    }
+
+    void test_EventsRecordBookChanges() {
+        using trading::EventType;
+        trading::Market recording(100, 1000);
+
+        auto bid = createBuyOrder("AAPL", 100, 100);
+        recording.addOrder(bid);
+        auto added = recording.drainEvents(100);
+        TS_ASSERT_EQUALS(added.size(), 2);
+        TS_ASSERT_EQUALS(added[0].type, EventType::ORDER_ADDED);
+        TS_ASSERT_EQUALS(added[0].order_id, bid.getId());
+        TS_ASSERT_EQUALS(added[1].type, EventType::LEVEL_UPDATE);
+        TS_ASSERT_EQUALS(added[1].quantity, 100);
+        TS_ASSERT_EQUALS(added[1].order_count, 1);
+
+        // A partial fill of the bid by a smaller sell
+        auto ask = createSellOrder("AAPL", 100, 40);
+        recording.addOrder(ask);
+        recording.matchOrders("AAPL");
+        auto matched = recording.drainEvents(100);
+        TS_ASSERT_EQUALS(matched.size(), 6);
+        TS_ASSERT_EQUALS(matched[2].type, EventType::TRADE);
+        TS_ASSERT_EQUALS(matched[2].side, trading::Side::SELL);
+        TS_ASSERT_EQUALS(matched[2].order_id, ask.getId());
+        TS_ASSERT_EQUALS(matched[2].quantity, 40);
+        TS_ASSERT_EQUALS(matched[3].type, EventType::ORDER_REMOVED);
+        TS_ASSERT_EQUALS(matched[3].order_id, ask.getId());
+        TS_ASSERT_EQUALS(matched[4].type, EventType::LEVEL_UPDATE);
+        TS_ASSERT_EQUALS(matched[4].side, trading::Side::BUY);
+        TS_ASSERT_EQUALS(matched[4].quantity, 60);
+        TS_ASSERT_EQUALS(matched[5].side, trading::Side::SELL);
+        TS_ASSERT_EQUALS(matched[5].quantity, 0);
+        TS_ASSERT_EQUALS(matched[5].order_count, 0);
+
+        recording.cancelOrder(bid.getId());
+        auto cancelled = recording.drainEvents(100);
+        TS_ASSERT_EQUALS(cancelled.size(), 2);
+        TS_ASSERT_EQUALS(cancelled[0].type, EventType::ORDER_REMOVED);
+        TS_ASSERT_EQUALS(cancelled[0].quantity, 60);
+        TS_ASSERT_EQUALS(cancelled[1].quantity, 0);
+
+        // Sequence numbers run across the whole market without gaps
+        TS_ASSERT_EQUALS(added[0].sequence, 1);
+        TS_ASSERT_EQUALS(cancelled[1].sequence, 10);
+        TS_ASSERT_EQUALS(recording.getOrderBook("AAPL").getDepth(1).sequence, 10);
+    }
+
     void test_AddOrder() {
         auto order = createBuyOrder();
         market->addOrder(order);
@@ -57,39 +124,26 @@ public:
     }
 
     void test_OrderMatching() {
-        market->addOrder(createBuyOrder("AAPL", 100.0));
-        market->addOrder(createSellOrder("AAPL", 100.0));
+        market->addOrder(createBuyOrder("AAPL", 100));
+        market->addOrder(createSellOrder("AAPL", 100));
         
         auto trades = market->matchOrders("AAPL");
         TS_ASSERT_EQUALS(trades.size(), 1);
         TS_ASSERT_EQUALS(market->getTradesForSymbol("AAPL").size(), 1);
     }
 
-    void test_PositionTracking() {
-        market->addOrder(createBuyOrder("AAPL", 100.0));
-        market->addOrder(createSellOrder("AAPL", 100.0));
-        market->matchOrders("AAPL");
-        
-        const auto& position = market->getPosition("AAPL");
-        TS_ASSERT_EQUALS(position.getSymbol(), "AAPL");
-        TS_ASSERT_EQUALS(position.getQuantity(), 0);
-    }
+    void test_TradesKeptPerSymbol() {
+        market->addOrder(createBuyOrder("AAPL", 100));
+        market->addOrder(createSellOrder("AAPL", 100));
+        market->addOrder(createBuyOrder("MSFT", 100));
+        market->addOrder(createSellOrder("MSFT", 100));
 
-    void test_MultiplePositions() {
-        // Add matching orders for AAPL
-        market->addOrder(createBuyOrder("AAPL", 100.0));
-        market->addOrder(createSellOrder("AAPL", 100.0));
-        
-        // Add matching orders for MSFT
-        market->addOrder(createBuyOrder("MSFT", 100.0));
-        market->addOrder(createSellOrder("MSFT", 100.0));
-        
-        // Execute trades for both symbols
         market->matchOrders("AAPL");
         market->matchOrders("MSFT");
-        
-        auto positions = market->getAllPositions();
-        TS_ASSERT_EQUALS(positions.size(), 2);
+
+        TS_ASSERT_EQUALS(market->getTradesForSymbol("AAPL").size(), 1);
+        TS_ASSERT_EQUALS(market->getTradesForSymbol("MSFT").size(), 1);
+        TS_ASSERT_EQUALS(market->getTradesForSymbol("AAPL")[0].getSymbol(), "AAPL");
     }
 
     void test_GetNonexistentOrderBook() {
@@ -100,18 +154,155 @@ public:
     void test_TradeHistory() {
         TS_ASSERT(market->getTradesForSymbol("AAPL").empty());
         
-        market->addOrder(createBuyOrder("AAPL", 100.0));
-        market->addOrder(createSellOrder("AAPL", 100.0));
+        market->addOrder(createBuyOrder("AAPL", 100));
+        market->addOrder(createSellOrder("AAPL", 100));
         market->matchOrders("AAPL");
         
         TS_ASSERT_EQUALS(market->getTradesForSymbol("AAPL").size(), 1);
     }
 
     void test_NoMatchingOrders() {
-        market->addOrder(createBuyOrder("AAPL", 90.0));
-        market->addOrder(createSellOrder("AAPL", 100.0));
+        market->addOrder(createBuyOrder("AAPL", 90));
+        market->addOrder(createSellOrder("AAPL", 100));
         
         auto trades = market->matchOrders("AAPL");
         TS_ASSERT_EQUALS(trades.size(), 0);
     }
+
+    void test_OrderLookup() {
+        TS_ASSERT(!market->hasOrder("order-1"));
+        TS_ASSERT_THROWS(market->getOrder("order-1"), std::invalid_argument);
+
+        market->addOrder(trading::Order("MSFT", trading::Side::SELL, 50, {250}, "order-1"));
+        TS_ASSERT(market->hasOrder("order-1"));
+        TS_ASSERT_EQUALS(market->getOrder("order-1").getSymbol(), "MSFT");
+
+        market->cancelOrder("order-1");
+        TS_ASSERT(!market->hasOrder("order-1"));
+    }
+
+    void test_DuplicateOrderIdAcrossSymbols() {
+        market->addOrder(trading::Order("AAPL", trading::Side::BUY, 100, {100}, "order-1"));
+        TS_ASSERT_THROWS(
+            market->addOrder(trading::Order("MSFT", trading::Side::BUY, 100, {100}, "order-1")),
+            std::invalid_argument);
+    }
+
+    void test_FilledOrderLeavesIndex() {
+        market->addOrder(trading::Order("AAPL", trading::Side::BUY, 100, {100}, "buy-1"));
+        market->addOrder(trading::Order("AAPL", trading::Side::SELL, 100, {100}, "sell-1"));
+        market->matchOrders("AAPL");
+
+        TS_ASSERT(!market->hasOrder("buy-1"));
+        TS_ASSERT(!market->hasOrder("sell-1"));
+        TS_ASSERT_THROWS(market->cancelOrder("buy-1"), std::invalid_argument);
+    }
+
+    void test_AddOrdersBatch() {
+        std::vector<trading::Order> batch = {
+            createSellOrder("AAPL", 100, 50),
+            createSellOrder("MSFT", 200, 10),
+            createBuyOrder("AAPL", 100, 80),
+            createBuyOrder("MSFT", 190, 10)
+        };
+
+        auto trades = market->addOrders(batch);
+        TS_ASSERT_EQUALS(trades.size(), 4);
+        TS_ASSERT(trades[0].empty());
+        TS_ASSERT(trades[1].empty());
+        TS_ASSERT_EQUALS(trades[2].size(), 1);
+        TS_ASSERT_EQUALS(trades[2][0].getQuantity(), 50);
+        TS_ASSERT(trades[3].empty());
+
+        TS_ASSERT(market->hasOrder(batch[2].getId()));
+        TS_ASSERT_EQUALS(market->getOrder(batch[2].getId()).getRemainingQuantity(), 30);
+        TS_ASSERT(market->hasOrder(batch[3].getId()));
+    }
+
+    void test_AddOrdersRejectsWholeBatch() {
+        std::vector<trading::Order> batch = {
+            createBuyOrder("AAPL", 100),
+            createBuyOrder("AAPL", 0)
+        };
+
+        TS_ASSERT_THROWS(market->addOrders(batch), std::invalid_argument);
+        TS_ASSERT(!market->hasOrder(batch[0].getId()));
+
+        auto order = createBuyOrder("AAPL", 100);
+        TS_ASSERT_THROWS(market->addOrders({order, order}), std::invalid_argument);
+        TS_ASSERT(!market->hasOrder(order.getId()));
+    }
+
+    void test_TradeRecords() {
+        TS_ASSERT(market->getTradeRecords("AAPL").empty());
+
+        market->addOrder(createSellOrder("AAPL", 100, 50));
+        market->addOrder(createSellOrder("AAPL", 101, 50));
+        market->addOrder(createBuyOrder("AAPL", 101, 80));
+        auto trades = market->matchOrders("AAPL");
+
+        auto records = market->getTradeRecords("AAPL");
+        TS_ASSERT_EQUALS(records.size(), 2);
+        TS_ASSERT_EQUALS(records[0].price, 100);
+        TS_ASSERT_EQUALS(records[0].quantity, 50);
+        TS_ASSERT_EQUALS(records[0].timestamp, trades[0].getTimestamp());
+        TS_ASSERT_EQUALS(records[0].side, 0);
+        TS_ASSERT_EQUALS(records[1].price, 101);
+        TS_ASSERT_EQUALS(records[1].quantity, 30);
+    }
+
+    void test_TradesSince() {
+        trading::Market small(3);
+        for (int i = 0; i < 5; ++i) {
+            small.addOrder(createSellOrder("AAPL", 100, 10));
+            small.addOrder(createBuyOrder("AAPL", 100, 10));
+            auto trades = small.matchOrders("AAPL");
+            TS_ASSERT_EQUALS(trades[0].getSequence(), i + 1);
+        }
+
+        TS_ASSERT_EQUALS(small.getLastTradeSequence("AAPL"), 5);
+        TS_ASSERT_EQUALS(small.getLastTradeSequence("MSFT"), 0);
+        TS_ASSERT_EQUALS(small.getTradesForSymbol("AAPL").size(), 3);
+
+        auto trades = small.getTradesSince("AAPL", 3, 10);
+        TS_ASSERT_EQUALS(trades.size(), 2);
+        TS_ASSERT_EQUALS(trades[0].getSequence(), 4);
+        TS_ASSERT_EQUALS(small.getTradesSince("AAPL", 0, 1)[0].getSequence(), 3);
+        TS_ASSERT(small.getTradesSince("AAPL", 5, 10).empty());
+        TS_ASSERT(small.getTradesSince("MSFT", 0, 10).empty());
+        TS_ASSERT_EQUALS(small.getTradeRecords("AAPL")[0].sequence, 3);
+    }
+
+    void test_Snapshot() {
+        trading::Market recording(100, 1000);
+        TS_ASSERT_THROWS(recording.getSnapshot("AAPL", 5, 10), std::invalid_argument);
+
+        for (int i = 0; i < 3; ++i) {
+            recording.addOrder(createSellOrder("AAPL", 100 + i, 10));
+            recording.addOrder(createBuyOrder("AAPL", 100 + i, 10));
+            recording.matchOrders("AAPL");
+        }
+        recording.addOrder(createBuyOrder("AAPL", 99, 20));
+
+        std::vector<trading::EventSequence> trade_events;
+        for (const auto& event : recording.drainEvents(1000)) {
+            if (event.type == trading::EventType::TRADE) {
+                trade_events.push_back(event.sequence);
+            }
+        }
+
+        auto snapshot = recording.getSnapshot("AAPL", 5, 2);
+        TS_ASSERT_EQUALS(snapshot.depth.sequence, recording.getLastEventSequence());
+        TS_ASSERT_EQUALS(snapshot.depth.bids.size(), 1);
+        TS_ASSERT_EQUALS(snapshot.depth.bids[0].quantity, 20);
+        // The most recent trades, each with the sequence of its own event
+        TS_ASSERT_EQUALS(snapshot.trades.size(), 2);
+        TS_ASSERT_EQUALS(snapshot.trades[0].getSequence(), 2);
+        TS_ASSERT_EQUALS(snapshot.trades[0].getEventSequence(), trade_events[1]);
+        TS_ASSERT_EQUALS(snapshot.trades[1].getEventSequence(), trade_events[2]);
+        TS_ASSERT(trade_events[2] < snapshot.depth.sequence);
+
+        market->createOrderBook("AAPL");
+        TS_ASSERT(market->getSnapshot("AAPL", 5, 10).trades.empty());
+    }
 };
\ No newline at end of file
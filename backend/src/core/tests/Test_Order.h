@@ -1,6 +1,7 @@
 #include <cxxtest/TestSuite.h>
 #include "core/Order.h"
 #include <set>
+#include <stdexcept>
 
 class OrderTestSuite : public CxxTest::TestSuite {
 private:
@@ -8,7 +9,7 @@ private:
 
 public:
     void setUp() {
-        testOrder = new trading::Order("AAPL", trading::Side::BUY, 100, {150.5});
+        testOrder = new trading::Order("AAPL", trading::Side::BUY, 100, {15050});
     }
 
     void tearDown() {
@@ -19,7 +20,7 @@ public:
         TS_ASSERT_EQUALS(testOrder->getSymbol(), "AAPL");
         TS_ASSERT_EQUALS(testOrder->getSide(), trading::Side::BUY);
         TS_ASSERT_EQUALS(testOrder->getQuantity(), 100);
-        TS_ASSERT_EQUALS(testOrder->getPrice().value, 150.5);
+        TS_ASSERT_EQUALS(testOrder->getPrice().value, 15050);
         TS_ASSERT_EQUALS(testOrder->getStatus(), trading::OrderStatus::NEW);
     }
 
@@ -28,7 +29,7 @@ public:
         const int numOrders = 100;
         
         for(int i = 0; i < numOrders; ++i) {
-            trading::Order order("AAPL", trading::Side::BUY, 100, {150.5});
+            trading::Order order("AAPL", trading::Side::BUY, 100, {15050});
             orderIds.insert(order.getId());
         }
         
@@ -47,7 +48,7 @@ public:
 
     void test_OrderTimestamp() {
         auto beforeCreation = std::chrono::system_clock::now().time_since_epoch().count();
-        trading::Order order("AAPL", trading::Side::BUY, 100, {150.5});
+        trading::Order order("AAPL", trading::Side::BUY, 100, {15050});
         auto afterCreation = std::chrono::system_clock::now().time_since_epoch().count();
         
         TS_ASSERT(beforeCreation > 0);
@@ -55,12 +56,35 @@ public:
     }
 
     void test_Getters() {
-        trading::Order order("MSFT", trading::Side::SELL, 200, {250.75});
+        trading::Order order("MSFT", trading::Side::SELL, 200, {25075});
         
         TS_ASSERT(!order.getId().empty());
         TS_ASSERT_EQUALS(order.getSymbol(), "MSFT");
         TS_ASSERT_EQUALS(order.getSide(), trading::Side::SELL);
         TS_ASSERT_EQUALS(order.getQuantity(), 200);
-        TS_ASSERT_EQUALS(order.getPrice().value, 250.75);
+        TS_ASSERT_EQUALS(order.getPrice().value, 25075);
+    }
+
+    void test_ExternalOrderId() {
+        trading::Order order("AAPL", trading::Side::BUY, 100, {15050}, "client-order-1");
+        TS_ASSERT_EQUALS(order.getId(), "client-order-1");
+
+        TS_ASSERT_THROWS(trading::Order("AAPL", trading::Side::BUY, 100, {15050}, ""),
+                        std::invalid_argument);
+    }
+
+    void test_PartialFill() {
+        TS_ASSERT_EQUALS(testOrder->getRemainingQuantity(), 100);
+
+        testOrder->fill(40);
+        TS_ASSERT_EQUALS(testOrder->getRemainingQuantity(), 60);
+        TS_ASSERT_EQUALS(testOrder->getQuantity(), 100);
+        TS_ASSERT_EQUALS(testOrder->getStatus(), trading::OrderStatus::NEW);
+
+        TS_ASSERT_THROWS(testOrder->fill(61), std::invalid_argument);
+
+        testOrder->fill(60);
+        TS_ASSERT_EQUALS(testOrder->getRemainingQuantity(), 0);
+        TS_ASSERT_EQUALS(testOrder->getStatus(), trading::OrderStatus::FILLED);
     }
 };
\ No newline at end of file
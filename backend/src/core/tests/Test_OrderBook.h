@@ -7,13 +7,13 @@ private:
 
     // Helper methods
     trading::Order createBuyOrder(const std::string& symbol = "AAPL", 
-                                double price = 100.0, 
+                                int64_t price = 100, 
                                 int quantity = 100) {
         return trading::Order(symbol, trading::Side::BUY, quantity, {price});
     }
 
     trading::Order createSellOrder(const std::string& symbol = "AAPL", 
-                                 double price = 100.0, 
+                                 int64_t price = 100, 
                                  int quantity = 100) {
         return trading::Order(symbol, trading::Side::SELL, quantity, {price});
     }
@@ -37,6 +37,7 @@ public:
         book->addOrder(order);
         TS_ASSERT(book->hasOrder(order.getId()));
         TS_ASSERT_EQUALS(book->getOrders().size(), 1);
+        TS_ASSERT_EQUALS(book->getOrderCount(), 1);
         
         const auto& retrieved = book->getOrder(order.getId());
         TS_ASSERT_EQUALS(retrieved.getId(), order.getId());
@@ -53,6 +54,7 @@ public:
         book->addOrder(order);
         book->cancelOrder(order.getId());
         TS_ASSERT(!book->hasOrder(order.getId()));
+        TS_ASSERT_EQUALS(book->getOrderCount(), 0);
     }
 
     void test_CancelNonexistentOrder() {
@@ -60,8 +62,8 @@ public:
     }
 
     void test_BasicOrderMatch() {
-        auto buy = createBuyOrder("AAPL", 100.0);
-        auto sell = createSellOrder("AAPL", 100.0);
+        auto buy = createBuyOrder("AAPL", 100);
+        auto sell = createSellOrder("AAPL", 100);
         
         book->addOrder(buy);
         book->addOrder(sell);
@@ -73,8 +75,8 @@ public:
     }
 
     void test_NoMatch() {
-        auto buy = createBuyOrder("AAPL", 90.0);
-        auto sell = createSellOrder("AAPL", 100.0);
+        auto buy = createBuyOrder("AAPL", 90);
+        auto sell = createSellOrder("AAPL", 100);
         
         book->addOrder(buy);
         book->addOrder(sell);
@@ -85,10 +87,10 @@ public:
     }
 
     void test_MultipleMatches() {
-        book->addOrder(createBuyOrder("AAPL", 100.0));
-        book->addOrder(createBuyOrder("AAPL", 101.0));
-        book->addOrder(createSellOrder("AAPL", 99.0));
-        book->addOrder(createSellOrder("AAPL", 98.0));
+        book->addOrder(createBuyOrder("AAPL", 100));
+        book->addOrder(createBuyOrder("AAPL", 101));
+        book->addOrder(createSellOrder("AAPL", 99));
+        book->addOrder(createSellOrder("AAPL", 98));
         
         auto trades = book->matchOrders();
         TS_ASSERT_EQUALS(trades.size(), 2);
@@ -102,4 +104,164 @@ public:
         TS_ASSERT_EQUALS(book->getOrders().size(), 1);
         TS_ASSERT_EQUALS(book->getOrder(order.getId()).getId(), order.getId());
     }
+
+    void test_PriceLevelAggregation() {
+        book->addOrder(createBuyOrder("AAPL", 100, 10));
+        book->addOrder(createBuyOrder("AAPL", 100, 20));
+        auto order = createBuyOrder("AAPL", 99, 5);
+        book->addOrder(order);
+
+        auto depth = book->getDepth(10);
+        TS_ASSERT_EQUALS(depth.bids.size(), 2);
+        TS_ASSERT_EQUALS(depth.bids[0].price.value, 100);
+        TS_ASSERT_EQUALS(depth.bids[0].quantity, 30);
+        TS_ASSERT_EQUALS(depth.bids[0].order_count, 2);
+        TS_ASSERT_EQUALS(depth.bids[1].price.value, 99);
+
+        book->cancelOrder(order.getId());
+        TS_ASSERT_EQUALS(book->getDepth(10).bids.size(), 1);
+    }
+
+    void test_BestBidAsk() {
+        TS_ASSERT(!book->getBestBid().has_value());
+        TS_ASSERT(!book->getBestAsk().has_value());
+
+        book->addOrder(createBuyOrder("AAPL", 99));
+        book->addOrder(createBuyOrder("AAPL", 98));
+        book->addOrder(createSellOrder("AAPL", 101));
+        book->addOrder(createSellOrder("AAPL", 102));
+
+        TS_ASSERT_EQUALS(book->getBestBid()->price.value, 99);
+        TS_ASSERT_EQUALS(book->getBestAsk()->price.value, 101);
+    }
+
+    void test_DepthLimit() {
+        for (int i = 0; i < 20; ++i) {
+            book->addOrder(createSellOrder("AAPL", 100 + i));
+        }
+
+        auto depth = book->getDepth(5);
+        TS_ASSERT(depth.bids.empty());
+        TS_ASSERT_EQUALS(depth.asks.size(), 5);
+        TS_ASSERT_EQUALS(depth.asks[0].price.value, 100);
+        TS_ASSERT_EQUALS(depth.asks[4].price.value, 104);
+    }
+
+    void test_PartialFill() {
+        auto buy = createBuyOrder("AAPL", 100, 100);
+        auto sell = createSellOrder("AAPL", 100, 30);
+        book->addOrder(buy);
+        book->addOrder(sell);
+
+        auto trades = book->matchOrders();
+        TS_ASSERT_EQUALS(trades.size(), 1);
+        TS_ASSERT_EQUALS(trades[0].getQuantity(), 30);
+        TS_ASSERT(!book->hasOrder(sell.getId()));
+        TS_ASSERT(book->hasOrder(buy.getId()));
+        TS_ASSERT_EQUALS(book->getOrder(buy.getId()).getRemainingQuantity(), 70);
+        TS_ASSERT_EQUALS(book->getBestBid()->quantity, 70);
+    }
+
+    void test_SweepMultipleLevels() {
+        book->addOrder(createSellOrder("AAPL", 100, 10));
+        book->addOrder(createSellOrder("AAPL", 101, 10));
+        book->addOrder(createSellOrder("AAPL", 102, 10));
+        auto buy = createBuyOrder("AAPL", 101, 25);
+        book->addOrder(buy);
+
+        auto trades = book->matchOrders();
+        TS_ASSERT_EQUALS(trades.size(), 2);
+        TS_ASSERT_EQUALS(trades[0].getPrice().value, 100);
+        TS_ASSERT_EQUALS(trades[1].getPrice().value, 101);
+        TS_ASSERT_EQUALS(trades[1].getQuantity(), 10);
+        TS_ASSERT_EQUALS(book->getOrder(buy.getId()).getRemainingQuantity(), 5);
+        TS_ASSERT_EQUALS(book->getBestAsk()->price.value, 102);
+    }
+
+    void test_TimePriority() {
+        auto first = createSellOrder("AAPL", 100, 10);
+        auto second = createSellOrder("AAPL", 100, 10);
+        book->addOrder(first);
+        book->addOrder(second);
+        book->addOrder(createBuyOrder("AAPL", 100, 10));
+
+        auto trades = book->matchOrders();
+        TS_ASSERT_EQUALS(trades.size(), 1);
+        TS_ASSERT_EQUALS(trades[0].getSellOrderId(), first.getId());
+        TS_ASSERT(book->hasOrder(second.getId()));
+    }
+
+    void test_CancelFromMiddleOfQueue() {
+        auto first = createSellOrder("AAPL", 100, 10);
+        auto middle = createSellOrder("AAPL", 100, 10);
+        auto last = createSellOrder("AAPL", 100, 10);
+        book->addOrder(first);
+        book->addOrder(middle);
+        book->addOrder(last);
+        book->cancelOrder(middle.getId());
+
+        TS_ASSERT_EQUALS(book->getBestAsk()->order_count, 2);
+        TS_ASSERT_EQUALS(book->getBestAsk()->quantity, 20);
+
+        book->addOrder(createBuyOrder("AAPL", 100, 20));
+        auto trades = book->matchOrders();
+        TS_ASSERT_EQUALS(trades.size(), 2);
+        TS_ASSERT_EQUALS(trades[0].getSellOrderId(), first.getId());
+        TS_ASSERT_EQUALS(trades[1].getSellOrderId(), last.getId());
+        TS_ASSERT(!book->getBestAsk().has_value());
+    }
+
+    void test_AggressorSide() {
+        book->addOrder(createSellOrder("AAPL", 100, 10));
+        book->addOrder(createBuyOrder("AAPL", 100, 5));
+        auto trades = book->matchOrders();
+        TS_ASSERT_EQUALS(trades[0].getSide(), trading::Side::BUY);
+
+        book->addOrder(createBuyOrder("AAPL", 101, 10));
+        book->addOrder(createSellOrder("AAPL", 99, 10));
+        trades = book->matchOrders();
+        TS_ASSERT_EQUALS(trades[0].getSide(), trading::Side::SELL);
+        TS_ASSERT_EQUALS(trades[0].getPrice().value, 101);
+    }
+
+    void test_DepthRecords() {
+        book->addOrder(createBuyOrder("AAPL", 99, 10));
+        book->addOrder(createBuyOrder("AAPL", 99, 5));
+        book->addOrder(createBuyOrder("AAPL", 98, 7));
+        book->addOrder(createSellOrder("AAPL", 101, 3));
+        book->addOrder(createSellOrder("AAPL", 102, 4));
+
+        auto records = book->getDepthRecords(1);
+        TS_ASSERT_EQUALS(records.size(), 2);
+        TS_ASSERT_EQUALS(records[0].price, 99);
+        TS_ASSERT_EQUALS(records[0].quantity, 15);
+        TS_ASSERT_EQUALS(records[0].order_count, 2);
+        TS_ASSERT_EQUALS(records[0].side, 0);
+        TS_ASSERT_EQUALS(records[1].price, 101);
+        TS_ASSERT_EQUALS(records[1].side, 1);
+
+        TS_ASSERT_EQUALS(book->getDepthRecords(10).size(), 4);
+    }
+
+    void test_VersionTracksChanges() {
+        TS_ASSERT_EQUALS(book->getVersion(), 0);
+        auto sell = createSellOrder("AAPL", 101, 10);
+        book->addOrder(sell);
+        TS_ASSERT_EQUALS(book->getVersion(), 1);
+
+        // Reads and matching passes without fills leave the version alone
+        book->getDepth(10);
+        book->matchOrders();
+        TS_ASSERT_EQUALS(book->getVersion(), 1);
+        TS_ASSERT_THROWS(book->addOrder(sell), std::invalid_argument);
+        TS_ASSERT_EQUALS(book->getVersion(), 1);
+
+        book->addOrder(createBuyOrder("AAPL", 101, 4));
+        book->matchOrders();
+        TS_ASSERT_EQUALS(book->getVersion(), 3);
+        TS_ASSERT_EQUALS(book->getDepth(10).version, 3);
+
+        book->cancelOrder(sell.getId());
+        TS_ASSERT_EQUALS(book->getVersion(), 4);
+    }
 };
\ No newline at end of file
@@ -0,0 +1,128 @@
+#include <cxxtest/TestSuite.h>
+#include "core/Portfolio.h"
+
+class PortfolioTestSuite : public CxxTest::TestSuite {
+private:
+    trading::Portfolio* portfolio;
+
+    trading::AccountPosition positionOf(trading::AccountId account, const std::string& symbol) {
+        for (const auto& position : portfolio->getPositions(account)) {
+            if (position.symbol == symbol) {
+                return position;
+            }
+        }
+        TS_FAIL("Position not found");
+        return trading::AccountPosition();
+    }
+
+public:
+    void setUp() { portfolio = new trading::Portfolio(); }
+    void tearDown() { delete portfolio; }
+
+    void test_TradeUpdatesBothAccounts() {
+        portfolio->applyTrade("AAPL", 1, 2, 100, {150});
+
+        auto buyer = positionOf(1, "AAPL");
+        TS_ASSERT_EQUALS(buyer.quantity, 100);
+        TS_ASSERT_EQUALS(buyer.average_price.value, 150);
+        auto seller = positionOf(2, "AAPL");
+        TS_ASSERT_EQUALS(seller.quantity, -100);
+        TS_ASSERT_EQUALS(seller.average_price.value, 150);
+
+        TS_ASSERT_EQUALS(portfolio->getAccountCount(), 2);
+        TS_ASSERT(portfolio->getPositions(3).empty());
+        TS_ASSERT_EQUALS(portfolio->getLastPrice("AAPL")->value, 150);
+        TS_ASSERT(!portfolio->getLastPrice("MSFT").has_value());
+    }
+
+    void test_AveragePriceAndRealizedPnl() {
+        portfolio->applyTrade("AAPL", 1, 2, 100, {100});
+        portfolio->applyTrade("AAPL", 1, 2, 50, {130});
+        TS_ASSERT_EQUALS(positionOf(1, "AAPL").average_price.value, 110);
+
+        // Selling part of the position realizes against the average price
+        portfolio->applyTrade("AAPL", 3, 1, 60, {120});
+        auto position = positionOf(1, "AAPL");
+        TS_ASSERT_EQUALS(position.quantity, 90);
+        TS_ASSERT_EQUALS(position.average_price.value, 110);
+        TS_ASSERT_EQUALS(position.realized_pnl, 600);
+        // Marked at the last trade price of 120
+        TS_ASSERT_EQUALS(position.unrealized_pnl, 900);
+
+        // The short seller gains when the price falls
+        portfolio->applyTrade("AAPL", 2, 3, 10, {90});
+        auto short_position = positionOf(2, "AAPL");
+        TS_ASSERT_EQUALS(short_position.quantity, -140);
+        TS_ASSERT_EQUALS(short_position.realized_pnl, 200);
+        TS_ASSERT_EQUALS(short_position.unrealized_pnl, (90 - 110) * -140);
+    }
+
+    void test_AverageBetweenTicks() {
+        portfolio->applyTrade("X", 1, 2, 1, {100});
+        portfolio->applyTrade("X", 1, 2, 2, {101});
+        // Bought 3 for 302 ticks; the displayed average rounds to 101
+        TS_ASSERT_EQUALS(positionOf(1, "X").average_price.value, 101);
+        TS_ASSERT_EQUALS(positionOf(1, "X").unrealized_pnl, 1);
+
+        portfolio->applyTrade("X", 2, 1, 3, {101});
+        auto position = positionOf(1, "X");
+        TS_ASSERT_EQUALS(position.quantity, 0);
+        TS_ASSERT_EQUALS(position.realized_pnl, 1);
+        TS_ASSERT_EQUALS(positionOf(2, "X").realized_pnl, -1);
+    }
+
+    void test_PartialCloseTakesItsShareOfCost() {
+        portfolio->applyTrade("X", 1, 2, 1, {100});
+        portfolio->applyTrade("X", 1, 2, 2, {101});
+        portfolio->applyTrade("X", 3, 1, 1, {101});
+        TS_ASSERT_EQUALS(positionOf(1, "X").realized_pnl, 1);
+        TS_ASSERT(positionOf(1, "X").cost == 202);
+
+        // Closing the rest takes the remaining cost, so the total is still exact
+        portfolio->applyTrade("X", 3, 1, 2, {101});
+        TS_ASSERT_EQUALS(positionOf(1, "X").realized_pnl, 1);
+        TS_ASSERT(positionOf(1, "X").cost == 0);
+    }
+
+    void test_LargePositionDoesNotOverflow() {
+        // 1e7 shares at $200 with 1e-8 lots and 0.01 ticks is 2e19 tick lots
+        const trading::Quantity lots = 1000000000000000;
+        portfolio->applyTrade("X", 1, 2, lots, {20000});
+        portfolio->applyTrade("X", 2, 1, lots, {20001});
+        TS_ASSERT_EQUALS(positionOf(1, "X").realized_pnl, lots);
+        TS_ASSERT_EQUALS(positionOf(2, "X").realized_pnl, -lots);
+    }
+
+    void test_ReversingPosition() {
+        portfolio->applyTrade("AAPL", 1, 2, 10, {100});
+        portfolio->applyTrade("AAPL", 2, 1, 15, {120});
+
+        auto position = positionOf(1, "AAPL");
+        TS_ASSERT_EQUALS(position.quantity, -5);
+        TS_ASSERT_EQUALS(position.average_price.value, 120);
+        TS_ASSERT_EQUALS(position.realized_pnl, 200);
+
+        portfolio->applyTrade("AAPL", 1, 2, 5, {110});
+        position = positionOf(1, "AAPL");
+        TS_ASSERT_EQUALS(position.quantity, 0);
+        TS_ASSERT_EQUALS(position.average_price.value, 0);
+        TS_ASSERT_EQUALS(position.realized_pnl, 250);
+        TS_ASSERT_EQUALS(position.unrealized_pnl, 0);
+    }
+
+    void test_PositionsPerSymbol() {
+        portfolio->applyTrade("MSFT", 1, 2, 5, {300});
+        portfolio->applyTrade("AAPL", 1, 2, 10, {100});
+
+        auto positions = portfolio->getPositions(1);
+        TS_ASSERT_EQUALS(positions.size(), 2);
+        TS_ASSERT_EQUALS(positions[0].symbol, "AAPL");
+        TS_ASSERT_EQUALS(positions[1].symbol, "MSFT");
+    }
+
+    void test_InvalidTrade() {
+        TS_ASSERT_THROWS(portfolio->applyTrade("AAPL", 1, 2, 0, {100}), std::invalid_argument);
+        TS_ASSERT_THROWS(portfolio->applyTrade("AAPL", 1, 2, 10, {0}), std::invalid_argument);
+        TS_ASSERT_EQUALS(portfolio->getAccountCount(), 0);
+    }
+};
\ No newline at end of file
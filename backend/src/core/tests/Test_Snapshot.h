@@ -0,0 +1,108 @@
+#include <cxxtest/TestSuite.h>
+#include "core/Snapshot.h"
+#include "core/Market.h"
+#include <filesystem>
+#include <stdexcept>
+
+class SnapshotTestSuite : public CxxTest::TestSuite {
+private:
+    std::filesystem::path dir;
+    trading::Market* market;
+
+    std::string file(const std::string& name) {
+        return (dir / name).string();
+    }
+
+    trading::Order createOrder(trading::Side side, int64_t price, int quantity) {
+        return trading::Order("AAPL", side, quantity, {price});
+    }
+
+public:
+    void setUp() {
+        dir = std::filesystem::temp_directory_path() /
+              ("snapshot-test-" + trading::Order("X", trading::Side::BUY, 1, {1}).getId());
+        std::filesystem::create_directories(dir);
+        market = new trading::Market();
+    }
+
+    void tearDown() {
+        delete market;
+        std::filesystem::remove_all(dir);
+    }
+
+    void test_RoundTrip() {
+        auto first = createOrder(trading::Side::SELL, 101, 50);
+        auto second = createOrder(trading::Side::SELL, 101, 40);
+        auto bid = createOrder(trading::Side::BUY, 99, 10);
+        market->addOrder(first);
+        market->addOrder(second);
+        market->addOrder(bid);
+        market->addOrder(createOrder(trading::Side::BUY, 101, 20));
+        market->matchOrders("AAPL");
+
+        trading::saveSnapshot(market->getOrderBook("AAPL"), 7, file("AAPL.snap"));
+        TS_ASSERT(!std::filesystem::exists(file("AAPL.snap.tmp")));
+
+        trading::Market restored;
+        auto info = trading::loadSnapshot(restored, file("AAPL.snap"));
+        TS_ASSERT_EQUALS(info.symbol, "AAPL");
+        TS_ASSERT_EQUALS(info.sequence, 7);
+        TS_ASSERT_EQUALS(info.order_count, 3);
+
+        auto order = restored.getOrder(first.getId());
+        TS_ASSERT_EQUALS(order.getQuantity(), 50);
+        TS_ASSERT_EQUALS(order.getRemainingQuantity(), 30);
+
+        auto depth = restored.getOrderBook("AAPL").getDepthRecords(10);
+        auto expected = market->getOrderBook("AAPL").getDepthRecords(10);
+        TS_ASSERT_EQUALS(depth.size(), expected.size());
+        for (size_t i = 0; i < depth.size(); ++i) {
+            TS_ASSERT_EQUALS(depth[i].price, expected[i].price);
+            TS_ASSERT_EQUALS(depth[i].quantity, expected[i].quantity);
+            TS_ASSERT_EQUALS(depth[i].order_count, expected[i].order_count);
+        }
+    }
+
+    void test_TimePriorityPreserved() {
+        auto first = createOrder(trading::Side::SELL, 100, 10);
+        auto second = createOrder(trading::Side::SELL, 100, 10);
+        market->addOrder(first);
+        market->addOrder(second);
+        trading::saveSnapshot(market->getOrderBook("AAPL"), 2, file("AAPL.snap"));
+
+        trading::Market restored;
+        trading::loadSnapshot(restored, file("AAPL.snap"));
+        restored.addOrder(createOrder(trading::Side::BUY, 100, 10));
+        auto trades = restored.matchOrders("AAPL");
+        TS_ASSERT_EQUALS(trades.size(), 1);
+        TS_ASSERT_EQUALS(trades[0].getSellOrderId(), first.getId());
+    }
+
+    void test_SnapshotThenJournal() {
+        auto path = file("journal-1.bin");
+        trading::Journal journal(path, 1);
+        auto early = createOrder(trading::Side::BUY, 99, 10);
+        market->addOrder(early);
+        journal.recordAdd(early);
+        trading::saveSnapshot(market->getOrderBook("AAPL"), journal.getLastSequence(), file("AAPL.snap"));
+
+        auto late = createOrder(trading::Side::SELL, 99, 4);
+        market->addOrder(late);
+        market->matchOrders("AAPL");
+        journal.recordAdd(late);
+
+        trading::Market restored;
+        auto info = trading::loadSnapshot(restored, file("AAPL.snap"));
+        trading::Journal::replay(path, restored, {{info.symbol, info.sequence}});
+        TS_ASSERT_EQUALS(restored.getOrder(early.getId()).getRemainingQuantity(), 6);
+        TS_ASSERT(!restored.hasOrder(late.getId()));
+    }
+
+    void test_MissingOrCorruptFile() {
+        trading::Market restored;
+        TS_ASSERT_THROWS(trading::loadSnapshot(restored, file("missing.snap")), std::runtime_error);
+
+        trading::Journal journal(file("journal-1.bin"), 1);
+        TS_ASSERT_THROWS(trading::loadSnapshot(restored, file("journal-1.bin")), std::runtime_error);
+    }
+};
\ No newline at end of file
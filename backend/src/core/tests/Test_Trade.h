@@ -10,8 +10,8 @@ private:
 
 public:
     void setUp() {
-        buyOrder = new trading::Order("AAPL", trading::Side::BUY, 100, {150.5});
-        sellOrder = new trading::Order("AAPL", trading::Side::SELL, 100, {150.5});
+        buyOrder = new trading::Order("AAPL", trading::Side::BUY, 100, {15050});
+        sellOrder = new trading::Order("AAPL", trading::Side::SELL, 100, {15050});
         trade = new trading::Trade(*buyOrder, *sellOrder);
     }
 
@@ -24,30 +24,30 @@ public:
     void test_TradeCreation() {
         TS_ASSERT_EQUALS(trade->getSymbol(), "AAPL");
         TS_ASSERT_EQUALS(trade->getQuantity(), 100);
-        TS_ASSERT_EQUALS(trade->getPrice().value, 150.5);
+        TS_ASSERT_EQUALS(trade->getPrice().value, 15050);
         TS_ASSERT_EQUALS(trade->getBuyOrderId(), buyOrder->getId());
         TS_ASSERT_EQUALS(trade->getSellOrderId(), sellOrder->getId());
     }
 
     void test_SymbolMismatch() {
-        trading::Order buyOrderMSFT("MSFT", trading::Side::BUY, 100, {150.5});
-        trading::Order sellOrderAAPL("AAPL", trading::Side::SELL, 100, {150.5});
+        trading::Order buyOrderMSFT("MSFT", trading::Side::BUY, 100, {15050});
+        trading::Order sellOrderAAPL("AAPL", trading::Side::SELL, 100, {15050});
         
         TS_ASSERT_THROWS(trading::Trade(buyOrderMSFT, sellOrderAAPL), 
                         std::invalid_argument);
     }
 
     void test_InvalidSides() {
-        trading::Order buyOrder1("AAPL", trading::Side::BUY, 100, {150.5});
-        trading::Order buyOrder2("AAPL", trading::Side::BUY, 100, {150.5});
+        trading::Order buyOrder1("AAPL", trading::Side::BUY, 100, {15050});
+        trading::Order buyOrder2("AAPL", trading::Side::BUY, 100, {15050});
         
         TS_ASSERT_THROWS(trading::Trade(buyOrder1, buyOrder2), 
                         std::invalid_argument);
     }
 
     void test_PriceValidation() {
-        trading::Order buyOrderLow("AAPL", trading::Side::BUY, 100, {150.0});
-        trading::Order sellOrderHigh("AAPL", trading::Side::SELL, 100, {151.0});
+        trading::Order buyOrderLow("AAPL", trading::Side::BUY, 100, {15000});
+        trading::Order sellOrderHigh("AAPL", trading::Side::SELL, 100, {15100});
         
         TS_ASSERT_THROWS(trading::Trade(buyOrderLow, sellOrderHigh), 
                         std::invalid_argument);
@@ -58,7 +58,7 @@ public:
         TS_ASSERT(!trade->getSellOrderId().empty());
         TS_ASSERT_EQUALS(trade->getSymbol(), "AAPL");
         TS_ASSERT_EQUALS(trade->getQuantity(), 100);
-        TS_ASSERT_EQUALS(trade->getPrice().value, 150.5);
+        TS_ASSERT_EQUALS(trade->getPrice().value, 15050);
     }
 
     void test_TradeTimestamp() {
@@ -69,4 +69,10 @@ public:
         TS_ASSERT(newTrade.getTimestamp() >= beforeCreation);
         TS_ASSERT(newTrade.getTimestamp() <= afterCreation);
     }
+
+    void test_FillQuantityAndPrice() {
+        trading::Trade fill(*buyOrder, *sellOrder, 25, {15000});
+        TS_ASSERT_EQUALS(fill.getQuantity(), 25);
+        TS_ASSERT_EQUALS(fill.getPrice().value, 15000);
+    }
 };
\ No newline at end of file
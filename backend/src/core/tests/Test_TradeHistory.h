@@ -0,0 +1,75 @@
+#include <cxxtest/TestSuite.h>
+#include "core/TradeHistory.h"
+#include <stdexcept>
+
+class TradeHistoryTestSuite : public CxxTest::TestSuite {
+private:
+    trading::TradeHistory* history;
+
+    trading::Trade createTrade(int64_t price) {
+        trading::Order buy("AAPL", trading::Side::BUY, 10, {price});
+        trading::Order sell("AAPL", trading::Side::SELL, 10, {price});
+        return trading::Trade(buy, sell);
+    }
+
+public:
+    void setUp() {
+        history = new trading::TradeHistory(4);
+    }
+
+    void tearDown() {
+        delete history;
+    }
+
+    void test_EmptyHistory() {
+        TS_ASSERT_EQUALS(history->size(), 0);
+        TS_ASSERT_EQUALS(history->getLastSequence(), 0);
+        TS_ASSERT(history->since(0, 10).empty());
+        TS_ASSERT(history->all().empty());
+    }
+
+    void test_ZeroCapacity() {
+        TS_ASSERT_THROWS(trading::TradeHistory(0), std::invalid_argument);
+    }
+
+    void test_SequenceNumbers() {
+        TS_ASSERT_EQUALS(history->append(createTrade(100)), 1);
+        TS_ASSERT_EQUALS(history->append(createTrade(101)), 2);
+
+        auto trades = history->all();
+        TS_ASSERT_EQUALS(trades.size(), 2);
+        TS_ASSERT_EQUALS(trades[0].getSequence(), 1);
+        TS_ASSERT_EQUALS(trades[1].getSequence(), 2);
+        TS_ASSERT_EQUALS(trades[1].getPrice().value, 101);
+    }
+
+    void test_SinceWithLimit() {
+        for (int i = 0; i < 4; ++i) {
+            history->append(createTrade(100 + i));
+        }
+
+        auto trades = history->since(1, 2);
+        TS_ASSERT_EQUALS(trades.size(), 2);
+        TS_ASSERT_EQUALS(trades[0].getSequence(), 2);
+        TS_ASSERT_EQUALS(trades[1].getSequence(), 3);
+        TS_ASSERT(history->since(4, 10).empty());
+    }
+
+    void test_OverwritesOldest() {
+        for (int i = 0; i < 10; ++i) {
+            history->append(createTrade(100 + i));
+        }
+
+        TS_ASSERT_EQUALS(history->size(), 4);
+        TS_ASSERT_EQUALS(history->getFirstSequence(), 7);
+        TS_ASSERT_EQUALS(history->getLastSequence(), 10);
+
+        // Asking for trades that have been overwritten starts at the oldest retained
+        auto trades = history->since(2, 10);
+        TS_ASSERT_EQUALS(trades.size(), 4);
+        TS_ASSERT_EQUALS(trades[0].getSequence(), 7);
+        TS_ASSERT_EQUALS(trades[0].getPrice().value, 106);
+        TS_ASSERT_EQUALS(trades[3].getSequence(), 10);
+        TS_ASSERT_EQUALS(trades[3].getPrice().value, 109);
+    }
+};
\ No newline at end of file
@@ -24,7 +24,7 @@ public:
         TS_ASSERT_THROWS_NOTHING(market->getOrderBook(""));
 
         // Test invalid order
-        trading::Order emptySymbol("", trading::Side::BUY, 100, {100.0});
+        trading::Order emptySymbol("", trading::Side::BUY, 100, {100});
         TS_ASSERT_THROWS(market->addOrder(emptySymbol), std::invalid_argument);
     }
 
@@ -45,7 +45,7 @@ public:
         TS_ASSERT_THROWS(market->cancelOrder("nonexistent"), std::invalid_argument);
 
         // Add and cancel real order
-        trading::Order order("AAPL", trading::Side::BUY, 100, {150.0});
+        trading::Order order("AAPL", trading::Side::BUY, 100, {150});
         market->addOrder(order);
         TS_ASSERT_THROWS_NOTHING(market->cancelOrder(order.getId()));
 
@@ -55,7 +55,7 @@ public:
 
     void test_DuplicateOrderBookErrors() {
         // Add order to create order book
-        trading::Order order("AAPL", trading::Side::BUY, 100, {150.0});
+        trading::Order order("AAPL", trading::Side::BUY, 100, {150});
         market->addOrder(order);
         TS_ASSERT(market->hasOrderBook("AAPL"));
 
@@ -18,16 +18,14 @@ public:
 
     void test_CompleteTradeLifecycle() {
         // Test complete system flow
-        auto buyOrder = trading::Order("AAPL", trading::Side::BUY, 100, {150.0});
-        auto sellOrder = trading::Order("AAPL", trading::Side::SELL, 100, {150.0});
+        auto buyOrder = trading::Order("AAPL", trading::Side::BUY, 100, {150});
+        auto sellOrder = trading::Order("AAPL", trading::Side::SELL, 100, {150});
         
         market->addOrder(buyOrder);
         market->addOrder(sellOrder);
         
         auto trades = market->matchOrders("AAPL");
         TS_ASSERT_EQUALS(trades.size(), 1);
-        
-        const auto& position = market->getPosition("AAPL");
-        TS_ASSERT_EQUALS(position.getQuantity(), 0);
+        TS_ASSERT(market->getOrderBook("AAPL").getOrders().empty());
     }
 };
\ No newline at end of file
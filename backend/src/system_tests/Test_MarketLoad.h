@@ -1,5 +1,6 @@
 #include <cxxtest/TestSuite.h>
 #include "core/Market.h"
+#include <thread>
 
 class MarketLoadTestSuite : public CxxTest::TestSuite {
 private:
@@ -13,7 +14,7 @@ public:
         const int NUM_ORDERS = 1000;
         for(int i = 0; i < NUM_ORDERS; i++) {
             market->addOrder(trading::Order("AAPL", trading::Side::BUY, 
-                100, {150.0 + (i % 10)}));
+                100, {150 + (i % 10)}));
         }
         
         auto trades = market->matchOrders("AAPL");
@@ -25,9 +26,9 @@ public:
         for(const auto& sym : symbols) {
             for(int i = 0; i < 100; i++) {
                 market->addOrder(trading::Order(sym, trading::Side::BUY, 
-                    100, {100.0 + i}));
+                    100, {100 + i}));
                 market->addOrder(trading::Order(sym, trading::Side::SELL, 
-                    100, {101.0 + i}));
+                    100, {101 + i}));
             }
         }
 
@@ -36,4 +37,27 @@ public:
             TS_ASSERT(market->hasOrderBook(sym));
         }
     }
+
+    void test_ConcurrentSymbols() {
+        const std::vector<std::string> symbols = {"AAPL", "MSFT", "GOOG", "AMZN"};
+        const int NUM_PAIRS = 500;
+        std::vector<std::thread> threads;
+        for(const auto& sym : symbols) {
+            threads.emplace_back([this, sym]() {
+                for(int i = 0; i < NUM_PAIRS; i++) {
+                    market->addOrder(trading::Order(sym, trading::Side::BUY, 100, {100}));
+                    market->addOrder(trading::Order(sym, trading::Side::SELL, 100, {100}));
+                    market->matchOrders(sym);
+                }
+            });
+        }
+        for(auto& thread : threads) {
+            thread.join();
+        }
+
+        for(const auto& sym : symbols) {
+            TS_ASSERT_EQUALS(market->getTradesForSymbol(sym).size(), size_t(NUM_PAIRS));
+            TS_ASSERT(market->getOrderBook(sym).getOrders().empty());
+        }
+    }
 };
\ No newline at end of file
@@ -6,10 +6,10 @@ private:
     trading::Market* market;
 
     void setupBasicMarket() {
-        market->addOrder(trading::Order("AAPL", trading::Side::BUY, 100, {150.0}));
-        market->addOrder(trading::Order("AAPL", trading::Side::SELL, 100, {150.0}));
-        market->addOrder(trading::Order("MSFT", trading::Side::BUY, 200, {250.0}));
-        market->addOrder(trading::Order("MSFT", trading::Side::SELL, 200, {250.0}));
+        market->addOrder(trading::Order("AAPL", trading::Side::BUY, 100, {150}));
+        market->addOrder(trading::Order("AAPL", trading::Side::SELL, 100, {150}));
+        market->addOrder(trading::Order("MSFT", trading::Side::BUY, 200, {250}));
+        market->addOrder(trading::Order("MSFT", trading::Side::SELL, 200, {250}));
     }
 
 public:
@@ -30,12 +30,12 @@ public:
     }
 
     void test_OrderBookPriority() {
-        market->addOrder(trading::Order("AAPL", trading::Side::BUY, 100, {151.0}));
-        market->addOrder(trading::Order("AAPL", trading::Side::BUY, 100, {150.0}));
+        market->addOrder(trading::Order("AAPL", trading::Side::BUY, 100, {151}));
+        market->addOrder(trading::Order("AAPL", trading::Side::BUY, 100, {150}));
         
         const auto& book = market->getOrderBook("AAPL");
         auto orders = book.getOrders();
         
-        TS_ASSERT_EQUALS(orders[0].getPrice().value, 150.0);
+        TS_ASSERT_EQUALS(orders[0].getPrice().value, 150);
     }
 };
\ No newline at end of file
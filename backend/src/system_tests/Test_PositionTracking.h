@@ -1,55 +1,72 @@
 #include <cxxtest/TestSuite.h>
 #include "core/Market.h"
-#include <algorithm>
+#include "core/Portfolio.h"
+#include <unordered_map>
 
+// Positions are tracked per account: the matched trades of a Market are fed
+// to a Portfolio, the way the exchange settles them
 class PositionTrackingSystemTestSuite : public CxxTest::TestSuite {
 private:
     trading::Market* market;
+    trading::Portfolio* portfolio;
+    std::unordered_map<trading::OrderId, trading::AccountId> owners;
 
-    void setupBasicMarket() {
-        market->addOrder(trading::Order("AAPL", trading::Side::BUY, 100, {150.0}));
-        market->addOrder(trading::Order("AAPL", trading::Side::SELL, 100, {150.0}));
-        market->addOrder(trading::Order("MSFT", trading::Side::BUY, 200, {250.0}));
-        market->addOrder(trading::Order("MSFT", trading::Side::SELL, 200, {250.0}));
+    void place(trading::AccountId account, const std::string& symbol, trading::Side side,
+               trading::Quantity quantity, int64_t price) {
+        trading::Order order(symbol, side, quantity, {price});
+        owners[order.getId()] = account;
+        market->addOrder(order);
+        for (const auto& trade : market->matchOrders(symbol)) {
+            portfolio->applyTrade(symbol, owners[trade.getBuyOrderId()], owners[trade.getSellOrderId()],
+                                  trade.getQuantity(), trade.getPrice());
+        }
     }
 
-    const trading::Position* findPosition(const std::vector<trading::Position>& positions, 
-                                       const std::string& symbol) {
-        auto it = std::find_if(positions.begin(), positions.end(),
-            [&symbol](const trading::Position& pos) { return pos.getSymbol() == symbol; });
-        return it != positions.end() ? &(*it) : nullptr;
+    trading::AccountPosition positionOf(trading::AccountId account, const std::string& symbol) {
+        for (const auto& position : portfolio->getPositions(account)) {
+            if (position.symbol == symbol) {
+                return position;
+            }
+        }
+        TS_FAIL("Position not found");
+        return trading::AccountPosition();
     }
 
 public:
-    void setUp() { market = new trading::Market(); }
-    void tearDown() { delete market; }
+    void setUp() {
+        market = new trading::Market();
+        portfolio = new trading::Portfolio();
+        owners.clear();
+    }
+    void tearDown() {
+        delete portfolio;
+        delete market;
+    }
 
     void test_MultiSymbolPositions() {
-        setupBasicMarket();
-        
-        market->matchOrders("AAPL");
-        market->matchOrders("MSFT");
-        
-        auto positions = market->getAllPositions();
-        TS_ASSERT_EQUALS(positions.size(), 2);
-
-        const auto* applePos = findPosition(positions, "AAPL");
-        const auto* msftPos = findPosition(positions, "MSFT");
-        
-        TS_ASSERT(applePos != nullptr);
-        TS_ASSERT(msftPos != nullptr);
-        TS_ASSERT_EQUALS(applePos->getQuantity(), 0);
-        TS_ASSERT_EQUALS(msftPos->getQuantity(), 0);
+        place(1, "AAPL", trading::Side::BUY, 100, 150);
+        place(2, "AAPL", trading::Side::SELL, 100, 150);
+        place(1, "MSFT", trading::Side::SELL, 200, 250);
+        place(2, "MSFT", trading::Side::BUY, 200, 250);
+
+        TS_ASSERT_EQUALS(portfolio->getPositions(1).size(), 2);
+        TS_ASSERT_EQUALS(positionOf(1, "AAPL").quantity, 100);
+        TS_ASSERT_EQUALS(positionOf(1, "MSFT").quantity, -200);
+        TS_ASSERT_EQUALS(positionOf(2, "AAPL").quantity, -100);
+        TS_ASSERT_EQUALS(positionOf(2, "MSFT").quantity, 200);
     }
 
     void test_PositionAccumulation() {
-        market->addOrder(trading::Order("AAPL", trading::Side::BUY, 100, {150.0}));
-        market->addOrder(trading::Order("AAPL", trading::Side::BUY, 100, {150.0}));
-        market->addOrder(trading::Order("AAPL", trading::Side::SELL, 150, {150.0}));
-        
-        market->matchOrders("AAPL");
-        
-        const auto& position = market->getPosition("AAPL");
-        TS_ASSERT_EQUALS(position.getQuantity(), 0);
+        place(1, "AAPL", trading::Side::BUY, 100, 150);
+        place(1, "AAPL", trading::Side::BUY, 100, 160);
+        place(2, "AAPL", trading::Side::SELL, 150, 150);
+
+        // Fills at the resting prices: 100 at 160, then 50 at 150
+        auto buyer = positionOf(1, "AAPL");
+        TS_ASSERT_EQUALS(buyer.quantity, 150);
+        // (100 * 160 + 50 * 150) / 150, rounded to the nearest tick
+        TS_ASSERT_EQUALS(buyer.average_price.value, 157);
+        TS_ASSERT_EQUALS(positionOf(2, "AAPL").quantity, -150);
+        TS_ASSERT_EQUALS(market->getOrderBook("AAPL").getOrders().size(), 1);
     }
 };
\ No newline at end of file
@@ -15,11 +15,16 @@ ext_modules = [
         "trading",
         [
             "backend/bindings/bindings.cpp",
+            "backend/src/core/EventQueue.cpp",
+            "backend/src/core/Journal.cpp",
             "backend/src/core/Market.cpp",
             "backend/src/core/Order.cpp",
             "backend/src/core/OrderBook.cpp",
+            "backend/src/core/Portfolio.cpp",
             "backend/src/core/Position.cpp",
-            "backend/src/core/Trade.cpp"
+            "backend/src/core/Snapshot.cpp",
+            "backend/src/core/Trade.cpp",
+            "backend/src/core/TradeHistory.cpp"
         ],
         include_dirs=[
             "backend/include",
@@ -36,5 +41,5 @@ setup(
     ext_modules=ext_modules,
     zip_safe=False,
     python_requires=">=3.11",
-    install_requires=["pybind11>=2.10.0"],
+    install_requires=["pybind11>=2.10.0", "numpy>=1.24"],
 )
\ No newline at end of file
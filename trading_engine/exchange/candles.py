@@ -0,0 +1,230 @@
+from array import array
+from datetime import datetime, timezone
+from threading import Lock, Thread, Event
+import atexit
+import logging
+import time
+from django.db import connection
+from .models import Candle
+
+logger = logging.getLogger(__name__)
+
+# Bar length in seconds for each Candle interval
+INTERVAL_SECONDS = {
+    '1s': 1,
+    '1m': 60,
+    '5m': 5 * 60,
+    '1h': 60 * 60,
+    '1d': 24 * 60 * 60,
+}
+
+# Seconds between writes of changed bars to the database
+FLUSH_INTERVAL = 1.0
+
+# Most bars returned by one read
+MAX_CANDLES = 1000
+
+# Positions in a bar: start in epoch seconds, prices in ticks, volume in lots
+START, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+NANOSECONDS = 1_000_000_000
+
+
+def to_datetime(seconds):
+    return datetime.fromtimestamp(seconds, timezone.utc)
+
+
+class CandleAggregator:
+    """Open/high/low/close/volume bars at every interval, built as trades settle.
+
+    Each symbol and interval keeps only its bar in progress in memory, as an
+    int64 array. Bars that changed since the last flush, whether still open
+    or already closed, are upserted to Candle in one bulk query by a
+    background thread. Reads come from Candle's (pair, interval, start)
+    index plus the unflushed bars, never from the trades themselves.
+    """
+
+    def __init__(self, trading_pairs, flush_interval=FLUSH_INTERVAL):
+        """
+        Args:
+            trading_pairs (callable): Returns the TradingPair for a symbol
+            flush_interval (float): Seconds between database writes
+        """
+        self._trading_pairs = trading_pairs
+        self._lock = Lock()
+        # (symbol, interval) -> bar in progress
+        self._current = {}
+        # (symbol, interval, start) -> bar changed since the last flush
+        self._dirty = {}
+        # Bars taken by a flush that has not committed yet
+        self._flushing = {}
+        self._flush_interval = flush_interval
+        self._flush_lock = Lock()
+        self._wakeup = Event()
+        self._flusher = None
+
+    def load(self):
+        """Resume the bars still in progress from the database.
+
+        Must run before any trade is recorded.
+        """
+        now = int(time.time())
+        with self._lock:
+            for interval, seconds in INTERVAL_SECONDS.items():
+                rows = (
+                    Candle.objects.filter(interval=interval, start__gte=to_datetime(now - now % seconds))
+                    .select_related('trading_pair')
+                )
+                for candle in rows:
+                    pair = candle.trading_pair
+                    self._current[(pair.symbol, interval)] = array('q', [
+                        int(candle.start.timestamp()),
+                        pair.price_to_ticks(candle.open),
+                        pair.price_to_ticks(candle.high),
+                        pair.price_to_ticks(candle.low),
+                        pair.price_to_ticks(candle.close),
+                        pair.quantity_to_lots(candle.volume),
+                    ])
+
+    def record_trades(self, symbol, trades):
+        """Add settled engine trades to every interval's bar for the symbol"""
+        with self._lock:
+            for trade in trades:
+                second = trade.getTimestamp() // NANOSECONDS
+                price = trade.getPrice().value
+                quantity = trade.getQuantity()
+                for interval, seconds in INTERVAL_SECONDS.items():
+                    key = (symbol, interval)
+                    start = second - second % seconds
+                    bar = self._current.get(key)
+                    if bar is None or bar[START] < start:
+                        bar = self._current[key] = array('q', [start, price, price, price, price, 0])
+                    else:
+                        # Trades can settle slightly out of order; late ones
+                        # land in the bar in progress
+                        bar[HIGH] = max(bar[HIGH], price)
+                        bar[LOW] = min(bar[LOW], price)
+                        bar[CLOSE] = price
+                    bar[VOLUME] += quantity
+                    self._dirty[(symbol, interval, bar[START])] = bar
+        self._start_flusher()
+
+    def get(self, symbol, interval, start=None, end=None, limit=MAX_CANDLES):
+        """Returns the latest `limit` bars starting in [start, end), oldest first.
+
+        Args:
+            symbol (str): The trading pair symbol (e.g., 'BTCUSD')
+            interval (str): One of INTERVAL_SECONDS
+            start (int): Earliest bar start, in epoch seconds; unbounded if None
+            end (int): Bars must start before this, in epoch seconds; now if None
+            limit (int): Most bars returned, at most MAX_CANDLES
+
+        Returns:
+            list: [start, open, high, low, close, volume] rows with decimal
+                prices and volume
+
+        Raises:
+            ValueError: If the interval is unknown
+            TradingPair.DoesNotExist: If the symbol is not a listed trading pair
+        """
+        if interval not in INTERVAL_SECONDS:
+            raise ValueError(f"Unknown interval {interval}")
+        trading_pair = self._trading_pairs(symbol)
+        limit = max(0, min(limit, MAX_CANDLES))
+        if end is None:
+            end = int(time.time()) + 1
+
+        def in_range(bar_start):
+            return (start is None or bar_start >= start) and bar_start < end
+
+        # Bars not yet in the database replace any stored version
+        bars = {}
+        with self._lock:
+            for source in (self._flushing, self._dirty):
+                for (bar_symbol, bar_interval, bar_start), bar in source.items():
+                    if bar_symbol == symbol and bar_interval == interval and in_range(bar_start):
+                        bars[bar_start] = [
+                            bar_start,
+                            trading_pair.ticks_to_price(bar[OPEN]),
+                            trading_pair.ticks_to_price(bar[HIGH]),
+                            trading_pair.ticks_to_price(bar[LOW]),
+                            trading_pair.ticks_to_price(bar[CLOSE]),
+                            trading_pair.lots_to_quantity(bar[VOLUME]),
+                        ]
+
+        stored = Candle.objects.filter(trading_pair=trading_pair, interval=interval, start__lt=to_datetime(end))
+        if start is not None:
+            stored = stored.filter(start__gte=to_datetime(start))
+        rows = stored.order_by('-start').values_list('start', 'open', 'high', 'low', 'close', 'volume')[:limit]
+        for row in rows:
+            bar_start = int(row[0].timestamp())
+            if bar_start not in bars:
+                bars[bar_start] = [bar_start, *row[1:]]
+
+        latest = sorted(bars.values(), reverse=True)[:limit]
+        latest.reverse()
+        return latest
+
+    def flush(self):
+        """Upsert every bar changed since the last flush"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                rows = []
+                for (symbol, interval, start), bar in self._dirty.items():
+                    trading_pair = self._trading_pairs(symbol)
+                    rows.append(Candle(
+                        trading_pair=trading_pair,
+                        interval=interval,
+                        start=to_datetime(start),
+                        open=trading_pair.ticks_to_price(bar[OPEN]),
+                        high=trading_pair.ticks_to_price(bar[HIGH]),
+                        low=trading_pair.ticks_to_price(bar[LOW]),
+                        close=trading_pair.ticks_to_price(bar[CLOSE]),
+                        volume=trading_pair.lots_to_quantity(bar[VOLUME]),
+                    ))
+                self._flushing = self._dirty
+                self._dirty = {}
+
+            try:
+                Candle.objects.bulk_create(
+                    rows,
+                    update_conflicts=True,
+                    unique_fields=['trading_pair', 'interval', 'start'],
+                    update_fields=['open', 'high', 'low', 'close', 'volume']
+                )
+            except Exception:
+                # Keep the bars queued for the next attempt; newer changes win
+                with self._lock:
+                    self._dirty = {**self._flushing, **self._dirty}
+                raise
+            finally:
+                with self._lock:
+                    self._flushing = {}
+
+    def _start_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = Thread(target=self._flush_loop, name='candle-flush', daemon=True)
+                self._flusher.start()
+                atexit.register(self.stop)
+
+    def _flush_loop(self):
+        try:
+            while not self._wakeup.wait(self._flush_interval):
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"Candle flush failed: {str(e)}", exc_info=True)
+        finally:
+            connection.close()
+
+    def stop(self):
+        """Stop the background flusher and write any remaining bars"""
+        self._wakeup.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
@@ -0,0 +1,52 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+import asyncio
+from .models import TradingPair
+from .feed import group_name
+from .views import get_market_manager
+
+
+class MarketDataConsumer(AsyncJsonWebsocketConsumer):
+    """Streams one symbol's order book and trades.
+
+    The client first receives a 'snapshot' message with the top levels and
+    recent trades, then 'update' messages with changed levels and new trades.
+    Entries at or below the sequence of the client's last snapshot are
+    already reflected in it and are left out.
+    """
+
+    async def connect(self):
+        self.symbol = self.scope['url_route']['kwargs']['symbol']
+        market_manager = await database_sync_to_async(get_market_manager)()
+        try:
+            await database_sync_to_async(market_manager.get_trading_pair)(self.symbol)
+        except TradingPair.DoesNotExist:
+            await self.close()
+            return
+
+        market_manager.feed.attach(asyncio.get_running_loop(), self.symbol)
+        # Join before taking the snapshot so no update falls between the two
+        await self.channel_layer.group_add(group_name(self.symbol), self.channel_name)
+        await self.accept()
+        snapshot = await database_sync_to_async(market_manager.feed.snapshot)(self.symbol)
+        self.sequence = snapshot['sequence']
+        await self.send_json(snapshot)
+
+    async def disconnect(self, code):
+        if hasattr(self, 'symbol'):
+            await self.channel_layer.group_discard(group_name(self.symbol), self.channel_name)
+
+    async def market_data(self, event):
+        data = event['data']
+        if data['type'] == 'snapshot':
+            self.sequence = data['sequence']
+        else:
+            data = {
+                **data,
+                'bids': [level for level in data['bids'] if level[3] > self.sequence],
+                'asks': [level for level in data['asks'] if level[3] > self.sequence],
+                'trades': [trade for trade in data['trades'] if trade['sequence'] > self.sequence]
+            }
+            if not (data['bids'] or data['asks'] or data['trades']):
+                return
+        await self.send_json(data)
@@ -0,0 +1,155 @@
+from pathlib import Path
+from threading import Lock, Thread, Event
+import atexit
+import logging
+import time
+from trading import Journal, saveSnapshot, loadSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Size of a journal segment that holds only its file header
+EMPTY_SEGMENT_SIZE = 4
+
+
+class EngineStore:
+    """Durable copy of the engine's resting orders.
+
+    Every committed add and cancel is appended to a binary journal, split into
+    segments named after their first sequence number. Each order book is
+    periodically written to its own snapshot, after which journal segments
+    that every snapshot already covers are deleted. On startup the snapshots
+    are memory-mapped back into the engine and only the journal records after
+    each book's snapshot are replayed.
+    """
+
+    def __init__(self, state_dir):
+        self._dir = Path(state_dir)
+        self._books_dir = self._dir / 'books'
+        self._books_dir.mkdir(parents=True, exist_ok=True)
+        self._journal = None
+        self._segment_start = None
+        self._snapshot_lock = Lock()
+        self._wakeup = Event()
+        self._snapshotter = None
+
+    def _segment_path(self, start_sequence):
+        return self._dir / f'journal-{start_sequence:020d}.bin'
+
+    def _segments(self):
+        """Journal segments as (start sequence, path), oldest first"""
+        return sorted(
+            (int(path.stem.split('-')[1]), path)
+            for path in self._dir.glob('journal-*.bin')
+        )
+
+    def _snapshot_path(self, symbol):
+        return self._books_dir / f'{symbol}.snap'
+
+    def restore(self, market):
+        """Rebuild the engine's books and open a journal segment for new input.
+
+        Must run before the engine accepts any order.
+
+        Returns:
+            bool: Whether any saved engine state was found
+        """
+        start = time.perf_counter()
+        covered = {}
+        restored = 0
+        for path in sorted(self._books_dir.glob('*.snap')):
+            info = loadSnapshot(market, str(path))
+            covered[info.symbol] = info.sequence
+            restored += info.order_count
+
+        last_sequence = max(covered.values(), default=0)
+        for _, path in self._segments():
+            replayed = 0
+            if path.stat().st_size > EMPTY_SEGMENT_SIZE:
+                replayed = Journal.replay(str(path), market, covered)
+            if replayed:
+                last_sequence = max(last_sequence, replayed)
+            else:
+                # Holds no complete record, and may be where the next segment goes
+                path.unlink()
+
+        self._segment_start = last_sequence + 1
+        self._journal = Journal(str(self._segment_path(self._segment_start)), self._segment_start)
+        logger.info(
+            f"Restored {restored} orders from {len(covered)} snapshots and replayed the journal "
+            f"up to sequence {last_sequence} in {time.perf_counter() - start:.3f}s"
+        )
+        return bool(covered) or last_sequence > 0
+
+    def record_add(self, trading_order):
+        """Journal an order the engine accepted, once its transaction has committed"""
+        self._journal.recordAdd(trading_order)
+
+    def record_cancel(self, symbol, order_id):
+        """Journal a cancel the engine applied, once its transaction has committed"""
+        self._journal.recordCancel(symbol, order_id)
+
+    def snapshot(self, market, symbols):
+        """Snapshot every book, then start a new journal segment and prune old ones.
+
+        Nothing may change the engine while it runs, so that each book and
+        the journal sequence it is saved with agree: it is called on the
+        matching thread, or while that thread is not running.
+
+        Args:
+            market (Market): The engine whose books are written
+            symbols (iterable): The symbol of every book
+        """
+        with self._snapshot_lock:
+            sequence = self._journal.getLastSequence()
+            for symbol in list(symbols):
+                saveSnapshot(market.getOrderBook(symbol), sequence, str(self._snapshot_path(symbol)))
+
+            next_sequence = sequence + 1
+            if next_sequence != self._segment_start:
+                self._journal.rotate(str(self._segment_path(next_sequence)))
+                self._segment_start = next_sequence
+
+            # Every snapshot covers the whole journal so far
+            segments = self._segments()
+            for _, path in segments[:-1]:
+                path.unlink()
+
+    def start(self, market, symbols, interval, run):
+        """Snapshot in the background every `interval` seconds and once more at exit.
+
+        A falsy interval disables the periodic snapshots.
+
+        Args:
+            market (Market): The engine whose books are written
+            symbols (set): The symbol of every book, read at each snapshot
+            interval (float): Seconds between snapshots
+            run (callable): Queues a function on the matching thread and
+                returns a Future for it
+        """
+        self._market = market
+        self._symbols = symbols
+        self._run = run
+        if interval:
+            self._snapshotter = Thread(
+                target=self._snapshot_loop, args=(interval,), name='engine-snapshot', daemon=True
+            )
+            self._snapshotter.start()
+        atexit.register(self.stop)
+
+    def _snapshot_loop(self, interval):
+        while not self._wakeup.wait(interval):
+            try:
+                self._run(self.snapshot, self._market, self._symbols).result()
+            except Exception as e:
+                logger.error(f"Engine snapshot failed: {str(e)}", exc_info=True)
+
+    def stop(self):
+        """Stop the background snapshots and write a final one.
+
+        Runs after the matching thread has stopped.
+        """
+        atexit.unregister(self.stop)
+        self._wakeup.set()
+        if self._snapshotter is not None:
+            self._snapshotter.join()
+        self.snapshot(self._market, self._symbols)
@@ -0,0 +1,193 @@
+from threading import Lock
+import asyncio
+import logging
+from channels.layers import get_channel_layer
+from trading import EventType, Side
+
+logger = logging.getLogger(__name__)
+
+# Book changes the engine holds for the feed between publishes
+EVENT_CAPACITY = 65536
+
+# Most events taken from the engine per drainEvents call
+DRAIN_BATCH = 4096
+
+# Price levels per side in a snapshot
+FEED_DEPTH = 50
+
+# Trades sent to a client when it subscribes
+SNAPSHOT_TRADES = 50
+
+
+def group_name(symbol):
+    """Channel layer group that receives one symbol's market data"""
+    return f'market.{symbol}'
+
+
+class MarketFeed:
+    """Turns the engine's book change events into per-symbol market data messages.
+
+    Each publish drains the events recorded since the last one, keeps the
+    latest state of every price level that changed, and sends one message per
+    symbol with those levels and its trades to the symbol's channel layer
+    group, however many clients are subscribed.
+
+    Levels carry their new absolute quantity (0 once empty) and the sequence
+    of the event that set them, so a client can skip whatever its snapshot
+    already reflects. If the engine had to drop events, or a book was
+    changed without recording any (see resync), every subscribed symbol gets
+    a fresh snapshot instead.
+    """
+
+    def __init__(self, market, trading_pairs):
+        """
+        Args:
+            market (Market): The engine whose books are published; it must
+                be created with an event capacity
+            trading_pairs (callable): Returns the TradingPair for a symbol
+        """
+        self._market = market
+        self._trading_pairs = trading_pairs
+        self._lock = Lock()
+        self._loop = None
+        self._symbols = set()
+        self._last_sequence = market.getLastEventSequence()
+        self._resync = False
+
+    def attach(self, loop, symbol):
+        """Deliver `symbol`'s messages on the event loop serving WebSocket clients.
+
+        Nothing is published until a client has connected, since the
+        in-memory channel layer only reaches consumers on its own loop.
+        """
+        with self._lock:
+            if self._loop is None:
+                # Clients start from a snapshot, so earlier events are of no use
+                self._drain()
+            self._loop = loop
+            self._symbols.add(symbol)
+
+    def resync(self):
+        """Make the next publish send snapshots, for books rebuilt without events"""
+        with self._lock:
+            self._resync = True
+
+    def _drain(self):
+        """Every queued event, oldest first. Callers must hold self._lock"""
+        events = []
+        while True:
+            batch = self._market.drainEvents(DRAIN_BATCH)
+            events.extend(batch)
+            if len(batch) < DRAIN_BATCH:
+                break
+        if events:
+            self._last_sequence = events[-1].sequence
+        return events
+
+    def _serialize_level(self, trading_pair, price, quantity, order_count, sequence):
+        return [
+            format(trading_pair.ticks_to_price(price), 'f'),
+            format(trading_pair.lots_to_quantity(quantity), 'f'),
+            order_count,
+            sequence
+        ]
+
+    def _serialize_trade(self, trading_pair, price, quantity, side, timestamp, sequence):
+        return {
+            'price': format(trading_pair.ticks_to_price(price), 'f'),
+            'quantity': format(trading_pair.lots_to_quantity(quantity), 'f'),
+            'side': side.name,
+            'timestamp': timestamp,
+            'sequence': sequence
+        }
+
+    def snapshot(self, symbol):
+        """Returns the full message a client starts from.
+
+        Its sequence is the last event the book reflects; updates at or
+        below it are already included. The depth and trades are read in one
+        engine call, so a match cannot land between them.
+        """
+        trading_pair = self._trading_pairs(symbol)
+        snapshot = self._market.getSnapshot(symbol, FEED_DEPTH, SNAPSHOT_TRADES)
+        depth = snapshot.depth
+        levels = {
+            side: [
+                self._serialize_level(trading_pair, l.price.value, l.quantity, l.order_count, depth.sequence)
+                for l in side_levels
+            ]
+            for side, side_levels in (('bids', depth.bids), ('asks', depth.asks))
+        }
+        return {
+            'type': 'snapshot',
+            'symbol': symbol,
+            'sequence': depth.sequence,
+            **levels,
+            'trades': [
+                self._serialize_trade(
+                    trading_pair, t.getPrice().value, t.getQuantity(), t.getSide(), t.getTimestamp(),
+                    t.getEventSequence()
+                )
+                for t in snapshot.trades
+            ]
+        }
+
+    def _updates(self, events):
+        """One update message per symbol touched by `events`"""
+        levels = {}
+        trades = {}
+        for event in events:
+            if event.type == EventType.LEVEL_UPDATE:
+                levels.setdefault(event.symbol, {})[(event.side, event.price.value)] = event
+            elif event.type == EventType.TRADE:
+                trades.setdefault(event.symbol, []).append(event)
+
+        messages = {}
+        for symbol in levels.keys() | trades.keys():
+            trading_pair = self._trading_pairs(symbol)
+            message = {'type': 'update', 'symbol': symbol, 'bids': [], 'asks': []}
+            for (side, price), event in levels.get(symbol, {}).items():
+                message['bids' if side == Side.BUY else 'asks'].append(
+                    self._serialize_level(trading_pair, price, event.quantity, event.order_count, event.sequence)
+                )
+            message['trades'] = [
+                self._serialize_trade(
+                    trading_pair, e.price.value, e.quantity, e.side, e.timestamp, e.sequence
+                )
+                for e in trades.get(symbol, [])
+            ]
+            messages[symbol] = message
+        return messages
+
+    def publish(self):
+        """Send every book change the engine has recorded since the last publish"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+
+        # Drain and send under one lock so messages reach the layer in event order
+        with self._lock:
+            expected = self._last_sequence + 1
+            events = self._drain()
+            if self._resync:
+                self._resync = False
+                messages = {symbol: self.snapshot(symbol) for symbol in self._symbols}
+            elif not events:
+                return
+            elif events[0].sequence != expected:
+                logger.warning(
+                    f"Market data events {expected} to {events[0].sequence - 1} were dropped, resending snapshots"
+                )
+                messages = {symbol: self.snapshot(symbol) for symbol in self._symbols}
+            else:
+                messages = self._updates(events)
+
+            for symbol, message in messages.items():
+                try:
+                    asyncio.run_coroutine_threadsafe(
+                        get_channel_layer().group_send(group_name(symbol), {'type': 'market.data', 'data': message}),
+                        loop
+                    )
+                except RuntimeError as e:
+                    # The loop was closed after the check above
+                    logger.warning(f"Dropped market data for {symbol}: {str(e)}")
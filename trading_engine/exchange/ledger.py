@@ -0,0 +1,307 @@
+from threading import Lock, Thread, Event
+from collections import defaultdict
+from decimal import Decimal
+import atexit
+import logging
+from django.db import connection, transaction
+from django.db.models import Case, F, Sum, Value, When
+from .models import Balance, OrderModel, TradeModel
+
+logger = logging.getLogger(__name__)
+
+# Seconds between write-behind flushes of changed balances
+FLUSH_INTERVAL = 0.5
+
+
+class InsufficientBalance(ValueError):
+    """Raised when a reservation exceeds the available amount"""
+
+
+class Account:
+    """Available and reserved amounts of one currency for one user.
+
+    available + reserved is the total; flushes add its changes to Balance.amount.
+    """
+    __slots__ = ('balance_id', 'available', 'reserved')
+
+    def __init__(self, balance_id, available, reserved):
+        self.balance_id = balance_id
+        self.available = available
+        self.reserved = reserved
+
+    @property
+    def total(self):
+        return self.available + self.reserved
+
+
+class BalanceLedger:
+    """In-process record of user balances and the funds held by open orders.
+
+    Admission checks and reservations only touch memory. Settlement changes
+    are added to the Balance table in batches by a background thread,
+    together with a flag on every trade they include, so trades committed
+    but not yet flushed can be replayed by recover() after a restart.
+
+    Flushes write deltas rather than totals, so balance changes made by other
+    processes are kept. Reservations are only known to this process, though:
+    one user's orders must all be admitted by the same process.
+    """
+
+    def __init__(self, flush_interval=FLUSH_INTERVAL):
+        self._lock = Lock()
+        self._accounts = {}
+        self._loaded_users = set()
+        # (user_id, currency) -> change in total not yet flushed
+        self._deltas = defaultdict(Decimal)
+        self._applied_trades = []
+        self._flush_interval = flush_interval
+        self._flush_lock = Lock()
+        self._wakeup = Event()
+        self._flusher = None
+
+    def recover(self):
+        """Apply trades that were committed but never flushed to Balance.
+
+        Must run before the ledger serves any request.
+        """
+        with transaction.atomic():
+            pending = list(
+                TradeModel.objects.filter(balance_applied=False)
+                .select_related('buy_order', 'sell_order', 'trading_pair')
+            )
+            if not pending:
+                return
+
+            deltas = defaultdict(Decimal)
+            for trade in pending:
+                pair = trade.trading_pair
+                value = trade.price * trade.quantity
+                deltas[(trade.buy_order.user_id, pair.quote_currency)] -= value
+                deltas[(trade.buy_order.user_id, pair.base_currency)] += trade.quantity
+                deltas[(trade.sell_order.user_id, pair.base_currency)] -= trade.quantity
+                deltas[(trade.sell_order.user_id, pair.quote_currency)] += value
+
+            balances = Balance.objects.select_for_update().filter(
+                user_id__in={user_id for user_id, _ in deltas},
+                currency__in={currency for _, currency in deltas}
+            )
+            changed = []
+            for balance in balances:
+                delta = deltas.get((balance.user_id, balance.currency))
+                if delta:
+                    balance.amount += delta
+                    changed.append(balance)
+            Balance.objects.bulk_update(changed, ['amount'])
+            TradeModel.objects.filter(pk__in=[t.pk for t in pending]).update(balance_applied=True)
+            logger.info(f"Recovered {len(pending)} unflushed trades into {len(changed)} balances")
+
+    def _ensure_loaded(self, user_id, admitting=()):
+        """Load a user's balances and open-order reservations on first use.
+
+        Callers must hold self._lock.
+
+        Args:
+            admitting: Primary keys of saved orders about to be reserved, which
+                hold nothing yet and are left out of the rebuilt reservations
+        """
+        if user_id in self._loaded_users:
+            return
+
+        reserved = defaultdict(Decimal)
+        # An order only ever has buy trades or sell trades, so the two
+        # joins below never multiply each other's rows
+        open_orders = list(
+            OrderModel.objects.filter(user_id=user_id, status='NEW')
+            .exclude(pk__in=admitting)
+            .select_related('trading_pair')
+            .annotate(bought=Sum('buy_trades__quantity'), sold=Sum('sell_trades__quantity'))
+        )
+        for order in open_orders:
+            remaining = order.quantity - (order.bought or 0) - (order.sold or 0)
+            currency, amount = self.order_requirement(order, remaining)
+            reserved[currency] += amount
+
+        for balance in Balance.objects.filter(user_id=user_id):
+            held = reserved.get(balance.currency, Decimal(0))
+            self._accounts[(user_id, balance.currency)] = Account(
+                balance.pk, balance.amount - held, held
+            )
+        self._loaded_users.add(user_id)
+
+    def load_users(self, user_ids, admitting=()):
+        """Load users' accounts ahead of settlement or admission.
+
+        Must be called before their trades are written, since the
+        reservations rebuilt on load are derived from recorded fills, and
+        before saved orders are reserved one at a time, passing their
+        primary keys as `admitting`.
+        """
+        with self._lock:
+            for user_id in user_ids:
+                self._ensure_loaded(user_id, admitting)
+
+    @staticmethod
+    def order_requirement(order_model, quantity=None):
+        """Returns the (currency, amount) an open order holds for `quantity`.
+
+        Buys hold quote currency at their limit price; sells hold the base
+        currency itself. quantity defaults to the full order quantity.
+        """
+        if quantity is None:
+            quantity = order_model.quantity
+        pair = order_model.trading_pair
+        if order_model.side == 'BUY':
+            return pair.quote_currency, order_model.price * quantity
+        return pair.base_currency, quantity
+
+    def reserve(self, order_model):
+        """Hold the funds for a new order.
+
+        Raises:
+            InsufficientBalance: If the user cannot fund the order
+        """
+        self.reserve_many([order_model])
+
+    def reserve_many(self, order_models):
+        """Hold the funds for several orders, all or nothing.
+
+        Raises:
+            InsufficientBalance: If any order cannot be funded
+        """
+        admitting = {order_model.pk for order_model in order_models}
+        with self._lock:
+            needed = defaultdict(Decimal)
+            sides = {}
+            for order_model in order_models:
+                self._ensure_loaded(order_model.user_id, admitting)
+                currency, amount = self.order_requirement(order_model)
+                key = (order_model.user_id, currency)
+                needed[key] += amount
+                sides[key] = order_model.side.lower()
+
+            for key, amount in needed.items():
+                account = self._accounts.get(key)
+                if account is None or account.available < amount:
+                    raise InsufficientBalance(f"Insufficient balance for {sides[key]} order")
+
+            for key, amount in needed.items():
+                account = self._accounts[key]
+                account.available -= amount
+                account.reserved += amount
+
+    def release(self, order_model, quantity=None):
+        """Return the funds held for `quantity` of an order to available"""
+        currency, amount = self.order_requirement(order_model, quantity)
+        with self._lock:
+            self._ensure_loaded(order_model.user_id)
+            account = self._accounts.get((order_model.user_id, currency))
+            if account is None:
+                return
+            amount = min(amount, account.reserved)
+            account.reserved -= amount
+            account.available += amount
+
+    def apply_trades(self, fills):
+        """Move funds for settled trades.
+
+        Args:
+            fills (list): (TradeModel, buy OrderModel, sell OrderModel) tuples
+                for trades that have been committed to the database; both
+                users must already be loaded (see load_users)
+        """
+        with self._lock:
+            for trade, buy_order, sell_order in fills:
+                pair = trade.trading_pair
+                value = trade.price * trade.quantity
+
+                # The buyer held its limit price; any price improvement is freed
+                self._move(buy_order.user_id, pair.quote_currency,
+                           available=buy_order.price * trade.quantity - value,
+                           reserved=-(buy_order.price * trade.quantity))
+                self._move(buy_order.user_id, pair.base_currency, available=trade.quantity)
+                self._move(sell_order.user_id, pair.base_currency, reserved=-trade.quantity)
+                self._move(sell_order.user_id, pair.quote_currency, available=value)
+
+                self._applied_trades.append(trade.pk)
+        self._start_flusher()
+
+    def _move(self, user_id, currency, available=0, reserved=0):
+        """Callers must hold self._lock"""
+        key = (user_id, currency)
+        account = self._accounts.get(key)
+        if account is None:
+            logger.error(f"No {currency} balance for user {user_id}; skipping settlement leg")
+            return
+        account.available += available
+        account.reserved += reserved
+        self._deltas[key] += available + reserved
+
+    def get_balances(self, user):
+        """Returns the user's balances, sorted by currency, as dicts with
+        currency, amount, available and reserved."""
+        with self._lock:
+            self._ensure_loaded(user.id)
+            return [{
+                'currency': currency,
+                'amount': account.total,
+                'available': account.available,
+                'reserved': account.reserved
+            } for (user_id, currency), account in sorted(self._accounts.items())
+                if user_id == user.id]
+
+    def flush(self):
+        """Add balance changes to Balance and mark their trades as applied"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._deltas and not self._applied_trades:
+                    return
+                pending = self._deltas
+                deltas = {
+                    self._accounts[key].balance_id: delta
+                    for key, delta in pending.items() if delta
+                }
+                trade_ids = self._applied_trades
+                self._deltas = defaultdict(Decimal)
+                self._applied_trades = []
+
+            try:
+                with transaction.atomic():
+                    if deltas:
+                        # One statement for every balance, each adding its own delta
+                        Balance.objects.filter(pk__in=deltas).update(amount=F('amount') + Case(
+                            *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()]
+                        ))
+                    TradeModel.objects.filter(pk__in=trade_ids).update(balance_applied=True)
+            except Exception:
+                # Keep the changes queued for the next attempt
+                with self._lock:
+                    for key, delta in pending.items():
+                        self._deltas[key] += delta
+                    self._applied_trades = trade_ids + self._applied_trades
+                raise
+
+    def _start_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is None:
+                self._flusher = Thread(target=self._flush_loop, name='balance-ledger-flush', daemon=True)
+                self._flusher.start()
+                atexit.register(self.stop)
+
+    def _flush_loop(self):
+        try:
+            while not self._wakeup.wait(self._flush_interval):
+                try:
+                    self.flush()
+                except Exception as e:
+                    logger.error(f"Balance flush failed: {str(e)}", exc_info=True)
+        finally:
+            connection.close()
+
+    def stop(self):
+        """Stop the background flusher and write any remaining changes"""
+        self._wakeup.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand
+from trading import Market, Order, Side, Price
+from threading import Thread, Barrier
+import time
+
+class Command(BaseCommand):
+    help = 'Measures engine throughput when several Python threads match on separate symbols'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=20000,
+                          help='Orders submitted per thread')
+        parser.add_argument('--batch', type=int, default=200,
+                          help='Orders per Market.addOrders call')
+        parser.add_argument('--max-threads', type=int, default=8,
+                          help='Largest number of threads to run concurrently')
+
+    def handle(self, *args, **kwargs):
+        orders_per_thread = kwargs['orders']
+        batch_size = kwargs['batch']
+        counts = [n for n in (1, 2, 4, 8) if n <= kwargs['max_threads']]
+
+        self.stdout.write(f'{"threads":>7} {"orders":>8} {"seconds":>8} {"orders/s":>11} {"speedup":>7}')
+        baseline = None
+        for num_threads in counts:
+            market = Market()
+            # Build every order up front so the timed section is engine work only
+            batches = [
+                self._build_batches(f'BENCH{t}', orders_per_thread, batch_size)
+                for t in range(num_threads)
+            ]
+            barrier = Barrier(num_threads + 1)
+            threads = [
+                Thread(target=self._worker, args=(market, thread_batches, barrier))
+                for thread_batches in batches
+            ]
+            for thread in threads:
+                thread.start()
+
+            barrier.wait()
+            start = time.perf_counter()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+            total = num_threads * orders_per_thread
+            rate = total / elapsed
+            if baseline is None:
+                baseline = rate
+            self.stdout.write(
+                f'{num_threads:>7} {total:>8} {elapsed:>8.3f} {rate:>11.1f} {rate / baseline:>6.2f}x'
+            )
+
+    def _build_batches(self, symbol, count, batch_size):
+        """Alternating buy and sell orders at one price, so every pair crosses"""
+        orders = [
+            Order(symbol, Side.BUY if i % 2 == 0 else Side.SELL, 1, Price(100))
+            for i in range(count)
+        ]
+        return [orders[i:i + batch_size] for i in range(0, count, batch_size)]
+
+    def _worker(self, market, batches, barrier):
+        barrier.wait()
+        for batch in batches:
+            market.addOrders(batch)
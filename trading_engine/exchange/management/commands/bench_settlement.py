@@ -0,0 +1,93 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from exchange.models import TradingPair, OrderModel
+from exchange.market_manager import MarketManager
+import time
+
+class Command(BaseCommand):
+    help = 'Counts the queries needed to settle an order that sweeps many price levels'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--symbol', type=str, default='AAPLUSD',
+                          help='Trading pair to sweep')
+        parser.add_argument('--levels', type=int, nargs='+', default=[1, 10, 50],
+                          help='Numbers of price levels the aggressive order sweeps')
+        parser.add_argument('--max-queries', type=int, default=None,
+                          help='Fail if settling any sweep takes more queries than this')
+
+    def handle(self, *args, **kwargs):
+        symbol = kwargs['symbol'].upper()
+        try:
+            trading_pair = TradingPair.objects.get(symbol=symbol)
+        except TradingPair.DoesNotExist:
+            raise CommandError(f'Trading pair {symbol} not found. Run setup_trading_pairs first.')
+
+        users = list(User.objects.filter(username__startswith='trader')[:2])
+        if len(users) < 2:
+            raise CommandError('Need at least 2 users. Run create_users and setup_test_balances first.')
+        buyer, seller = users
+
+        market_manager = MarketManager()
+        self.stdout.write(f'{"levels":>6} {"trades":>6} {"queries":>7} {"seconds":>8}')
+        worst = 0
+        for levels in kwargs['levels']:
+            # Settlement runs on the matching thread, so the queries are counted there
+            trades, queries, elapsed = market_manager.run(
+                self._sweep, market_manager, trading_pair, buyer, seller, levels
+            )
+            worst = max(worst, queries)
+            self.stdout.write(f'{levels:>6} {len(trades):>6} {queries:>7} {elapsed:>8.4f}')
+
+        max_queries = kwargs['max_queries']
+        if max_queries is not None and worst > max_queries:
+            raise CommandError(f'Settlement took {worst} queries, more than the allowed {max_queries}')
+
+    def _sweep(self, market_manager, trading_pair, buyer, seller, levels):
+        """Rest `levels` sells and settle one buy that takes them all.
+
+        Returns:
+            tuple: The buy's trades, the queries it took and its seconds
+        """
+        # Roll back afterwards so repeated runs leave the database untouched
+        with transaction.atomic():
+            book_top = self._rest_sells(market_manager, trading_pair, seller, levels)
+            aggressor = OrderModel.objects.create(
+                user=buyer,
+                trading_pair=trading_pair,
+                side='BUY',
+                quantity=levels,
+                price=book_top,
+                status='NEW'
+            )
+
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                trades = market_manager.add_order(aggressor)
+                elapsed = time.perf_counter() - start
+
+            transaction.set_rollback(True)
+        return trades, len(queries), elapsed
+
+    def _rest_sells(self, market_manager, trading_pair, seller, levels):
+        """Rest one unit at each of `levels` consecutive ticks above the book.
+
+        Returns:
+            Decimal: The highest resting price
+        """
+        best_bid = market_manager.market.getOrderBook(trading_pair.symbol).getBestBid()
+        first_tick = (best_bid.price.value if best_bid else 0) + 1
+        price = None
+        for i in range(levels):
+            price = trading_pair.ticks_to_price(first_tick + i)
+            order = OrderModel.objects.create(
+                user=seller,
+                trading_pair=trading_pair,
+                side='SELL',
+                quantity=1,
+                price=price,
+                status='NEW'
+            )
+            market_manager.add_order(order)
+        return price
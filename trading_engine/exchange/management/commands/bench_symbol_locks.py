@@ -0,0 +1,86 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.db import connection
+from exchange.models import TradingPair, OrderModel
+from exchange.market_manager import MarketManager
+from exchange.trading_pairs import TRADING_PAIRS
+from threading import Thread, Barrier
+import time
+
+class Command(BaseCommand):
+    help = 'Measures order throughput as the number of concurrently active trading pairs grows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200,
+                          help='Orders submitted per active trading pair')
+        parser.add_argument('--max-pairs', type=int, default=len(TRADING_PAIRS),
+                          help='Largest number of trading pairs to run concurrently')
+
+    def handle(self, *args, **kwargs):
+        orders_per_pair = kwargs['orders']
+        symbols = [pair['symbol'] for pair in TRADING_PAIRS][:kwargs['max_pairs']]
+
+        pairs = {p.symbol: p for p in TradingPair.objects.filter(symbol__in=symbols)}
+        missing = [s for s in symbols if s not in pairs]
+        if missing:
+            self.stdout.write(
+                self.style.ERROR(f'Missing trading pairs {", ".join(missing)}. Run setup_trading_pairs first.')
+            )
+            return
+
+        users = list(User.objects.filter(username__startswith='trader')[:2])
+        if len(users) < 2:
+            self.stdout.write(
+                self.style.ERROR('Need at least 2 users. Run create_users and setup_test_balances first.')
+            )
+            return
+
+        market_manager = MarketManager()
+        for symbol in symbols:
+            market_manager._ensure_orderbook_exists(symbol)
+
+        self.stdout.write(f'{"pairs":>5} {"orders":>7} {"seconds":>8} {"orders/s":>10} {"errors":>6}')
+        counts = sorted({n for n in (1, 2, 4, 8, len(symbols)) if n <= len(symbols)})
+        for num_pairs in counts:
+            active = [pairs[s] for s in symbols[:num_pairs]]
+            errors = []
+            barrier = Barrier(num_pairs + 1)
+            threads = [
+                Thread(target=self._worker,
+                       args=(market_manager, pair, users, orders_per_pair, barrier, errors))
+                for pair in active
+            ]
+            for thread in threads:
+                thread.start()
+
+            barrier.wait()
+            start = time.perf_counter()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - start
+
+            total = num_pairs * orders_per_pair
+            self.stdout.write(
+                f'{num_pairs:>5} {total:>7} {elapsed:>8.3f} {total / elapsed:>10.1f} {len(errors):>6}'
+            )
+
+    def _worker(self, market_manager, trading_pair, users, count, barrier, errors):
+        """Submit alternating crossing buy and sell orders on a single pair"""
+        try:
+            barrier.wait()
+            for i in range(count):
+                side = 'BUY' if i % 2 == 0 else 'SELL'
+                order = OrderModel.objects.create(
+                    user=users[i % 2],
+                    trading_pair=trading_pair,
+                    side=side,
+                    quantity=1,
+                    price=100,
+                    status='NEW'
+                )
+                try:
+                    market_manager.add_order(order)
+                except Exception as e:
+                    errors.append(e)
+        finally:
+            connection.close()
@@ -2,13 +2,14 @@ from django.core.management.base import BaseCommand
 from exchange.market_manager import MarketManager
 from exchange.models import TradingPair, TradeModel
 from django.utils.timezone import localtime
-from trading import Side
 
 class Command(BaseCommand):
     help = 'Shows the current orderbook and recent trades for a trading pair'
 
     def add_arguments(self, parser):
         parser.add_argument('symbol', type=str, help='Trading pair symbol (e.g., BTCUSD)')
+        parser.add_argument('--depth', type=int, default=10,
+                          help='Number of price levels to show per side')
 
     def handle(self, *args, **kwargs):
         symbol = kwargs['symbol'].upper()
@@ -21,27 +22,23 @@ class Command(BaseCommand):
                 # Ensure orderbook exists
                 market_manager._ensure_orderbook_exists(symbol)
                 orderbook = market_manager.market.getOrderBook(symbol)
-                orders = orderbook.getOrders()
-                
-                bids = []
-                asks = []
-                for order in orders:
-                    if order.getSide() == Side.BUY:
-                        bids.append((order.getPrice().value, order.getQuantity()))
-                    else:
-                        asks.append((order.getPrice().value, order.getQuantity()))
+                depth = orderbook.getDepth(kwargs['depth'])
 
                 self.stdout.write(self.style.SUCCESS(f'\nOrderbook for {symbol}:'))
-                if not bids and not asks:
+                if not depth.bids and not depth.asks:
                     self.stdout.write(self.style.WARNING('Orderbook is empty'))
                 else:
                     self.stdout.write('\nBids:')
-                    for price, qty in sorted(bids, reverse=True):
-                        self.stdout.write(f'  {qty:.8f} @ {price:.2f}')
+                    for level in depth.bids:
+                        quantity = trading_pair.lots_to_quantity(level.quantity)
+                        price = trading_pair.ticks_to_price(level.price.value)
+                        self.stdout.write(f'  {quantity:.8f} @ {price:.2f} ({level.order_count} orders)')
                     
                     self.stdout.write('\nAsks:')
-                    for price, qty in sorted(asks):
-                        self.stdout.write(f'  {qty:.8f} @ {price:.2f}')
+                    for level in depth.asks:
+                        quantity = trading_pair.lots_to_quantity(level.quantity)
+                        price = trading_pair.ticks_to_price(level.price.value)
+                        self.stdout.write(f'  {quantity:.8f} @ {price:.2f} ({level.order_count} orders)')
 
             except Exception as e:
                 self.stdout.write(self.style.WARNING(f'Error accessing orderbook: {str(e)}'))
@@ -172,7 +172,7 @@ class Command(BaseCommand):
                     self.stdout.write(
                         self.style.SUCCESS(
                             f'Order matched! {len(trades)} trade(s) executed at price '
-                            f'{trades[0].getPrice().value}'
+                            f'{order.trading_pair.ticks_to_price(trades[0].getPrice().value)}'
                         )
                     )
                     
@@ -0,0 +1,298 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from exchange.models import Balance, TradingPair, OrderModel, OrderStatus
+from exchange.market_manager import MarketManager
+from exchange.trading_pairs import TRADING_PAIRS
+from collections import defaultdict
+from decimal import Decimal
+import math
+import multiprocessing
+import queue
+import random
+from threading import BrokenBarrierError
+import time
+import traceback
+
+# Latency stages in report order
+STAGES = ['create', 'match', 'settle', 'add_order', 'cancel', 'end_to_end']
+
+USER_PREFIX = 'loadtest'
+QUOTE_BALANCE = Decimal('1000000000')
+BASE_BALANCE = Decimal('1000000')
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of sorted samples"""
+    return samples[min(len(samples) - 1, max(0, math.ceil(fraction * len(samples)) - 1))]
+
+
+class Command(BaseCommand):
+    help = ('Drives MarketManager.add_order from several processes with a random order flow and '
+            'reports throughput and per-stage latency. Meant for a dedicated load-testing database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4,
+                          help='Worker processes; each owns its own trading pairs and traders')
+        parser.add_argument('--rate', type=float, default=200,
+                          help='Mean arrivals per second of orders and cancels across all workers (Poisson)')
+        parser.add_argument('--duration', type=float, default=10,
+                          help='Seconds of order flow')
+        parser.add_argument('--traders', type=int, default=4,
+                          help='Trading accounts per worker')
+        parser.add_argument('--price', type=Decimal, default=Decimal('100'),
+                          help='Starting mid price for books that have no bid and ask')
+        parser.add_argument('--volatility', type=float, default=1.0,
+                          help='Standard deviation of the mid price step per order, in ticks')
+        parser.add_argument('--depth', type=float, default=5.0,
+                          help='Mean distance of an order price from the mid, in ticks')
+        parser.add_argument('--max-quantity', type=int, default=10,
+                          help='Largest order quantity; quantities are uniform from 1')
+        parser.add_argument('--aggressive', type=float, default=0.3,
+                          help='Fraction of orders priced through the mid to take liquidity')
+        parser.add_argument('--cancel-ratio', type=float, default=0.3,
+                          help='Fraction of events that cancel a resting order instead of placing one')
+        parser.add_argument('--seed', type=int, default=None,
+                          help='Random seed, for a repeatable order flow')
+
+    def handle(self, *args, **kwargs):
+        workers = kwargs['workers']
+        symbols = [pair['symbol'] for pair in TRADING_PAIRS]
+        if not 1 <= workers <= len(symbols):
+            raise CommandError(f'--workers must be between 1 and {len(symbols)}, one trading pair each at least')
+        for name in ('aggressive', 'cancel_ratio'):
+            if not 0 <= kwargs[name] <= 1:
+                raise CommandError(f'--{name.replace("_", "-")} must be between 0 and 1')
+        if kwargs['rate'] <= 0 or kwargs['duration'] <= 0:
+            raise CommandError('--rate and --duration must be positive')
+
+        pairs = {p.symbol: p for p in TradingPair.objects.filter(symbol__in=symbols)}
+        missing = [s for s in symbols if s not in pairs]
+        if missing:
+            raise CommandError(f'Missing trading pairs {", ".join(missing)}. Run setup_trading_pairs first.')
+
+        users = self._setup_traders(workers * kwargs['traders'])
+
+        # The engine and balance ledger are per process, so every worker
+        # matches its own pairs and trades for its own accounts only
+        assignments = [
+            (symbols[i::workers], users[i::workers])
+            for i in range(workers)
+        ]
+
+        # Children must open their own database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        barrier = context.Barrier(workers + 1)
+        processes = [
+            context.Process(
+                target=self._worker,
+                args=(index, worker_symbols, worker_users, kwargs, barrier, results),
+                name=f'load-test-{index}'
+            )
+            for index, (worker_symbols, worker_users) in enumerate(assignments)
+        ]
+        for process in processes:
+            process.start()
+
+        self.stdout.write(f'Starting {workers} workers at {kwargs["rate"]:.0f} orders/s for {kwargs["duration"]:.0f}s')
+        reports = []
+        try:
+            barrier.wait(timeout=300)
+        except BrokenBarrierError:
+            # A worker failed to start; its report says why
+            pass
+        try:
+            for _ in processes:
+                reports.append(results.get(timeout=kwargs['duration'] + 300))
+        except queue.Empty:
+            for process in processes:
+                process.terminate()
+            raise CommandError('A worker stopped responding')
+        finally:
+            for process in processes:
+                process.join()
+
+        errors = [report['error'] for report in reports if 'error' in report]
+        if errors:
+            raise CommandError(f'{len(errors)} worker(s) failed:\n' + '\n'.join(errors))
+        self._report(reports)
+
+    def _setup_traders(self, count):
+        """Load-test accounts with ample balances in every currency and no open orders"""
+        currencies = {pair['quote_currency'] for pair in TRADING_PAIRS}
+        base_currencies = {pair['base_currency'] for pair in TRADING_PAIRS}
+        users = []
+        with transaction.atomic():
+            # Orders left by an interrupted run would rest in the wrong worker's book
+            OrderModel.objects.filter(
+                user__username__startswith=USER_PREFIX, status=OrderStatus.NEW.name
+            ).update(status=OrderStatus.CANCELLED.name)
+            for i in range(count):
+                user, created = User.objects.get_or_create(username=f'{USER_PREFIX}{i}')
+                if created:
+                    user.set_unusable_password()
+                    user.save()
+                for currency in currencies | base_currencies:
+                    Balance.objects.get_or_create(
+                        user=user,
+                        currency=currency,
+                        defaults={'amount': QUOTE_BALANCE if currency in currencies else BASE_BALANCE}
+                    )
+                users.append(user)
+        return users
+
+    def _worker(self, index, symbols, users, options, barrier, results):
+        """Runs in a forked process; puts its counts and latency samples on `results`"""
+        try:
+            report = self._run(index, symbols, users, options, barrier)
+        except Exception:
+            report = {'error': f'worker {index}: {traceback.format_exc()}'}
+            barrier.abort()
+        finally:
+            connections.close_all()
+        results.put(report)
+
+    def _run(self, index, symbols, users, options, barrier):
+        # The engine's recovery files belong to the server process
+        settings.ENGINE_STATE_DIR = None
+        rng = random.Random(None if options['seed'] is None else options['seed'] + index)
+        market_manager = MarketManager()
+        pairs = {symbol: market_manager.get_trading_pair(symbol) for symbol in symbols}
+        mids = {symbol: self._starting_mid(market_manager, pairs[symbol], options['price']) for symbol in symbols}
+
+        latencies = defaultdict(list)
+
+        # Time the matching and settlement steps inside add_order
+        market_manager.set_stage_timer(lambda stage, seconds: latencies[stage].append(seconds))
+
+        counts = defaultdict(int)
+        resting = []
+        rate = options['rate'] / options['workers']
+        barrier.wait(timeout=300)
+
+        start = time.perf_counter()
+        deadline = start + options['duration']
+        arrival = start
+        while True:
+            arrival += rng.expovariate(rate)
+            if arrival >= deadline:
+                break
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            if resting and rng.random() < options['cancel_ratio']:
+                position = rng.randrange(len(resting))
+                resting[position], resting[-1] = resting[-1], resting[position]
+                began = time.perf_counter()
+                cancelled = self._cancel(market_manager, resting.pop())
+                latencies['cancel'].append(time.perf_counter() - began)
+                counts['cancels' if cancelled else 'cancels_missed'] += 1
+                continue
+
+            symbol = rng.choice(symbols)
+            trading_pair = pairs[symbol]
+            mids[symbol] = max(1, mids[symbol] + round(rng.gauss(0, options['volatility'])))
+            side = rng.choice(['BUY', 'SELL'])
+            offset = 1 + int(rng.expovariate(1 / options['depth']))
+            if rng.random() < options['aggressive']:
+                ticks = mids[symbol] + offset if side == 'BUY' else mids[symbol] - offset
+            else:
+                ticks = mids[symbol] - offset if side == 'BUY' else mids[symbol] + offset
+            quantity = rng.randint(1, options['max_quantity'])
+
+            began = time.perf_counter()
+            order = OrderModel.objects.create(
+                user=rng.choice(users),
+                trading_pair=trading_pair,
+                side=side,
+                quantity=quantity,
+                price=trading_pair.ticks_to_price(max(1, ticks)),
+                status=OrderStatus.NEW.name
+            )
+            latencies['create'].append(time.perf_counter() - began)
+
+            began = time.perf_counter()
+            try:
+                trades = market_manager.add_order(order)
+            except Exception:
+                counts['rejected'] += 1
+                continue
+            finally:
+                finished = time.perf_counter()
+                latencies['add_order'].append(finished - began)
+                # From the scheduled arrival, so time spent falling behind counts
+                latencies['end_to_end'].append(finished - arrival)
+
+            counts['orders'] += 1
+            counts['trades'] += len(trades)
+            order_id = str(order.order_id)
+            filled = sum(
+                t.getQuantity() for t in trades
+                if order_id in (str(t.getBuyOrderId()), str(t.getSellOrderId()))
+            )
+            if filled < trading_pair.quantity_to_lots(order.quantity):
+                resting.append(order.pk)
+        elapsed = time.perf_counter() - start
+
+        # Leave no orders behind for the next run
+        leftover = OrderModel.objects.filter(user__in=users, status=OrderStatus.NEW.name).values_list('pk', flat=True)
+        for pk in list(leftover):
+            self._cancel(market_manager, pk)
+        market_manager.stop()
+
+        return {'elapsed': elapsed, 'counts': dict(counts), 'latencies': dict(latencies)}
+
+    def _starting_mid(self, market_manager, trading_pair, price):
+        """The book's mid price in ticks, or `price` if either side is empty"""
+        orderbook = market_manager.market.getOrderBook(trading_pair.symbol)
+        bid, ask = orderbook.getBestBid(), orderbook.getBestAsk()
+        if bid and ask:
+            return (bid.price.value + ask.price.value) // 2
+        return trading_pair.price_to_ticks(price)
+
+    def _cancel(self, market_manager, pk):
+        """Cancel an order the way the cancel view does.
+
+        Returns:
+            bool: False if the order had already been filled
+        """
+        try:
+            order = OrderModel.objects.select_related('trading_pair').get(pk=pk, status=OrderStatus.NEW.name)
+            market_manager.cancel_order(order)
+        except OrderModel.DoesNotExist:
+            return False
+        return True
+
+    def _report(self, reports):
+        elapsed = max(report['elapsed'] for report in reports)
+        counts = defaultdict(int)
+        latencies = defaultdict(list)
+        for report in reports:
+            for name, count in report['counts'].items():
+                counts[name] += count
+            for stage, samples in report['latencies'].items():
+                latencies[stage].extend(samples)
+
+        self.stdout.write(
+            f'{"orders":>8} {"trades":>8} {"cancels":>8} {"rejected":>8} {"seconds":>8} '
+            f'{"orders/s":>9} {"trades/s":>9}'
+        )
+        self.stdout.write(
+            f'{counts["orders"]:>8} {counts["trades"]:>8} {counts["cancels"]:>8} {counts["rejected"]:>8} '
+            f'{elapsed:>8.2f} {counts["orders"] / elapsed:>9.1f} {counts["trades"] / elapsed:>9.1f}'
+        )
+        if counts['cancels_missed']:
+            self.stdout.write(f'{counts["cancels_missed"]} cancels found the order already filled')
+
+        self.stdout.write('')
+        self.stdout.write(f'{"stage":<10} {"count":>8} {"p50 ms":>9} {"p99 ms":>9} {"p999 ms":>9} {"max ms":>9}')
+        for stage in STAGES:
+            samples = sorted(latencies.get(stage, []))
+            if not samples:
+                continue
+            figures = [percentile(samples, f) * 1000 for f in (0.5, 0.99, 0.999)] + [samples[-1] * 1000]
+            self.stdout.write(f'{stage:<10} {len(samples):>8} ' + ' '.join(f'{v:>9.2f}' for v in figures))
@@ -1,12 +1,44 @@
 from threading import Lock
+from collections import defaultdict
+from contextlib import contextmanager
+import json
 import logging
-from trading import Market, OrderStatus, Side, Price, Order
-from .models import OrderModel, TradeModel, TradingPair, Balance
+import time
+from trading import Market, OrderStatus, Side, Price, Order, Portfolio
+from .models import OrderModel, TradeModel, TradingPair
+from .ledger import BalanceLedger
+from .engine_store import EngineStore
+from .sequencer import OrderSequencer
+from .feed import MarketFeed, EVENT_CAPACITY
+from .ticker import Ticker
+from .candles import CandleAggregator
+from .tape import TradeTape
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import transaction
-from django.db.models import Q
+from django.db.models import Count, Sum
 
 logger = logging.getLogger(__name__)
 
+# Rows fetched per database round trip when loading open orders at startup
+REHYDRATE_CHUNK_SIZE = 10000
+
+# Deepest book view kept in the depth cache; deeper reads are built every time
+MAX_CACHED_DEPTH = 100
+
+def serialize_depth(book_depth, trading_pair):
+    """Convert aggregated engine price levels to JSON-ready dicts"""
+    def level_data(level):
+        return {
+            'price': trading_pair.ticks_to_price(level.price.value),
+            'quantity': trading_pair.lots_to_quantity(level.quantity),
+            'orders': level.order_count
+        }
+    return {
+        'bids': [level_data(level) for level in book_depth.bids],
+        'asks': [level_data(level) for level in book_depth.asks]
+    }
+
 class MarketManager:
     _instance = None
     _lock = Lock()
@@ -21,17 +53,262 @@ class MarketManager:
 
     def _initialize(self):
         """Initialize the market and load all trading pairs"""
-        self._market = Market()
-        self._operation_lock = Lock()
+        self._market = Market(event_capacity=EVENT_CAPACITY)
+        self._registry_lock = Lock()
         self._initialized_pairs = set()
+        self._trading_pairs = {}
+        # (symbol, levels) -> (book version, depth dict, JSON body)
+        self._depth_cache = {}
+        self._candles = CandleAggregator(self.get_trading_pair)
+        self._portfolio = Portfolio()
+        self._tape = TradeTape(self.get_trading_pair)
+        self._stage_timer = None
+
+        # Settle anything a previous process committed but never flushed
+        self._ledger = BalanceLedger()
+        self._ledger.recover()
+
+        # Rebuild resting orders from the last snapshots and the journal after them
+        self._store = None
+        restored = False
+        discarded = False
+        if settings.ENGINE_STATE_DIR:
+            self._store = EngineStore(settings.ENGINE_STATE_DIR)
+            restored = self._store.restore(self._market)
+            # Inputs are journaled once their transaction commits, so a crash
+            # in between leaves the database ahead of the journal
+            if restored and not self._matches_database():
+                logger.warning("Saved engine state disagrees with the database, loading open orders from the database")
+                self._market = Market(event_capacity=EVENT_CAPACITY)
+                restored = False
+                discarded = True
+        # Built on whichever engine the books end up in
+        self._feed = MarketFeed(self._market, self.get_trading_pair)
+        self._ticker = Ticker(self._market, self.get_trading_pair)
         
         # Initialize orderbooks for all trading pairs
         for pair in TradingPair.objects.all():
+            self._trading_pairs[pair.symbol] = pair
             self._ensure_orderbook_exists(pair.symbol)
+        self._ticker.load()
+        self._candles.load()
+        self._load_portfolio()
+
+        # Without saved engine state, the database is the only record of open orders
+        if not restored:
+            rehydrated = self._rehydrate_orders()
+            if self._store is not None and (rehydrated or discarded):
+                # Start the journal from a snapshot that includes these orders
+                self._store.snapshot(self._market, self._initialized_pairs)
+
+        if self._store is not None:
+            # Periodic snapshots run on the matching thread, started below
+            self._store.start(
+                self._market, self._initialized_pairs, settings.ENGINE_SNAPSHOT_INTERVAL,
+                lambda func, *args: self._sequencer.call(func, *args)
+            )
+
+        # Started last so it stops first at exit, before the final snapshot
+        self._sequencer = OrderSequencer(self._execute_batch)
+
+    def stop(self):
+        """Stop the matching thread, then write out everything it left behind.
+
+        Balance changes and candles are flushed and the engine store writes
+        its final snapshot, as happens at exit. For tools that finish with
+        the manager before the process does; orders queued afterwards fail
+        with RuntimeError.
+        """
+        self._sequencer.stop()
+        self._ledger.stop()
+        self._candles.stop()
+        if self._store is not None:
+            self._store.stop()
+
+    def set_stage_timer(self, timer):
+        """Report how long the matching thread spends on each stage.
+
+        timer(stage, seconds) is called on the matching thread after every
+        'match' of one order and every 'settle' of one trading pair's trades.
+        For load tests; None stops the reports.
+        """
+        self._stage_timer = timer
+
+    @contextmanager
+    def _timed(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timer = self._stage_timer
+            if timer is not None:
+                timer(stage, time.perf_counter() - start)
+
+    def _open_orders(self, symbols=None):
+        """Every open order in the database as an engine order at its unfilled remainder.
+
+        All NEW orders are streamed with one query in creation order, so each
+        book keeps the time priority they had.
+
+        Args:
+            symbols (iterable): Only load these trading pairs; all by default
+
+        Returns:
+            dict: Symbol to its open Orders, oldest first
+        """
+        side_map = {'BUY': Side.BUY, 'SELL': Side.SELL}
+        by_symbol = defaultdict(list)
+        open_orders = OrderModel.objects.filter(status='NEW')
+        if symbols is not None:
+            open_orders = open_orders.filter(trading_pair__symbol__in=symbols)
+        # An order only ever has buy trades or sell trades, so the two
+        # joins below never multiply each other's rows
+        open_orders = (
+            open_orders
+            .annotate(bought=Sum('buy_trades__quantity'), sold=Sum('sell_trades__quantity'))
+            .order_by('created_at', 'id')
+            .values_list('order_id', 'trading_pair__symbol', 'side', 'quantity', 'price', 'bought', 'sold')
+            .iterator(chunk_size=REHYDRATE_CHUNK_SIZE)
+        )
+        for order_id, symbol, side, quantity, price, bought, sold in open_orders:
+            trading_pair = self.get_trading_pair(symbol)
+            remaining = quantity - (bought or 0) - (sold or 0)
+            if remaining <= 0:
+                continue
+            by_symbol[symbol].append(Order(
+                symbol,
+                side_map[side],
+                trading_pair.quantity_to_lots(remaining),
+                Price(trading_pair.price_to_ticks(price)),
+                str(order_id)
+            ))
+        return by_symbol
+
+    def _matches_database(self):
+        """Whether every book rests as many orders as the database has open.
+
+        A cheap check that reads no orders: it counts them per trading pair
+        with the (trading_pair, status) index.
+        """
+        expected = dict(
+            OrderModel.objects.filter(status='NEW')
+            .values_list('trading_pair__symbol')
+            .annotate(count=Count('id'))
+        )
+        symbols = set(expected) | set(TradingPair.objects.values_list('symbol', flat=True))
+        for symbol in symbols:
+            resting = 0
+            if self._market.hasOrderBook(symbol):
+                resting = self._market.getOrderBook(symbol).getOrderCount()
+            if resting != expected.get(symbol, 0):
+                logger.info(f"Saved {symbol} book rests {resting} orders, the database has {expected.get(symbol, 0)}")
+                return False
+        return True
+
+    def _rehydrate_orders(self):
+        """Load open orders from the database into the books in bulk.
+
+        Orders go to their book at their unfilled remainder through one
+        Market.restoreOrders call per trading pair.
+
+        Returns:
+            int: The number of orders loaded
+        """
+        start = time.perf_counter()
+        by_symbol = self._open_orders()
+        for symbol, orders in by_symbol.items():
+            self._ensure_orderbook_exists(symbol)
+            self._market.restoreOrders(symbol, orders)
+
+        count = sum(len(orders) for orders in by_symbol.values())
+        if count:
+            logger.info(
+                f"Loaded {count} open orders from the database in {time.perf_counter() - start:.3f}s"
+            )
+        return count
+
+    def _reload_books(self, undone, cancelled=()):
+        """Take back what the engine did for orders whose transaction rolled back.
+
+        The books those orders went to are rebuilt from the database: the
+        orders themselves are dropped, and every other order in the book or
+        filled by them returns at the remainder the database has committed.
+        Runs on the matching thread, in a transaction, so no other writer can
+        commit in between.
+
+        Args:
+            undone (list): (OrderModel, trades) for each rolled-back order
+            cancelled (list): OrderModels whose cancel rolled back; they
+                return to the book
+        """
+        symbols = {order_model.trading_pair.symbol for order_model, _ in undone}
+        symbols.update(order_model.trading_pair.symbol for order_model in cancelled)
+        dropped = {str(order_model.order_id) for order_model, _ in undone}
+        # Counterparties that were filled completely have already left the book
+        counterparties = {
+            str(order_id)
+            for _, trades in undone for trade in trades
+            for order_id in (trade.getBuyOrderId(), trade.getSellOrderId())
+        }
+        counterparties.update(str(order_model.order_id) for order_model in cancelled)
+        with transaction.atomic():
+            open_orders = self._open_orders(symbols)
+            for symbol in symbols:
+                resting = [order.getId() for order in self._market.getOrderBook(symbol).getOrders()]
+                for order_id in resting:
+                    self._market.cancelOrder(order_id)
+                # Orders still queued for matching are NEW too, but never reached the book
+                keep = (set(resting) | counterparties) - dropped
+                self._market.restoreOrders(
+                    symbol, [order for order in open_orders.get(symbol, []) if order.getId() in keep]
+                )
+        logger.warning(f"Reloaded the {', '.join(sorted(symbols))} books from the database")
+
+        if self._store is not None:
+            # Replaying the journal would not give the rebuilt books' time priority
+            self._store.snapshot(self._market, self._initialized_pairs)
+        self._feed.resync()
+        transaction.on_commit(self._feed.publish)
+
+    def _load_portfolio(self):
+        """Rebuild every account's positions by replaying all trades in order"""
+        start = time.perf_counter()
+        count = 0
+        trades = (
+            TradeModel.objects.order_by('id')
+            .values_list('trading_pair__symbol', 'buy_order__user_id', 'sell_order__user_id', 'quantity', 'price')
+            .iterator(chunk_size=REHYDRATE_CHUNK_SIZE)
+        )
+        for symbol, buyer, seller, quantity, price in trades:
+            trading_pair = self.get_trading_pair(symbol)
+            self._portfolio.applyTrade(
+                symbol, buyer, seller,
+                trading_pair.quantity_to_lots(quantity),
+                Price(trading_pair.price_to_ticks(price))
+            )
+            count += 1
+        if count:
+            logger.info(f"Replayed {count} trades into positions in {time.perf_counter() - start:.3f}s")
 
     @property
     def market(self):
         return self._market
+
+    @property
+    def ledger(self):
+        return self._ledger
+
+    @property
+    def feed(self):
+        return self._feed
+
+    @property
+    def candles(self):
+        return self._candles
+
+    @property
+    def tape(self):
+        return self._tape
     
     def _ensure_orderbook_exists(self, symbol):
         """Ensures orderbook exists for the given symbol and initializes it if needed.
@@ -43,154 +320,410 @@ class MarketManager:
             RuntimeError: If orderbook creation fails
         """
         if symbol not in self._initialized_pairs:
-            with self._operation_lock:
+            with self._registry_lock:
                 try:
                     # Check again in case another thread initialized it
                     if symbol not in self._initialized_pairs:
-                        if not self._market.hasOrderBook(symbol):
-                            # Create valid dummy order to initialize orderbook
-                            dummy_price = Price()
-                            dummy_price.value = 1.0  # Valid non-zero price
-                            dummy_order = Order(symbol, Side.BUY, 0.1, dummy_price)  # Valid non-zero quantity
-                            self._market.addOrder(dummy_order)
-                            self._market.cancelOrder(dummy_order.getId())
-                        
+                        self._market.createOrderBook(symbol)
+
                         # Verify orderbook was created
                         if not self._market.hasOrderBook(symbol):
                             raise RuntimeError(f"Failed to create orderbook for {symbol}")
-                            
+
                         self._initialized_pairs.add(symbol)
                         logger.info(f"Initialized orderbook for {symbol}")
                 except Exception as e:
                     logger.error(f"Failed to initialize orderbook for {symbol}: {str(e)}")
                     raise RuntimeError(f"Failed to initialize orderbook: {str(e)}")
-    
+
+    def get_trading_pair(self, symbol):
+        """Returns the cached TradingPair used for tick and lot conversion.
+
+        Args:
+            symbol (str): The trading pair symbol (e.g., 'BTCUSD')
+
+        Raises:
+            TradingPair.DoesNotExist: If the symbol is not a listed trading pair
+        """
+        trading_pair = self._trading_pairs.get(symbol)
+        if trading_pair is None:
+            trading_pair = TradingPair.objects.get(symbol=symbol)
+            self._trading_pairs[symbol] = trading_pair
+        return trading_pair
+
+    def get_depth(self, symbol, levels):
+        """Returns the top `levels` of a book, serialized once per book version.
+
+        Reads of a book that has not changed since the last one are served
+        from the cache without taking the book's lock. The dict is shared
+        between callers and must not be modified.
+
+        Args:
+            symbol (str): The trading pair symbol (e.g., 'BTCUSD')
+            levels (int): Price levels per side
+
+        Returns:
+            tuple: The depth as a dict with 'symbol', 'bids' and 'asks', and
+                the same depth encoded as a JSON response body
+
+        Raises:
+            TradingPair.DoesNotExist: If the symbol is not a listed trading pair
+        """
+        trading_pair = self.get_trading_pair(symbol)
+        orderbook = self._market.getOrderBook(symbol)
+        key = (symbol, levels)
+        cached = self._depth_cache.get(key)
+        if cached is not None and cached[0] == orderbook.getVersion():
+            return cached[1], cached[2]
+
+        book_depth = orderbook.getDepth(levels)
+        data = {'symbol': symbol, **serialize_depth(book_depth, trading_pair)}
+        body = json.dumps(data, cls=DjangoJSONEncoder).encode()
+        if levels <= MAX_CACHED_DEPTH:
+            # Keyed by the version the depth was read at, so a racing
+            # writer can only cause a later miss, never a stale hit
+            self._depth_cache[key] = (book_depth.version, data, body)
+        return data, body
+
+    def get_positions(self, user):
+        """Returns the user's position in every symbol they have traded.
+
+        Quantity is signed, negative when short. Unrealized PnL is marked
+        against the symbol's last trade price.
+
+        Returns:
+            list: JSON-ready dicts, sorted by symbol
+        """
+        positions = []
+        for position in self._portfolio.getPositions(user.id):
+            trading_pair = self.get_trading_pair(position.symbol)
+            last_price = self._portfolio.getLastPrice(position.symbol)
+            positions.append({
+                'symbol': position.symbol,
+                'quantity': trading_pair.lots_to_quantity(position.quantity),
+                'average_price': trading_pair.ticks_to_price(position.average_price.value),
+                'last_price': trading_pair.ticks_to_price(last_price.value) if last_price else None,
+                'realized_pnl': trading_pair.tick_lots_to_amount(position.realized_pnl),
+                'unrealized_pnl': trading_pair.tick_lots_to_amount(position.unrealized_pnl)
+            })
+        return positions
+
+    def get_ticker(self):
+        """Returns the ticker of every listed trading pair, as JSON-ready dicts"""
+        return [self._ticker.get(symbol) for symbol in sorted(self._trading_pairs)]
+
     def add_order(self, order_model):
-        """Add an order to the market and process any resulting trades"""
+        """Match an order on the matching thread and wait for it.
+
+        The order's funds are reserved in the balance ledger before it reaches
+        the book and released again if it is rejected. If settlement fails
+        after matching, the book is reloaded from the database, which no
+        longer has the order's fills. Must not be called inside a
+        transaction, which would hold the database's write lock.
+
+        Raises:
+            ValueError: If the user cannot fund the order
+        """
+        return self.submit_order(order_model).result()
+
+    def run(self, func, *args):
+        """Run func(*args) on the matching thread and wait for its result.
+
+        Nothing else reaches the engine while it runs, and add_order and the
+        other methods that wait for the matching thread run inline when func
+        calls them. For tools that need the engine to themselves, such as
+        benchmarks.
+        """
+        return self._sequencer.call(func, *args).result()
+
+    def submit_order(self, order_model):
+        """Queue a saved order for the matching thread.
+
+        Unlike add_order, the caller does not wait: the order is matched and
+        settled together with whatever else is queued at the time.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the order's trades, or
+                raises what add_order would have raised
+        """
+        return self._sequencer.submit(order_model)
+
+    def _execute_batch(self, order_models):
+        """Match queued orders in arrival order and settle them in one transaction.
+
+        Runs on the matching thread. Each order is reserved and matched on its
+        own, so one rejection does not affect the rest of the batch. If the
+        transaction fails, the books it touched are reloaded from the database
+        and the orders are retried one at a time, so only the order that
+        caused the failure is rejected.
+
+        Returns:
+            list: For each order, its trades or the exception that rejected it
+        """
+        matched = []
+        try:
+            results = self._settle_batch(order_models, matched)
+        except Exception as e:
+            logger.error(f"Order batch of {len(order_models)} failed: {str(e)}", exc_info=True)
+            # The database rolled back, but the engine and ledger still hold the matched orders
+            for order_model, _ in matched:
+                self._ledger.release(order_model)
+            if matched:
+                self._reload_books(matched)
+            if len(order_models) > 1:
+                return [self._execute_batch([order_model])[0] for order_model in order_models]
+            OrderModel.objects.filter(pk=order_models[0].pk).update(status=OrderStatus.REJECTED.name)
+            return [e]
+
+        # One market data message per book for the whole batch
+        self._feed.publish()
+        return results
+
+    def _settle_batch(self, order_models, matched):
+        """The transaction of _execute_batch.
+
+        Args:
+            order_models (list): Saved orders, in arrival order
+            matched (list): Receives (OrderModel, trades) for every order that
+                reached the engine, so the caller can undo them if the
+                transaction fails
+        """
+        results = []
+        rejected = []
+        trades_by_symbol = defaultdict(list)
         with transaction.atomic():
-            try:
-                # Ensure orderbook exists
-                symbol = order_model.trading_pair.symbol
-                self._ensure_orderbook_exists(symbol)
-                
-                # Validate balance before adding order
-                if order_model.side == 'BUY':
-                    required_balance = order_model.price * order_model.quantity
-                    balance = Balance.objects.select_for_update().get(
-                        user=order_model.user,
-                        currency=order_model.trading_pair.quote_currency
-                    )
-                    if balance.amount < required_balance:
-                        raise ValueError("Insufficient balance for buy order")
-                else:  # SELL
-                    balance = Balance.objects.select_for_update().get(
-                        user=order_model.user,
-                        currency=order_model.trading_pair.base_currency
-                    )
-                    if balance.amount < order_model.quantity:
-                        raise ValueError("Insufficient balance for sell order")
-
-                # Lock the order for update
-                order_model = OrderModel.objects.select_for_update().get(pk=order_model.pk)
-                order_model.status = OrderStatus.NEW.name
-                order_model.save()
-
-                # Convert to trading order
-                trading_order = order_model.to_trading_order()
-                
-                with self._operation_lock:
-                    try:
-                        # Add order to market
-                        self._market.addOrder(trading_order)
-                        # Match orders
-                        trades = self._market.matchOrders(symbol)
-                        
-                        if trades:
-                            logger.info(f"Order {order_model.order_id} matched with {len(trades)} trades")
-                            self._process_trades(trades, order_model.trading_pair)
-                        
-                        return trades
-                        
-                    except Exception as e:
-                        logger.error(f"Trading engine error: {str(e)}")
-                        order_model.status = OrderStatus.REJECTED.name
-                        order_model.save()
-                        raise
-                    
-            except Exception as e:
-                logger.error(f"Error processing order {order_model.order_id}: {str(e)}", exc_info=True)
-                order_model.status = OrderStatus.REJECTED.name
-                order_model.save()
-                raise
+            locked = (
+                OrderModel.objects.select_for_update().select_related('trading_pair')
+                .in_bulk([order_model.pk for order_model in order_models])
+            )
+            # Orders are reserved one by one, so none may count as held on load
+            self._ledger.load_users({o.user_id for o in locked.values()}, admitting=set(locked))
+            for order_model in order_models:
+                try:
+                    order_model = locked[order_model.pk]
+                    symbol = order_model.trading_pair.symbol
+                    with self._timed('match'):
+                        trades = self._match(order_model)
+                except Exception as e:
+                    logger.error(f"Error processing order {order_model.order_id}: {str(e)}")
+                    rejected.append(order_model.pk)
+                    results.append(e)
+                    continue
+
+                matched.append((order_model, trades))
+                if trades:
+                    logger.info(f"Order {order_model.order_id} matched with {len(trades)} trades")
+                    trades_by_symbol[symbol].extend(trades)
+                results.append(trades)
+
+            if rejected:
+                OrderModel.objects.filter(pk__in=rejected).update(status=OrderStatus.REJECTED.name)
+            for symbol, trades in trades_by_symbol.items():
+                with self._timed('settle'):
+                    self._process_trades(trades, self.get_trading_pair(symbol))
+        return results
+
+    def _match(self, order_model):
+        """Reserve an order's funds, then add it to its book and match it.
+
+        Runs on the matching thread. The reservation is released again if the
+        engine rejects the order.
+
+        Raises:
+            ValueError: If the user cannot fund the order
+        """
+        self._ensure_orderbook_exists(order_model.trading_pair.symbol)
+        self._ledger.reserve(order_model)
+        try:
+            trading_order = order_model.to_trading_order()
+            self._market.addOrder(trading_order)
+            self._journal_add(trading_order)
+            return self._market.matchOrders(order_model.trading_pair.symbol)
+        except Exception:
+            self._ledger.release(order_model)
+            raise
+
+    def _journal_add(self, trading_order):
+        """Journal an order the engine accepted, once its transaction commits.
+
+        Matching is deterministic, so the add is all the journal needs to
+        reproduce the order's fills. Commits and their callbacks run in
+        order on the matching thread, so the journal keeps the engine's
+        order of inputs.
+        """
+        if self._store is not None:
+            transaction.on_commit(lambda: self._store.record_add(trading_order))
+
+    def add_orders(self, order_models):
+        """Save a batch of orders and add them in a single engine call.
+
+        Runs on the matching thread, and waits for it. The batch is validated
+        as a whole: if any order cannot be funded or fails engine validation,
+        no order from the batch is saved or reaches the book. If settlement
+        fails after matching, the reservations are released and the books
+        are reloaded from the database, as in add_order. Must not be called
+        inside a transaction.
+
+        Args:
+            order_models (list): Unsaved NEW OrderModels, in submission order
+
+        Returns:
+            list: The trades produced by each order, in submission order
+        """
+        return self._sequencer.call(self._add_orders, order_models).result()
+
+    def _add_orders(self, order_models):
+        """The matching thread's part of add_orders"""
+        matched = None
+        try:
+            with transaction.atomic():
+                OrderModel.objects.bulk_create(order_models)
+                for symbol in {order_model.trading_pair.symbol for order_model in order_models}:
+                    self._ensure_orderbook_exists(symbol)
+                trading_orders = [order_model.to_trading_order() for order_model in order_models]
+                self._ledger.reserve_many(order_models)
+                try:
+                    trades_per_order = self._market.addOrders(trading_orders)
+                except Exception:
+                    for order_model in order_models:
+                        self._ledger.release(order_model)
+                    raise
+                matched = list(zip(order_models, trades_per_order))
+                for trading_order in trading_orders:
+                    self._journal_add(trading_order)
+
+                # Settle the whole batch together, one pass per trading pair
+                trades_by_symbol = defaultdict(list)
+                for order_model, trades in matched:
+                    if trades:
+                        logger.info(f"Order {order_model.order_id} matched with {len(trades)} trades")
+                        trades_by_symbol[order_model.trading_pair.symbol].extend(trades)
+                for symbol, trades in trades_by_symbol.items():
+                    with self._timed('settle'):
+                        self._process_trades(trades, self.get_trading_pair(symbol))
+
+                transaction.on_commit(self._feed.publish)
+                return trades_per_order
+
+        except Exception as e:
+            if matched is not None:
+                logger.error(f"Order batch of {len(order_models)} failed after matching: {str(e)}", exc_info=True)
+                # The database rolled back, but the engine and ledger still hold the batch
+                for order_model in order_models:
+                    self._ledger.release(order_model)
+                self._reload_books(matched)
+            raise
+
+    def cancel_order(self, order_model):
+        """Cancel an open order on the matching thread and wait for it.
+
+        The order is marked CANCELLED in its own transaction, and once that
+        commits the funds its unfilled remainder holds are released; filled
+        parts were already consumed by settlement. Must not be called inside
+        a transaction.
+
+        Raises:
+            OrderModel.DoesNotExist: If the order is no longer open
+        """
+        self._sequencer.call(self._cancel, order_model).result()
+
+    def _cancel(self, order_model):
+        """The matching thread's part of cancel_order"""
+        symbol = order_model.trading_pair.symbol
+        order_id = str(order_model.order_id)
+        removed = False
+        try:
+            with transaction.atomic():
+                order_model = OrderModel.objects.select_for_update().select_related('trading_pair').get(
+                    pk=order_model.pk, status=OrderStatus.NEW.name
+                )
+                remaining = self._market.getOrder(order_id).getRemainingQuantity()
+                self._market.cancelOrder(order_id)
+                removed = True
+                if self._store is not None:
+                    transaction.on_commit(lambda: self._store.record_cancel(symbol, order_id))
+                order_model.status = OrderStatus.CANCELLED.name
+                order_model.save(update_fields=['status'])
+
+                quantity = order_model.trading_pair.lots_to_quantity(remaining)
+                transaction.on_commit(lambda: self._ledger.release(order_model, quantity))
+                transaction.on_commit(self._feed.publish)
+        except Exception:
+            if removed:
+                # The order is still open in the database
+                self._reload_books([], cancelled=[order_model])
+            raise
+
+    def _apply_positions(self, symbol, position_fills):
+        """Update both accounts' positions for settled trades"""
+        for buyer, seller, trade in position_fills:
+            self._portfolio.applyTrade(symbol, buyer, seller, trade.getQuantity(), trade.getPrice())
 
     def _process_trades(self, trades, trading_pair):
-        """Process trades in a thread-safe manner"""
+        """Settle all trades from one matching pass in a fixed number of queries.
+
+        Every affected order is locked with a single read, filled orders and
+        trade records are written with one bulk query each, and the balance
+        changes are handed to the ledger once the transaction commits.
+        """
         with transaction.atomic():
-            for trade in trades:
-                try:
-                    # Get both orders in a single query with select_for_update
+            try:
+                order_ids = set()
+                for trade in trades:
+                    order_ids.add(str(trade.getBuyOrderId()))
+                    order_ids.add(str(trade.getSellOrderId()))
+                orders = {
+                    str(o.order_id): o
+                    for o in OrderModel.objects.select_for_update().filter(order_id__in=order_ids)
+                }
+                # Reservations are rebuilt from recorded fills, so load before writing any
+                self._ledger.load_users({o.user_id for o in orders.values()})
+
+                fills = []
+                position_fills = []
+                for trade in trades:
                     buy_id = str(trade.getBuyOrderId())
                     sell_id = str(trade.getSellOrderId())
-                    orders = OrderModel.objects.select_for_update().filter(
-                        order_id__in=[buy_id, sell_id]
-                    ).select_related('user')
-
-                    if len(orders) != 2:
+                    buy_order = orders.get(buy_id)
+                    sell_order = orders.get(sell_id)
+                    if buy_order is None or sell_order is None:
                         logger.error(f"Could not find both orders for trade processing: {buy_id}, {sell_id}")
                         continue
 
-                    # Get buy and sell orders
-                    buy_order = next(o for o in orders if o.order_id == buy_id)
-                    sell_order = next(o for o in orders if o.order_id == sell_id)
-
-                    # Calculate trade details
-                    trade_value = trade.getPrice().value * trade.getQuantity()
-                    trade_quantity = trade.getQuantity()
-
-                    # Update balances first
-                    balances = Balance.objects.select_for_update().filter(
-                        (Q(user=buy_order.user) & Q(currency__in=[trading_pair.quote_currency, trading_pair.base_currency])) |
-                        (Q(user=sell_order.user) & Q(currency__in=[trading_pair.quote_currency, trading_pair.base_currency]))
-                    )
+                    # Calculate trade details with exact decimal arithmetic
+                    trade_price = trading_pair.ticks_to_price(trade.getPrice().value)
+                    trade_quantity = trading_pair.lots_to_quantity(trade.getQuantity())
 
-                    balance_map = {(b.user.id, b.currency): b for b in balances}
-
-                    # Update buyer balances
-                    buyer_quote = balance_map.get((buy_order.user.id, trading_pair.quote_currency))
-                    buyer_base = balance_map.get((buy_order.user.id, trading_pair.base_currency))
-                    if buyer_quote:
-                        buyer_quote.amount -= trade_value
-                    if buyer_base:
-                        buyer_base.amount += trade_quantity
-
-                    # Update seller balances
-                    seller_base = balance_map.get((sell_order.user.id, trading_pair.base_currency))
-                    seller_quote = balance_map.get((sell_order.user.id, trading_pair.quote_currency))
-                    if seller_base:
-                        seller_base.amount -= trade_quantity
-                    if seller_quote:
-                        seller_quote.amount += trade_value
-
-                    # Save all balances
-                    Balance.objects.bulk_update(balances, ['amount'])
-
-                    # Update order statuses
-                    buy_order.status = OrderStatus.FILLED.name
-                    sell_order.status = OrderStatus.FILLED.name
-                    buy_order.save()
-                    sell_order.save()
-
-                    # Create trade record
-                    TradeModel.objects.create(
+                    trade_model = TradeModel(
                         buy_order=buy_order,
                         sell_order=sell_order,
                         trading_pair=trading_pair,
                         quantity=trade_quantity,
-                        price=trade.getPrice().value
+                        price=trade_price
                     )
+                    fills.append((trade_model, buy_order, sell_order))
+                    position_fills.append((buy_order.user_id, sell_order.user_id, trade))
+                    logger.info(f"Processed trade: {trade_quantity} {trading_pair.symbol} @ {trade_price}")
 
-                    logger.info(f"Processed trade: {trade_quantity} {trading_pair.symbol} @ {trade.getPrice().value}")
+                # Orders stay NEW while partially filled and resting in the book
+                filled_orders = [
+                    o for order_id, o in orders.items()
+                    if not self._market.hasOrder(order_id)
+                ]
+                for order in filled_orders:
+                    order.status = OrderStatus.FILLED.name
+                if filled_orders:
+                    OrderModel.objects.bulk_update(filled_orders, ['status'])
 
-                except Exception as e:
-                    logger.error(f"Error processing trade: {str(e)}", exc_info=True)
-                    continue
\ No newline at end of file
+                TradeModel.objects.bulk_create([trade_model for trade_model, _, _ in fills])
+                transaction.on_commit(lambda: self._ledger.apply_trades(fills))
+                transaction.on_commit(lambda: self._ticker.record_trades(trading_pair.symbol, trades))
+                transaction.on_commit(lambda: self._candles.record_trades(trading_pair.symbol, trades))
+                transaction.on_commit(lambda: self._apply_positions(trading_pair.symbol, position_fills))
+                transaction.on_commit(
+                    lambda: self._tape.record(trading_pair.symbol, [trade_model for trade_model, _, _ in fills])
+                )
+
+            except Exception as e:
+                logger.error(f"Error processing trades: {str(e)}", exc_info=True)
+                raise
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.15 on 2026-10-18 15:22
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchange', '0003_alter_ordermodel_side_alter_ordermodel_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tradingpair',
+            name='lot_size',
+            field=models.DecimalField(decimal_places=8, default=Decimal('1E-8'), max_digits=18),
+        ),
+        migrations.AddField(
+            model_name='tradingpair',
+            name='tick_size',
+            field=models.DecimalField(decimal_places=8, default=Decimal('0.01'), max_digits=18),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchange', '0004_tradingpair_tick_size_lot_size'),
+    ]
+
+    operations = [
+        # Existing trades were settled into Balance synchronously
+        migrations.AddField(
+            model_name='trademodel',
+            name='balance_applied',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AlterField(
+            model_name='trademodel',
+            name='balance_applied',
+            field=models.BooleanField(default=False),
+        ),
+    ]
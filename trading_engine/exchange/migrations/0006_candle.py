@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchange', '0005_trademodel_balance_applied'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Candle',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('interval', models.CharField(choices=[('1s', '1 second'), ('1m', '1 minute'), ('5m', '5 minutes'), ('1h', '1 hour'), ('1d', '1 day')], max_length=2)),
+                ('start', models.DateTimeField()),
+                ('open', models.DecimalField(decimal_places=8, max_digits=18)),
+                ('high', models.DecimalField(decimal_places=8, max_digits=18)),
+                ('low', models.DecimalField(decimal_places=8, max_digits=18)),
+                ('close', models.DecimalField(decimal_places=8, max_digits=18)),
+                ('volume', models.DecimalField(decimal_places=8, max_digits=30)),
+                ('trading_pair', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='exchange.tradingpair')),
+            ],
+            options={
+                'unique_together': {('trading_pair', 'interval', 'start')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-18 16:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exchange', '0007_ordermodel_history_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trademodel',
+            index=models.Index(fields=['trading_pair', '-timestamp', '-id'], name='trade_pair_time_idx'),
+        ),
+    ]
@@ -1,17 +1,58 @@
 from django.db import models
 from django.contrib.auth.models import User
 from trading import Price, Order, OrderStatus, Side
+from decimal import Decimal
 import uuid
 
+# Precision of the DecimalFields holding prices and quantities
+DECIMAL_PLACES = Decimal('0.00000001')
+
 class TradingPair(models.Model):
     symbol = models.CharField(max_length=10, unique=True)
     base_currency = models.CharField(max_length=5)
     quote_currency = models.CharField(max_length=5)
     min_quantity = models.DecimalField(max_digits=18, decimal_places=8)
+    tick_size = models.DecimalField(max_digits=18, decimal_places=8, default=Decimal('0.01'))
+    lot_size = models.DecimalField(max_digits=18, decimal_places=8, default=Decimal('0.00000001'))
     
     def __str__(self):
         return self.symbol
 
+    @staticmethod
+    def _to_units(value, unit, name):
+        """Convert a decimal amount to an exact integer number of units.
+
+        Raises:
+            ValueError: If the amount is not a whole number of units
+            decimal.InvalidOperation: If the amount is not a number
+        """
+        unit = Decimal(unit)
+        # Not quantized first, which would round extra digits into a whole unit
+        units = Decimal(str(value)) / unit
+        if not units.is_finite() or units != units.to_integral_value():
+            raise ValueError(f"{name} {value} is not a multiple of {unit.normalize()}")
+        return int(units)
+
+    def price_to_ticks(self, price):
+        """Convert a decimal price to integer engine ticks"""
+        return self._to_units(price, self.tick_size, 'Price')
+
+    def ticks_to_price(self, ticks):
+        """Convert integer engine ticks back to a decimal price"""
+        return (ticks * Decimal(self.tick_size)).quantize(DECIMAL_PLACES)
+
+    def quantity_to_lots(self, quantity):
+        """Convert a decimal quantity to integer engine lots"""
+        return self._to_units(quantity, self.lot_size, 'Quantity')
+
+    def lots_to_quantity(self, lots):
+        """Convert integer engine lots back to a decimal quantity"""
+        return (lots * Decimal(self.lot_size)).quantize(DECIMAL_PLACES)
+
+    def tick_lots_to_amount(self, tick_lots):
+        """Convert an engine amount in ticks times lots to quote currency"""
+        return (tick_lots * Decimal(self.tick_size) * Decimal(self.lot_size)).quantize(DECIMAL_PLACES)
+
 class OrderModel(models.Model):
     ORDER_SIDE = (
         ('BUY', Side.BUY.name),
@@ -32,11 +73,18 @@ class OrderModel(models.Model):
     price = models.DecimalField(max_digits=18, decimal_places=8)
     status = models.CharField(max_length=10, choices=ORDER_STATUS, default='NEW')
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Newest-first order history per user; id breaks created_at ties
+            models.Index(fields=['user', '-created_at', '-id'], name='order_user_created_idx'),
+            models.Index(fields=['trading_pair', 'status'], name='order_pair_status_idx'),
+        ]
     
     def to_trading_order(self):
         """Convert to C++ Order object safely"""
-        price = Price()
-        price.value = float(self.price)
+        trading_pair = self.trading_pair
+        price = Price(trading_pair.price_to_ticks(self.price))
         
         # Map string side to C++ enum
         side_map = {'BUY': Side.BUY, 'SELL': Side.SELL}
@@ -45,8 +93,9 @@ class OrderModel(models.Model):
         order = Order(
             str(self.trading_pair.symbol),  # Ensure string type
             cpp_side,
-            float(self.quantity),
-            price
+            trading_pair.quantity_to_lots(self.quantity),
+            price,
+            str(self.order_id)  # Engine shares the database order id
         )
         
         # Map string status to C++ enum
@@ -66,6 +115,14 @@ class TradeModel(models.Model):
     quantity = models.DecimalField(max_digits=18, decimal_places=8)
     price = models.DecimalField(max_digits=18, decimal_places=8)
     timestamp = models.DateTimeField(auto_now_add=True)
+    # Set once the balance ledger has written this trade's effects to Balance
+    balance_applied = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Per-pair trade tape, newest first; id breaks timestamp ties
+            models.Index(fields=['trading_pair', '-timestamp', '-id'], name='trade_pair_time_idx'),
+        ]
     
 class Balance(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='balances')
@@ -76,4 +133,30 @@ class Balance(models.Model):
         unique_together = ['user', 'currency']
         
     def __str__(self):
-        return f"{self.user.username}: {self.amount} {self.currency}"
\ No newline at end of file
+        return f"{self.user.username}: {self.amount} {self.currency}"
+
+class Candle(models.Model):
+    INTERVALS = (
+        ('1s', '1 second'),
+        ('1m', '1 minute'),
+        ('5m', '5 minutes'),
+        ('1h', '1 hour'),
+        ('1d', '1 day'),
+    )
+
+    trading_pair = models.ForeignKey(TradingPair, on_delete=models.CASCADE)
+    interval = models.CharField(max_length=2, choices=INTERVALS)
+    # Start of the bar's period
+    start = models.DateTimeField()
+    open = models.DecimalField(max_digits=18, decimal_places=8)
+    high = models.DecimalField(max_digits=18, decimal_places=8)
+    low = models.DecimalField(max_digits=18, decimal_places=8)
+    close = models.DecimalField(max_digits=18, decimal_places=8)
+    volume = models.DecimalField(max_digits=30, decimal_places=8)
+
+    class Meta:
+        # Also the index behind time-range reads
+        unique_together = ['trading_pair', 'interval', 'start']
+
+    def __str__(self):
+        return f"{self.trading_pair.symbol} {self.interval} {self.start}"
\ No newline at end of file
@@ -0,0 +1,23 @@
+from django.db import connections
+
+
+class WriterRouter:
+    """Sends every write to 'default' and reads to the 'reader' connection.
+
+    Reads inside a transaction stay on 'default' so they see its own
+    uncommitted writes and the rows it has locked.
+    """
+
+    def db_for_read(self, model, **hints):
+        if connections['default'].in_atomic_block:
+            return 'default'
+        return 'reader'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
@@ -0,0 +1,137 @@
+from concurrent.futures import Future
+from queue import SimpleQueue, Empty
+from threading import Lock, Thread, current_thread
+import atexit
+import logging
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Most queued orders matched and settled together in one pass
+MAX_BATCH_SIZE = 256
+
+
+class OrderSequencer:
+    """Single matching thread that feeds queued orders to the engine in arrival order.
+
+    Request threads only append to the queue and wait on a future. The
+    matching thread takes whatever has accumulated, up to max_batch entries,
+    and hands consecutive orders to `handler` in one call, so batches grow
+    with load while a lone order is still processed as soon as it arrives.
+    Other engine work, such as cancels, is queued with call() and runs on
+    the same thread between batches, in its place in the queue. Work queued
+    from the matching thread itself runs at once.
+    """
+
+    def __init__(self, handler, max_batch=MAX_BATCH_SIZE):
+        """
+        Args:
+            handler (callable): Takes a list of OrderModel rows and returns,
+                for each, its trades or the exception that rejected it
+            max_batch (int): Largest number of orders passed to one call
+        """
+        self._handler = handler
+        self._max_batch = max_batch
+        self._queue = SimpleQueue()
+        self._stopped = False
+        self._stop_lock = Lock()
+        self._thread = Thread(target=self._run, name='order-sequencer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def submit(self, order_model):
+        """Queue a saved order for matching.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the order's trades
+        """
+        return self._put(None, order_model)
+
+    def call(self, func, *args):
+        """Queue `func(*args)` to run on the matching thread.
+
+        Returns:
+            concurrent.futures.Future: Resolves to what func returns or raises
+        """
+        return self._put(func, args)
+
+    def _put(self, func, payload):
+        future = Future()
+        if current_thread() is self._thread:
+            # Queueing would wait on the thread that has to run it
+            if func is None:
+                self._dispatch([(payload, future)])
+            else:
+                self._call(func, payload, future)
+            return future
+        with self._stop_lock:
+            if self._stopped:
+                future.set_exception(RuntimeError('The matching thread has stopped'))
+            else:
+                self._queue.put((func, payload, future))
+        return future
+
+    def _run(self):
+        try:
+            while True:
+                entries = [self._queue.get()]
+                while entries[-1] is not None and len(entries) < self._max_batch:
+                    try:
+                        entries.append(self._queue.get_nowait())
+                    except Empty:
+                        break
+                stopping = entries[-1] is None
+                if stopping:
+                    entries.pop()
+
+                batch = []
+                for func, payload, future in entries:
+                    if func is None:
+                        batch.append((payload, future))
+                        continue
+                    # Orders queued before the call are matched before it runs
+                    if batch:
+                        self._dispatch(batch)
+                        batch = []
+                    self._call(func, payload, future)
+                if batch:
+                    self._dispatch(batch)
+                if stopping:
+                    return
+        finally:
+            connection.close()
+
+    def _call(self, func, args, future):
+        try:
+            result = func(*args)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+
+    def _dispatch(self, batch):
+        try:
+            results = self._handler([order_model for order_model, _ in batch])
+        except Exception as e:
+            logger.error(f"Order batch failed: {str(e)}", exc_info=True)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stop(self):
+        """Process the work already queued, then stop the matching thread.
+
+        Anything queued afterwards fails with RuntimeError.
+        """
+        with self._stop_lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._queue.put(None)
+        self._thread.join()
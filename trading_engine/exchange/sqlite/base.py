@@ -0,0 +1,54 @@
+from threading import Lock
+from django.db.backends.sqlite3 import base
+
+# Held for the whole of every write transaction in this process
+_write_lock = Lock()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite connection whose transactions are serialized across threads.
+
+    SQLite allows one writer at a time, and a transaction that reads before
+    it writes fails with "database is locked" if another write commits in
+    between, without waiting for the busy timeout. Transactions therefore
+    take a process-wide lock before BEGIN and hold it until they commit or
+    roll back, so each thread's connection writes as if it were the only
+    one. Run with OPTIONS transaction_mode 'IMMEDIATE' so the database lock
+    is taken up front as well, and other processes wait on the timeout.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._holds_write_lock = False
+
+    def _release_write_lock(self):
+        if self._holds_write_lock:
+            self._holds_write_lock = False
+            _write_lock.release()
+
+    def _start_transaction_under_autocommit(self):
+        _write_lock.acquire()
+        self._holds_write_lock = True
+        try:
+            super()._start_transaction_under_autocommit()
+        except Exception:
+            self._release_write_lock()
+            raise
+
+    def _commit(self):
+        try:
+            super()._commit()
+        finally:
+            self._release_write_lock()
+
+    def _rollback(self):
+        try:
+            super()._rollback()
+        finally:
+            self._release_write_lock()
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            self._release_write_lock()
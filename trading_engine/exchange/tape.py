@@ -0,0 +1,116 @@
+from collections import deque
+from threading import Lock
+from django.db.models import Q
+from .models import TradeModel
+
+# Most recent trades kept in memory per symbol
+TAPE_CACHE_SIZE = 200
+
+
+class TradeTape:
+    """Public trade history per symbol, ordered by (timestamp, id).
+
+    The last TAPE_CACHE_SIZE trades of each symbol are kept in memory,
+    loaded from the database on first use and then appended to as trades
+    settle, so the latest trades and any page newer than a recent cursor
+    are served without a query. Older pages are read from the
+    (trading_pair, timestamp, id) index.
+    """
+
+    def __init__(self, trading_pairs, cache_size=TAPE_CACHE_SIZE):
+        """
+        Args:
+            trading_pairs (callable): Returns the TradingPair for a symbol
+            cache_size (int): Trades kept in memory per symbol
+        """
+        self._trading_pairs = trading_pairs
+        self._cache_size = cache_size
+        self._lock = Lock()
+        # symbol -> deque of trade dicts, oldest first
+        self._tails = {}
+        # Symbols whose whole history fits in their tail
+        self._complete = set()
+
+    @staticmethod
+    def _key(trade):
+        return trade['timestamp'], trade['id']
+
+    def _query(self, trading_pair):
+        return TradeModel.objects.filter(trading_pair=trading_pair)
+
+    def _rows(self, trades):
+        return [
+            {'id': pk, 'price': price, 'quantity': quantity, 'timestamp': timestamp}
+            for pk, price, quantity, timestamp in trades.values_list('id', 'price', 'quantity', 'timestamp')
+        ]
+
+    def _tail(self, symbol):
+        """The symbol's cached trades, loading them on first use.
+
+        Callers must hold self._lock.
+        """
+        tail = self._tails.get(symbol)
+        if tail is None:
+            trading_pair = self._trading_pairs(symbol)
+            latest = self._rows(self._query(trading_pair).order_by('-timestamp', '-id')[:self._cache_size])
+            tail = self._tails[symbol] = deque(reversed(latest), maxlen=self._cache_size)
+            if len(latest) < self._cache_size:
+                self._complete.add(symbol)
+        return tail
+
+    def record(self, symbol, trade_models):
+        """Append trades that have been committed to the database"""
+        with self._lock:
+            tail = self._tail(symbol)
+            for trade_model in trade_models:
+                trade = {
+                    'id': trade_model.pk,
+                    'price': trade_model.price,
+                    'quantity': trade_model.quantity,
+                    'timestamp': trade_model.timestamp
+                }
+                if not tail or self._key(tail[-1]) < self._key(trade):
+                    tail.append(trade)
+                elif trade['id'] not in {t['id'] for t in tail}:
+                    # Committed out of order, or already loaded with the tail
+                    tail.append(trade)
+                    ordered = sorted(tail, key=self._key)
+                    tail.clear()
+                    tail.extend(ordered)
+                if len(tail) == tail.maxlen:
+                    self._complete.discard(symbol)
+
+    def page(self, symbol, before=None, since=None, limit=50):
+        """One page of a symbol's trades.
+
+        Args:
+            symbol (str): The trading pair symbol (e.g., 'BTCUSD')
+            before (tuple): (timestamp, id) cursor; the newest trades older than it
+            since (tuple): (timestamp, id) cursor; the oldest trades newer than it
+            limit (int): Most trades returned
+
+        Returns:
+            list: Trade dicts, newest first without a cursor or with before,
+                oldest first with since
+
+        Raises:
+            TradingPair.DoesNotExist: If the symbol is not a listed trading pair
+        """
+        with self._lock:
+            tail = self._tail(symbol)
+            complete = symbol in self._complete
+            if before is None and since is None and (limit <= len(tail) or complete):
+                return list(tail)[::-1][:limit]
+            if since is not None and (complete or (tail and self._key(tail[0]) <= since)):
+                # Every trade newer than the cursor is in the tail
+                return [trade for trade in tail if self._key(trade) > since][:limit]
+
+        trades = self._query(self._trading_pairs(symbol))
+        if since is not None:
+            timestamp, pk = since
+            trades = trades.filter(Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=pk))
+            return self._rows(trades.order_by('timestamp', 'id')[:limit])
+        if before is not None:
+            timestamp, pk = before
+            trades = trades.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk))
+        return self._rows(trades.order_by('-timestamp', '-id')[:limit])
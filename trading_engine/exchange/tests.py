@@ -1,3 +1,1423 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from threading import Event
+import asyncio
+import atexit
+import json
+import shutil
+import tempfile
+import time
+from unittest import mock
+from datetime import datetime, timezone
+from django.contrib.auth.models import User
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F, Sum
+from django.test import Client, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from trading import EventType, Market, Order, Price, Side
+from .feed import MarketFeed, group_name
+from .candles import CandleAggregator
+from .engine_store import EMPTY_SEGMENT_SIZE
+from .ledger import InsufficientBalance
+from .market_manager import MAX_CACHED_DEPTH, MarketManager
+from .models import Balance, Candle, OrderModel, TradeModel, TradingPair
+from .routing import websocket_urlpatterns
+from .sequencer import OrderSequencer
+from .tape import TradeTape
+from .ticker import NANOSECONDS, RollingStats
+from . import views
 
-# Create your tests here.
+# Orders per second the settlement path must absorb without lock errors
+TARGET_ORDER_RATE = 50
+
+
+@override_settings(ENGINE_STATE_DIR=None)
+class ExchangeTestCase(TransactionTestCase):
+    """Runs each test against a fresh MarketManager and one trading pair.
+
+    Tests commit their data, since the reader connection never sees the
+    uncommitted rows of a TestCase transaction.
+    """
+
+    databases = {'default', 'reader'}
+
+    def setUp(self):
+        self._reset_market_manager()
+        self.trading_pair = TradingPair.objects.create(
+            symbol='TESTUSD', base_currency='TEST', quote_currency='USD',
+            min_quantity='1', tick_size='0.01', lot_size='0.00000001'
+        )
+
+    def tearDown(self):
+        self._stop_market_manager()
+        self._reset_market_manager()
+
+    def _stop_market_manager(self):
+        manager = MarketManager._instance
+        if manager is not None:
+            manager._sequencer.stop()
+            manager._ledger.stop()
+            manager._candles.stop()
+            if manager._store is not None:
+                # No final snapshot into a state directory the test removes
+                atexit.unregister(manager._store.stop)
+
+    def _reset_market_manager(self):
+        MarketManager._instance = None
+        if hasattr(views.get_market_manager, 'market_manager'):
+            del views.get_market_manager.market_manager
+
+    def create_user(self, username, amount=Decimal('1000000')):
+        """A user holding `amount` of both currencies of the trading pair"""
+        user = User.objects.create_user(username, password='unused')
+        Balance.objects.create(user=user, currency='USD', amount=amount)
+        Balance.objects.create(user=user, currency='TEST', amount=amount)
+        return user
+
+    def create_order(self, user, side, quantity, price):
+        return OrderModel.objects.create(
+            user=user, trading_pair=self.trading_pair, side=side,
+            quantity=Decimal(quantity), price=Decimal(price), status='NEW'
+        )
+
+
+class ConcurrentSettlementTest(ExchangeTestCase):
+    """Traders on separate threads place, match and cancel orders at the
+    target rate while others read order history and the trade tape."""
+
+    traders = 6
+    readers = 2
+    duration = 3
+
+    def setUp(self):
+        super().setUp()
+        self.users = [self.create_user(f'trader{i}') for i in range(self.traders)]
+
+    def _trade(self, index, deadline):
+        client = Client()
+        client.force_login(self.users[index])
+        side = 'BUY' if index % 2 == 0 else 'SELL'
+        interval = self.traders / TARGET_ORDER_RATE
+        failures = []
+        placed = 0
+        next_at = time.monotonic()
+        try:
+            while time.monotonic() < deadline:
+                # Alternate crossing orders with resting ones that are then cancelled
+                crossing = placed % 2 == 0
+                price = 100 if crossing else (90 if side == 'BUY' else 110)
+                response = client.post('/place-order/', json.dumps({
+                    'symbol': 'TESTUSD', 'side': side, 'quantity': 1, 'price': price
+                }), content_type='application/json')
+                if response.status_code != 200:
+                    failures.append(response.content)
+                elif not crossing:
+                    order_id = response.json()['order_id']
+                    response = client.post(f'/cancel-order/{order_id}/')
+                    if response.status_code != 200:
+                        failures.append(response.content)
+                placed += 1
+
+                next_at += interval
+                time.sleep(max(0, next_at - time.monotonic()))
+        finally:
+            connections.close_all()
+        return placed, failures
+
+    def _read(self, index, deadline):
+        client = Client()
+        client.force_login(self.users[index])
+        failures = []
+        try:
+            while time.monotonic() < deadline:
+                for path in ('/orders/', '/trades/TESTUSD/'):
+                    response = client.get(path)
+                    if response.status_code != 200:
+                        failures.append(response.content)
+                time.sleep(0.05)
+        finally:
+            connections.close_all()
+        return failures
+
+    def test_no_lock_errors_at_target_rate(self):
+        views.get_market_manager()
+        deadline = time.monotonic() + self.duration
+        with self.assertNoLogs('exchange', level='ERROR'):
+            with ThreadPoolExecutor(self.traders + self.readers) as pool:
+                trading = [pool.submit(self._trade, i, deadline) for i in range(self.traders)]
+                reading = [pool.submit(self._read, i, deadline) for i in range(self.readers)]
+                results = [future.result() for future in trading]
+                read_failures = [failure for future in reading for failure in future.result()]
+            views.get_market_manager().ledger.flush()
+
+        placed = sum(count for count, _ in results)
+        failures = [failure for _, trader_failures in results for failure in trader_failures]
+        self.assertEqual(failures, [])
+        self.assertEqual(read_failures, [])
+        self.assertGreaterEqual(placed, TARGET_ORDER_RATE * self.duration * 0.9)
+
+        self.assertEqual(OrderModel.objects.count(), placed)
+        self.assertFalse(OrderModel.objects.filter(status='REJECTED').exists())
+        self.assertTrue(TradeModel.objects.exists())
+        self.assertFalse(TradeModel.objects.filter(balance_applied=False).exists())
+        # Settlement only moves funds between traders
+        for currency in ('USD', 'TEST'):
+            total = Balance.objects.filter(currency=currency).aggregate(total=Sum('amount'))['total']
+            self.assertEqual(total, Decimal('1000000') * self.traders)
+
+
+class EngineRestoreTest(ExchangeTestCase):
+    """A restart replays the journal, checked against the database's open orders."""
+
+    def setUp(self):
+        super().setUp()
+        state_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, state_dir)
+        overrides = override_settings(ENGINE_STATE_DIR=state_dir, ENGINE_SNAPSHOT_INTERVAL=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.seller = self.create_user('seller')
+        self.buyer = self.create_user('buyer')
+
+    def _crash(self):
+        """Start a new manager without the snapshot a clean exit writes"""
+        self._stop_market_manager()
+        self._reset_market_manager()
+        return MarketManager()
+
+    def _remaining(self, manager, order):
+        return manager.market.getOrder(str(order.order_id)).getRemainingQuantity()
+
+    def test_journal_restores_committed_orders(self):
+        manager = MarketManager()
+        resting = self.create_order(self.seller, 'SELL', 5, 100)
+        manager.add_order(resting)
+        manager.add_order(self.create_order(self.buyer, 'BUY', 2, 100))
+
+        with self.assertNoLogs('exchange.market_manager', level='WARNING'):
+            manager = self._crash()
+        self.assertEqual(self._remaining(manager, resting), self.trading_pair.quantity_to_lots(3))
+
+    def test_stop_writes_a_final_snapshot(self):
+        manager = MarketManager()
+        resting = self.create_order(self.seller, 'SELL', 5, 100)
+        manager.add_order(resting)
+        manager.stop()
+        # Every journaled input is covered by the snapshots
+        for _, path in manager._store._segments():
+            self.assertLessEqual(path.stat().st_size, EMPTY_SEGMENT_SIZE)
+
+        self._reset_market_manager()
+        with self.assertNoLogs('exchange.market_manager', level='WARNING'):
+            manager = MarketManager()
+        self.assertEqual(self._remaining(manager, resting), self.trading_pair.quantity_to_lots(5))
+
+    def test_inputs_are_journaled_after_commit(self):
+        manager = MarketManager()
+        store = manager._store
+        in_transaction = []
+
+        def journaled(record):
+            def wrapper(*args):
+                in_transaction.append(connections['default'].in_atomic_block)
+                return record(*args)
+            return wrapper
+
+        with mock.patch.object(store, 'record_add', journaled(store.record_add)), \
+                mock.patch.object(store, 'record_cancel', journaled(store.record_cancel)):
+            resting = self.create_order(self.seller, 'SELL', 5, 100)
+            manager.add_order(resting)
+            manager.add_orders([
+                OrderModel(user=self.buyer, trading_pair=self.trading_pair, side='BUY', quantity=1, price=90)
+            ])
+            manager.cancel_order(resting)
+        self.assertEqual(in_transaction, [False, False, False])
+
+    def test_restart_reads_no_open_orders(self):
+        manager = MarketManager()
+        manager.add_order(self.create_order(self.seller, 'SELL', 5, 100))
+        manager.add_order(self.create_order(self.buyer, 'BUY', 2, 100))
+
+        with mock.patch.object(MarketManager, '_open_orders', side_effect=AssertionError('read open orders')):
+            self._crash()
+
+    def test_database_ahead_of_the_journal(self):
+        manager = MarketManager()
+        resting = self.create_order(self.seller, 'SELL', 5, 100)
+        manager.add_order(resting)
+        # Committed, but the process died before journaling it
+        unjournaled = self.create_order(self.buyer, 'BUY', 1, 90)
+
+        with self.assertLogs('exchange.market_manager', level='WARNING'):
+            manager = self._crash()
+        self.assertEqual(self._remaining(manager, resting), self.trading_pair.quantity_to_lots(5))
+        self.assertEqual(self._remaining(manager, unjournaled), self.trading_pair.quantity_to_lots(1))
+
+        # The books loaded from the database were snapshotted, so the next start needs no repair
+        with self.assertNoLogs('exchange.market_manager', level='WARNING'):
+            manager = self._crash()
+        self.assertEqual(self._remaining(manager, unjournaled), self.trading_pair.quantity_to_lots(1))
+
+    def test_rolled_back_orders_are_not_restored(self):
+        manager = MarketManager()
+        resting = self.create_order(self.seller, 'SELL', 5, 100)
+        manager.add_order(resting)
+        phantom = OrderModel(user=self.buyer, trading_pair=self.trading_pair, side='BUY', quantity=1, price=90)
+        taker = OrderModel(user=self.buyer, trading_pair=self.trading_pair, side='BUY', quantity=2, price=100)
+        # Both reach the engine, then settlement rolls back
+        with mock.patch.object(TradeModel.objects, 'bulk_create', side_effect=DatabaseError('disk full')):
+            with self.assertLogs('exchange', level='ERROR'):
+                with self.assertRaises(DatabaseError):
+                    manager.add_orders([phantom, taker])
+        self.assertFalse(TradeModel.objects.exists())
+
+        with self.assertNoLogs('exchange.market_manager', level='WARNING'):
+            manager = self._crash()
+        self.assertEqual(self._remaining(manager, resting), self.trading_pair.quantity_to_lots(5))
+        self.assertFalse(manager.market.hasOrder(str(phantom.order_id)))
+
+
+class BalanceLedgerTest(ExchangeTestCase):
+    """Reservations and settlement through the in-process balance ledger."""
+
+    def setUp(self):
+        super().setUp()
+        self.seller = self.create_user('seller')
+        self.buyer = self.create_user('buyer')
+
+    def _balance(self, manager, user, currency):
+        return next(b for b in manager.ledger.get_balances(user) if b['currency'] == currency)
+
+    def test_first_order_after_restart_is_held_once(self):
+        manager = MarketManager()
+        manager.add_order(self.create_order(self.buyer, 'BUY', 10, 100))
+
+        usd = self._balance(manager, self.buyer, 'USD')
+        self.assertEqual(usd['reserved'], Decimal('1000'))
+        self.assertEqual(usd['available'], Decimal('999000'))
+
+    def test_batched_orders_are_held_once(self):
+        manager = MarketManager()
+        orders = [self.create_order(self.buyer, 'BUY', 10, 100), self.create_order(self.buyer, 'BUY', 5, 100)]
+        manager._execute_batch(orders)
+
+        usd = self._balance(manager, self.buyer, 'USD')
+        self.assertEqual(usd['reserved'], Decimal('1500'))
+        self.assertEqual(usd['available'], Decimal('998500'))
+
+    def test_open_orders_are_held_after_restart(self):
+        manager = MarketManager()
+        manager.add_order(self.create_order(self.seller, 'SELL', 5, 100))
+        manager.add_order(self.create_order(self.buyer, 'BUY', 2, 100))
+        manager.ledger.flush()
+
+        self._stop_market_manager()
+        self._reset_market_manager()
+        manager = MarketManager()
+        test = self._balance(manager, self.seller, 'TEST')
+        self.assertEqual(test['reserved'], Decimal('3'))
+        self.assertEqual(test['amount'], Decimal('999998'))
+
+    def test_failed_settlement_releases_and_reloads(self):
+        manager = MarketManager()
+        resting = self.create_order(self.seller, 'SELL', 5, 100)
+        manager.add_order(resting)
+        taker = self.create_order(self.buyer, 'BUY', 2, 100)
+        with mock.patch.object(TradeModel.objects, 'bulk_create', side_effect=DatabaseError('disk full')):
+            with self.assertLogs('exchange', level='ERROR'):
+                with self.assertRaises(DatabaseError):
+                    manager.add_order(taker)
+
+        taker.refresh_from_db()
+        self.assertEqual(taker.status, 'REJECTED')
+        self.assertFalse(TradeModel.objects.exists())
+        self.assertEqual(self._balance(manager, self.buyer, 'USD')['reserved'], 0)
+        # The book no longer has the rolled-back fill
+        self.assertFalse(manager.market.hasOrder(str(taker.order_id)))
+        remaining = manager.market.getOrder(str(resting.order_id)).getRemainingQuantity()
+        self.assertEqual(remaining, self.trading_pair.quantity_to_lots(5))
+
+    def test_flush_keeps_changes_made_elsewhere(self):
+        manager = MarketManager()
+        manager.add_order(self.create_order(self.seller, 'SELL', 1, 100))
+        manager.add_order(self.create_order(self.buyer, 'BUY', 1, 100))
+        # Another process credits the buyer before the ledger flushes
+        Balance.objects.filter(user=self.buyer, currency='USD').update(amount=F('amount') + 50)
+        manager.ledger.flush()
+
+        self.assertEqual(Balance.objects.get(user=self.buyer, currency='USD').amount, Decimal('999950'))
+        self.assertEqual(Balance.objects.get(user=self.buyer, currency='TEST').amount, Decimal('1000001'))
+        self.assertEqual(Balance.objects.get(user=self.seller, currency='USD').amount, Decimal('1000100'))
+
+
+class OrderSequencerTest(SimpleTestCase):
+    """Batching and result delivery of the matching thread, with a stand-in handler."""
+
+    def setUp(self):
+        self.batches = []
+        self.release = Event()
+        self.sequencer = OrderSequencer(self._handle)
+        self.addCleanup(self.sequencer.stop)
+        self.addCleanup(self.release.set)
+
+    def _handle(self, orders):
+        self.release.wait(5)
+        self.batches.append(orders)
+        return [ValueError(order) if order.startswith('bad') else [order] for order in orders]
+
+    def test_orders_queued_behind_a_batch_form_the_next_one(self):
+        first = self.sequencer.submit('first')
+        # Queued while the matching thread is busy with 'first'
+        time.sleep(0.1)
+        later = [self.sequencer.submit(order) for order in ('a', 'bad', 'b')]
+        self.release.set()
+
+        self.assertEqual(first.result(5), ['first'])
+        self.assertEqual(later[0].result(5), ['a'])
+        with self.assertRaisesMessage(ValueError, 'bad'):
+            later[1].result(5)
+        self.assertEqual(later[2].result(5), ['b'])
+        self.assertEqual(self.batches, [['first'], ['a', 'bad', 'b']])
+
+    def test_calls_run_in_their_place_in_the_queue(self):
+        calls = []
+
+        def record():
+            calls.append(list(self.batches))
+            return 'done'
+
+        first = self.sequencer.submit('a')
+        time.sleep(0.1)
+        call = self.sequencer.call(record)
+        second = self.sequencer.submit('b')
+        self.release.set()
+
+        self.assertEqual((first.result(5), call.result(5), second.result(5)), (['a'], 'done', ['b']))
+        # The call saw the batch queued before it, and split the one after it off
+        self.assertEqual(calls, [[['a']]])
+        self.assertEqual(self.batches, [['a'], ['b']])
+
+    def test_nothing_runs_after_stop(self):
+        self.release.set()
+        self.sequencer.stop()
+        with self.assertRaisesMessage(RuntimeError, 'stopped'):
+            self.sequencer.call(lambda: None).result(5)
+
+    def test_handler_failure_fails_the_batch(self):
+        self.sequencer._handler = mock.Mock(side_effect=RuntimeError('engine down'))
+        with self.assertLogs('exchange.sequencer', level='ERROR'):
+            future = self.sequencer.submit('a')
+            with self.assertRaisesMessage(RuntimeError, 'engine down'):
+                future.result(5)
+
+
+class OrderBatchTest(ExchangeTestCase):
+    """Orders matched and settled together on the matching thread."""
+
+    def setUp(self):
+        super().setUp()
+        self.seller = self.create_user('seller')
+        self.buyer = self.create_user('buyer')
+        self.manager = MarketManager()
+
+    def _status(self, order):
+        order.refresh_from_db()
+        return order.status
+
+    def test_orders_match_in_arrival_order(self):
+        first = self.create_order(self.seller, 'SELL', 1, 100)
+        second = self.create_order(self.seller, 'SELL', 1, 100)
+        buy = self.create_order(self.buyer, 'BUY', 1, 100)
+        results = self.manager._execute_batch([first, second, buy])
+
+        self.assertEqual(results[:2], [[], []])
+        self.assertEqual([str(t.getSellOrderId()) for t in results[2]], [str(first.order_id)])
+        self.assertEqual(self._status(first), 'FILLED')
+        self.assertEqual(self._status(second), 'NEW')
+
+    def test_rejection_does_not_affect_the_batch(self):
+        poor = self.create_user('poor', amount=Decimal('10'))
+        sell = self.create_order(self.seller, 'SELL', 1, 100)
+        unfunded = self.create_order(poor, 'BUY', 1, 100)
+        buy = self.create_order(self.buyer, 'BUY', 1, 100)
+        with self.assertLogs('exchange', level='ERROR'):
+            results = self.manager._execute_batch([sell, unfunded, buy])
+
+        self.assertEqual(results[0], [])
+        self.assertIsInstance(results[1], InsufficientBalance)
+        self.assertEqual(len(results[2]), 1)
+        self.assertEqual(self._status(unfunded), 'REJECTED')
+        self.assertEqual(self._status(buy), 'FILLED')
+
+    def test_failed_settlement_only_rejects_its_order(self):
+        other = self.create_user('other')
+        sell = self.create_order(self.seller, 'SELL', 2, 100)
+        good = self.create_order(self.buyer, 'BUY', 1, 100)
+        bad = self.create_order(other, 'BUY', 1, 100)
+
+        bulk_create = TradeModel.objects.bulk_create
+
+        def fail_for_bad(trade_models):
+            if any(t.buy_order.pk == bad.pk for t in trade_models):
+                raise DatabaseError('disk full')
+            return bulk_create(trade_models)
+
+        with mock.patch.object(TradeModel.objects, 'bulk_create', side_effect=fail_for_bad):
+            with self.assertLogs('exchange', level='ERROR'):
+                results = self.manager._execute_batch([sell, good, bad])
+
+        self.assertEqual(results[0], [])
+        self.assertEqual(len(results[1]), 1)
+        self.assertIsInstance(results[2], DatabaseError)
+        self.assertEqual(self._status(good), 'FILLED')
+        self.assertEqual(self._status(bad), 'REJECTED')
+        self.assertEqual(TradeModel.objects.count(), 1)
+        # The book and reservations only reflect the settled trade
+        remaining = self.manager.market.getOrder(str(sell.order_id)).getRemainingQuantity()
+        self.assertEqual(remaining, self.trading_pair.quantity_to_lots(1))
+        self.assertFalse(self.manager.market.hasOrder(str(bad.order_id)))
+        usd = next(b for b in self.manager.ledger.get_balances(other) if b['currency'] == 'USD')
+        self.assertEqual(usd['reserved'], 0)
+
+    def test_place_order_returns_the_orders_trades(self):
+        seller, buyer = Client(), Client()
+        seller.force_login(self.seller)
+        buyer.force_login(self.buyer)
+
+        def place(client, side, quantity):
+            return client.post('/place-order/', json.dumps({
+                'symbol': 'TESTUSD', 'side': side, 'quantity': quantity, 'price': 100
+            }), content_type='application/json')
+
+        response = place(seller, 'SELL', 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['trades'], [])
+
+        response = place(buyer, 'BUY', 1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['trades']), 1)
+
+        with self.assertLogs('exchange', level='ERROR'):
+            response = place(buyer, 'BUY', 100000)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Insufficient balance', response.json()['error'])
+
+
+class AddOrdersTest(ExchangeTestCase):
+    """Bulk orders added in one engine call, all or nothing."""
+
+    def setUp(self):
+        super().setUp()
+        self.seller = self.create_user('seller')
+        self.buyer = self.create_user('buyer')
+        self.manager = MarketManager()
+        self.resting = self.create_order(self.seller, 'SELL', 5, 100)
+        self.manager.add_order(self.resting)
+        self.client = Client()
+        self.client.force_login(self.buyer)
+
+    def _reserved(self, user, currency):
+        return next(b['reserved'] for b in self.manager.ledger.get_balances(user) if b['currency'] == currency)
+
+    def _order(self, user, side, quantity, price):
+        """An order for add_orders, which saves it"""
+        return OrderModel(
+            user=user, trading_pair=self.trading_pair, side=side,
+            quantity=Decimal(quantity), price=Decimal(price), status='NEW'
+        )
+
+    def _resting(self):
+        return {
+            order.getId(): order.getRemainingQuantity()
+            for order in self.manager.market.getOrderBook('TESTUSD').getOrders()
+        }
+
+    def _place(self, orders):
+        return self.client.post('/place-orders/', json.dumps([
+            {'symbol': 'TESTUSD', 'side': side, 'quantity': quantity, 'price': price}
+            for side, quantity, price in orders
+        ]), content_type='application/json')
+
+    def test_trades_are_grouped_per_order(self):
+        orders = [
+            self._order(self.buyer, 'BUY', 2, 100),
+            self._order(self.buyer, 'BUY', 1, 90),
+            self._order(self.buyer, 'BUY', 4, 100),
+        ]
+        trades = self.manager.add_orders(orders)
+
+        self.assertEqual([len(order_trades) for order_trades in trades], [1, 0, 1])
+        self.assertEqual([t.getQuantity() for t in trades[2]], [self.trading_pair.quantity_to_lots(3)])
+        self.assertEqual(str(trades[0][0].getBuyOrderId()), str(orders[0].order_id))
+        self.assertEqual(TradeModel.objects.count(), 2)
+
+    def test_unfunded_order_rejects_the_batch(self):
+        poor = self.create_user('poor', amount=Decimal('10'))
+        orders = [self._order(self.buyer, 'BUY', 1, 100), self._order(poor, 'BUY', 1, 100)]
+        with self.assertRaises(InsufficientBalance):
+            self.manager.add_orders(orders)
+
+        self.assertFalse(OrderModel.objects.filter(user__in=[self.buyer, poor]).exists())
+        self.assertEqual(self._resting(), {str(self.resting.order_id): self.trading_pair.quantity_to_lots(5)})
+        self.assertEqual(self._reserved(self.buyer, 'USD'), 0)
+        self.assertFalse(TradeModel.objects.exists())
+
+    def test_failed_settlement_releases_and_reloads(self):
+        orders = [self._order(self.buyer, 'BUY', 2, 100), self._order(self.buyer, 'BUY', 1, 90)]
+        with mock.patch.object(TradeModel.objects, 'bulk_create', side_effect=DatabaseError('disk full')):
+            with self.assertLogs('exchange', level='ERROR'):
+                with self.assertRaises(DatabaseError):
+                    self.manager.add_orders(orders)
+
+        # Neither the orders, the fill nor the resting buy survived the rollback
+        self.assertFalse(OrderModel.objects.filter(user=self.buyer).exists())
+        self.assertEqual(self._resting(), {str(self.resting.order_id): self.trading_pair.quantity_to_lots(5)})
+        self.assertEqual(self._reserved(self.buyer, 'USD'), 0)
+        self.assertEqual(self._reserved(self.seller, 'TEST'), Decimal('5'))
+        self.assertFalse(TradeModel.objects.exists())
+
+    def test_place_orders_endpoint(self):
+        response = self._place([('BUY', 2, 100), ('BUY', 1, 90)])
+        self.assertEqual(response.status_code, 200)
+        orders = response.json()['orders']
+        self.assertEqual([len(order['trades']) for order in orders], [1, 0])
+        self.assertEqual(Decimal(orders[0]['trades'][0]['quantity']), 2)
+        self.assertTrue(self.manager.market.hasOrder(orders[1]['order_id']))
+
+    def test_place_orders_rejects_the_whole_batch(self):
+        before = OrderModel.objects.count()
+        response = self._place([('BUY', 1, 95), ('BUY', 100000, 100)])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Insufficient balance', response.json()['error'])
+
+        response = self._place([('BUY', 1, 95), ('BUY', 1, 'abc')])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Order 1', response.json()['error'])
+
+        response = self._place([('BUY', 1, 95)] * (views.MAX_BATCH_ORDERS + 1))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(str(views.MAX_BATCH_ORDERS), response.json()['error'])
+
+        with mock.patch.object(TradeModel.objects, 'bulk_create', side_effect=DatabaseError('disk full')):
+            with self.assertLogs('exchange', level='ERROR'):
+                response = self._place([('BUY', 1, 95), ('BUY', 2, 100)])
+        self.assertEqual(response.status_code, 500)
+
+        self.assertEqual(OrderModel.objects.count(), before)
+        self.assertEqual(self._resting(), {str(self.resting.order_id): self.trading_pair.quantity_to_lots(5)})
+        self.assertEqual(self._reserved(self.buyer, 'USD'), 0)
+
+
+class CancelOrderTest(ExchangeTestCase):
+    """Cancels run on the matching thread in their own transaction."""
+
+    def setUp(self):
+        super().setUp()
+        self.seller = self.create_user('seller')
+        self.manager = MarketManager()
+        self.order = self.create_order(self.seller, 'SELL', 5, 100)
+        self.manager.add_order(self.order)
+        self.client = Client()
+        self.client.force_login(self.seller)
+
+    def _reserved(self):
+        return next(b['reserved'] for b in self.manager.ledger.get_balances(self.seller) if b['currency'] == 'TEST')
+
+    def test_cancel_releases_the_remainder(self):
+        self.manager.add_order(self.create_order(self.create_user('buyer'), 'BUY', 2, 100))
+        response = self.client.post(f'/cancel-order/{self.order.order_id}/')
+        self.assertEqual(response.status_code, 200)
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'CANCELLED')
+        self.assertFalse(self.manager.market.hasOrder(str(self.order.order_id)))
+        self.assertEqual(self._reserved(), 0)
+
+        response = self.client.post(f'/cancel-order/{self.order.order_id}/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_failed_cancel_keeps_the_order(self):
+        with mock.patch.object(OrderModel, 'save', side_effect=DatabaseError('disk full')):
+            with self.assertLogs('exchange', level='WARNING'):
+                with self.assertRaises(DatabaseError):
+                    self.manager.cancel_order(self.order)
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'NEW')
+        remaining = self.manager.market.getOrder(str(self.order.order_id)).getRemainingQuantity()
+        self.assertEqual(remaining, self.trading_pair.quantity_to_lots(5))
+        self.assertEqual(self._reserved(), Decimal('5'))
+
+
+class SettlementTest(ExchangeTestCase):
+    """All fills of one matching pass are settled together."""
+
+    def setUp(self):
+        super().setUp()
+        self.sellers = [self.create_user(f'seller{i}') for i in range(4)]
+        self.buyer = self.create_user('buyer')
+        self.manager = MarketManager()
+
+    def _sweep_queries(self, levels):
+        """Queries on the writer connection for a buy that takes `levels` resting sells"""
+        for i in range(levels):
+            self.manager.add_order(self.create_order(self.sellers[i % len(self.sellers)], 'SELL', 1, 100 + i))
+        buy = self.create_order(self.buyer, 'BUY', levels, 100 + levels)
+        with CaptureQueriesContext(connections['default']) as queries:
+            trades = self.manager.add_order(buy)
+        self.assertEqual(len(trades), levels)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_fills(self):
+        # Load every cache the first settlement fills
+        self._sweep_queries(1)
+        self.assertEqual(self._sweep_queries(20), self._sweep_queries(2))
+
+    def test_stage_timer_reports_match_and_settle(self):
+        stages = []
+        self.manager.set_stage_timer(lambda stage, seconds: stages.append(stage))
+        self.manager.add_order(self.create_order(self.sellers[0], 'SELL', 1, 100))
+        self.manager.add_order(self.create_order(self.buyer, 'BUY', 1, 100))
+        # The resting sell has no trades to settle
+        self.assertEqual(stages, ['match', 'match', 'settle'])
+
+    def test_fills_update_orders_and_balances(self):
+        seller = self.sellers[0]
+        sell = self.create_order(seller, 'SELL', 3, 100)
+        self.manager.add_order(sell)
+        buy = self.create_order(self.buyer, 'BUY', 5, 101)
+        self.manager.add_order(buy)
+        self.manager.ledger.flush()
+
+        sell.refresh_from_db()
+        buy.refresh_from_db()
+        self.assertEqual(sell.status, 'FILLED')
+        # Partially filled orders stay open
+        self.assertEqual(buy.status, 'NEW')
+        trade = TradeModel.objects.get()
+        self.assertEqual((trade.price, trade.quantity), (Decimal('100'), Decimal('3')))
+        self.assertEqual((trade.buy_order_id, trade.sell_order_id), (buy.pk, sell.pk))
+        self.assertTrue(trade.balance_applied)
+
+        def amount(user, currency):
+            return Balance.objects.get(user=user, currency=currency).amount
+        self.assertEqual(amount(self.buyer, 'USD'), Decimal('999700'))
+        self.assertEqual(amount(self.buyer, 'TEST'), Decimal('1000003'))
+        self.assertEqual(amount(seller, 'USD'), Decimal('1000300'))
+        self.assertEqual(amount(seller, 'TEST'), Decimal('999997'))
+        # The open remainder holds its limit price; the fill's price improvement is freed
+        usd = next(b for b in self.manager.ledger.get_balances(self.buyer) if b['currency'] == 'USD')
+        self.assertEqual(usd['reserved'], Decimal('202'))
+
+
+class RehydrateTest(ExchangeTestCase):
+    """Without saved engine state, startup loads open orders from the database."""
+
+    def setUp(self):
+        super().setUp()
+        self.sellers = [self.create_user('seller0'), self.create_user('seller1')]
+        self.buyer = self.create_user('buyer')
+
+    def _restart(self):
+        self._stop_market_manager()
+        self._reset_market_manager()
+        return MarketManager()
+
+    def test_open_orders_return_at_their_remainder(self):
+        manager = MarketManager()
+        first = self.create_order(self.sellers[0], 'SELL', 5, 100)
+        second = self.create_order(self.sellers[1], 'SELL', 5, 100)
+        cancelled = self.create_order(self.sellers[1], 'SELL', 1, 105)
+        for order in (first, second, cancelled):
+            manager.add_order(order)
+        manager.cancel_order(cancelled)
+        taker = self.create_order(self.buyer, 'BUY', 2, 100)
+        manager.add_order(taker)
+
+        manager = self._restart()
+        self.assertTrue(manager.market.hasOrderBook('TESTUSD'))
+        remaining = {
+            order.getId(): order.getRemainingQuantity()
+            for order in manager.market.getOrderBook('TESTUSD').getOrders()
+        }
+        self.assertEqual(remaining, {
+            str(first.order_id): self.trading_pair.quantity_to_lots(3),
+            str(second.order_id): self.trading_pair.quantity_to_lots(5),
+        })
+
+    def test_time_priority_survives_restart(self):
+        manager = MarketManager()
+        orders = [self.create_order(seller, 'SELL', 1, 100) for seller in (*self.sellers, self.sellers[0])]
+        for order in orders:
+            manager.add_order(order)
+        # Orders created in the same instant keep their insertion order
+        OrderModel.objects.filter(pk__in=[o.pk for o in orders]).update(created_at=orders[0].created_at)
+
+        manager = self._restart()
+        trades = manager.add_order(self.create_order(self.buyer, 'BUY', 3, 100))
+        self.assertEqual([str(t.getSellOrderId()) for t in trades], [str(o.order_id) for o in orders])
+
+
+class BookEventTest(SimpleTestCase):
+    """Book changes the engine records for drainEvents."""
+
+    def setUp(self):
+        self.market = Market(event_capacity=64)
+        self.market.createOrderBook('TESTUSD')
+
+    def test_changes_are_drained_in_sequence(self):
+        self.market.addOrder(Order('TESTUSD', Side.SELL, 5, Price(100), 'sell'))
+        self.market.addOrder(Order('TESTUSD', Side.BUY, 2, Price(100), 'buy'))
+        self.market.matchOrders('TESTUSD')
+
+        events = self.market.drainEvents(3) + self.market.drainEvents(64)
+        self.assertEqual([e.sequence for e in events], list(range(1, len(events) + 1)))
+        self.assertEqual(events[-1].sequence, self.market.getLastEventSequence())
+        self.assertEqual(self.market.drainEvents(64), [])
+
+        added = [e.order_id for e in events if e.type == EventType.ORDER_ADDED]
+        self.assertEqual(added, ['sell', 'buy'])
+        trade = next(e for e in events if e.type == EventType.TRADE)
+        self.assertEqual((trade.price.value, trade.quantity, trade.order_id), (100, 2, 'buy'))
+        # The last update of a level carries its state after the match
+        ask = [e for e in events if e.type == EventType.LEVEL_UPDATE and e.side == Side.SELL][-1]
+        self.assertEqual((ask.quantity, ask.order_count), (3, 1))
+
+    def test_full_queue_drops_the_oldest_events(self):
+        market = Market(event_capacity=2)
+        market.createOrderBook('TESTUSD')
+        for i in range(3):
+            market.addOrder(Order('TESTUSD', Side.BUY, 1, Price(90 + i), f'buy{i}'))
+
+        last = market.getLastEventSequence()
+        self.assertEqual([e.sequence for e in market.drainEvents(64)], [last - 1, last])
+        self.assertEqual(market.getDroppedEventCount(), last - 2)
+
+    def test_no_events_without_capacity(self):
+        market = Market()
+        market.createOrderBook('TESTUSD')
+        market.addOrder(Order('TESTUSD', Side.BUY, 1, Price(90), 'buy'))
+        self.assertEqual(market.drainEvents(64), [])
+
+
+class MarketFeedTest(SimpleTestCase):
+    """Market data messages published to the channel layer."""
+
+    def setUp(self):
+        self.trading_pair = TradingPair(
+            symbol='TESTUSD', base_currency='TEST', quote_currency='USD',
+            min_quantity=Decimal('1'), tick_size=Decimal('1'), lot_size=Decimal('1')
+        )
+
+    def _feed(self, event_capacity=64):
+        self.market = Market(event_capacity=event_capacity)
+        self.market.createOrderBook('TESTUSD')
+        return MarketFeed(self.market, lambda symbol: self.trading_pair)
+
+    async def _subscribe(self, feed):
+        feed.attach(asyncio.get_running_loop(), 'TESTUSD')
+        layer = get_channel_layer()
+        channel = await layer.new_channel()
+        await layer.group_add(group_name('TESTUSD'), channel)
+        return lambda: asyncio.wait_for(layer.receive(channel), 5)
+
+    async def test_publish_sends_changed_levels_and_trades(self):
+        feed = self._feed()
+        # Events from before the first subscriber are covered by its snapshot
+        self.market.addOrder(Order('TESTUSD', Side.BUY, 1, Price(90), 'old'))
+        receive = await self._subscribe(feed)
+
+        self.market.addOrder(Order('TESTUSD', Side.SELL, 5, Price(100), 'sell'))
+        self.market.addOrder(Order('TESTUSD', Side.SELL, 2, Price(100), 'sell2'))
+        self.market.addOrder(Order('TESTUSD', Side.BUY, 3, Price(100), 'buy'))
+        self.market.matchOrders('TESTUSD')
+        feed.publish()
+
+        message = (await receive())['data']
+        self.assertEqual(message['type'], 'update')
+
+        def levels(side):
+            return [(Decimal(price), Decimal(quantity), count) for price, quantity, count, _ in message[side]]
+        # One entry per changed level at its latest state; the filled bid left an empty level
+        self.assertEqual(levels('bids'), [(100, 0, 0)])
+        self.assertEqual(levels('asks'), [(100, 4, 2)])
+        trades = [(Decimal(t['price']), Decimal(t['quantity']), t['side']) for t in message['trades']]
+        self.assertEqual(trades, [(100, 3, 'BUY')])
+
+    def test_snapshot_trades_carry_their_own_sequence(self):
+        feed = self._feed()
+        self.market.addOrder(Order('TESTUSD', Side.SELL, 5, Price(100), 'sell'))
+        self.market.addOrder(Order('TESTUSD', Side.BUY, 2, Price(100), 'buy'))
+        self.market.matchOrders('TESTUSD')
+        self.market.addOrder(Order('TESTUSD', Side.BUY, 1, Price(90), 'later'))
+        trade = next(e for e in self.market.drainEvents(64) if e.type == EventType.TRADE)
+
+        snapshot = feed.snapshot('TESTUSD')
+        self.assertEqual(snapshot['sequence'], self.market.getLastEventSequence())
+        self.assertEqual([t['sequence'] for t in snapshot['trades']], [trade.sequence])
+        self.assertLess(trade.sequence, snapshot['sequence'])
+
+    async def test_dropped_events_and_resync_send_snapshots(self):
+        feed = self._feed(event_capacity=2)
+        receive = await self._subscribe(feed)
+
+        for i in range(3):
+            self.market.addOrder(Order('TESTUSD', Side.BUY, 1, Price(90 + i), f'buy{i}'))
+        with self.assertLogs('exchange.feed', level='WARNING'):
+            feed.publish()
+        message = (await receive())['data']
+        self.assertEqual(message['type'], 'snapshot')
+        self.assertEqual([Decimal(level[0]) for level in message['bids']], [92, 91, 90])
+
+        feed.resync()
+        feed.publish()
+        self.assertEqual((await receive())['data']['type'], 'snapshot')
+
+
+class MarketDataConsumerTest(ExchangeTestCase):
+    """The WebSocket stream of one symbol's market data."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('trader')
+        self.manager = views.get_market_manager()
+
+    async def _connect(self, symbol='TESTUSD'):
+        communicator = WebsocketCommunicator(URLRouter(websocket_urlpatterns), f'/ws/market/{symbol}/')
+        connected, _ = await communicator.connect()
+        return communicator, connected
+
+    async def _place(self, side, quantity, price):
+        await database_sync_to_async(
+            lambda: self.manager.add_order(self.create_order(self.user, side, quantity, price))
+        )()
+
+    async def test_unknown_symbol_is_closed(self):
+        communicator, connected = await self._connect('NOPE')
+        self.assertFalse(connected)
+
+    async def test_snapshot_comes_first(self):
+        await self._place('BUY', 2, 99)
+        communicator, connected = await self._connect()
+        self.assertTrue(connected)
+
+        snapshot = await communicator.receive_json_from()
+        self.assertEqual(snapshot['type'], 'snapshot')
+        self.assertEqual([(Decimal(l[0]), Decimal(l[1]), l[2]) for l in snapshot['bids']], [(99, 2, 1)])
+        self.assertEqual(snapshot['asks'], [])
+        self.assertEqual(snapshot['sequence'], self.manager._market.getLastEventSequence())
+        await communicator.disconnect()
+
+    async def test_order_sends_level_update_and_trade(self):
+        communicator, _ = await self._connect()
+        snapshot = await communicator.receive_json_from()
+
+        await self._place('SELL', 3, 100)
+        update = await communicator.receive_json_from()
+        self.assertEqual(update['type'], 'update')
+        self.assertEqual([(Decimal(l[0]), Decimal(l[1]), l[2]) for l in update['asks']], [(100, 3, 1)])
+
+        await self._place('BUY', 1, 100)
+        update = await communicator.receive_json_from()
+        self.assertEqual([(Decimal(l[0]), Decimal(l[1])) for l in update['asks']], [(100, 2)])
+        self.assertEqual(len(update['trades']), 1)
+        trade = update['trades'][0]
+        self.assertEqual((Decimal(trade['price']), Decimal(trade['quantity']), trade['side']), (100, 1, 'BUY'))
+        self.assertGreater(trade['sequence'], snapshot['sequence'])
+        await communicator.disconnect()
+
+    async def test_updates_covered_by_the_snapshot_are_dropped(self):
+        communicator, _ = await self._connect()
+        sequence = (await communicator.receive_json_from())['sequence']
+
+        def update(level_sequence, trade_sequence):
+            return {'type': 'market.data', 'data': {
+                'type': 'update', 'symbol': 'TESTUSD', 'asks': [],
+                'bids': [['99', '1', 1, level_sequence]],
+                'trades': [{'price': '99', 'quantity': '1', 'side': 'SELL', 'timestamp': 0,
+                            'sequence': trade_sequence}]
+            }}
+
+        layer = get_channel_layer()
+        await layer.group_send(group_name('TESTUSD'), update(sequence, sequence))
+        self.assertTrue(await communicator.receive_nothing())
+
+        await layer.group_send(group_name('TESTUSD'), update(sequence + 1, sequence))
+        message = await communicator.receive_json_from()
+        self.assertEqual(message['bids'], [['99', '1', 1, sequence + 1]])
+        self.assertEqual(message['trades'], [])
+        await communicator.disconnect()
+
+
+class DepthCacheTest(ExchangeTestCase):
+    """Book depth is serialized once per book version."""
+
+    def setUp(self):
+        super().setUp()
+        self.seller = self.create_user('seller')
+        self.manager = MarketManager()
+
+    def test_unchanged_book_is_served_from_cache(self):
+        self.manager.add_order(self.create_order(self.seller, 'SELL', 2, 100))
+        data, body = self.manager.get_depth('TESTUSD', 10)
+        self.assertIs(self.manager.get_depth('TESTUSD', 10)[1], body)
+        self.assertEqual(json.loads(body)['asks'], [{'price': '100.00000000', 'quantity': '2.00000000', 'orders': 1}])
+
+        version = self.manager.market.getOrderBook('TESTUSD').getVersion()
+        self.manager.add_order(self.create_order(self.seller, 'SELL', 1, 101))
+        self.assertGreater(self.manager.market.getOrderBook('TESTUSD').getVersion(), version)
+        data, new_body = self.manager.get_depth('TESTUSD', 10)
+        self.assertIsNot(new_body, body)
+        self.assertEqual([level['price'] for level in data['asks']], [Decimal('100'), Decimal('101')])
+
+    def test_each_depth_is_cached_separately(self):
+        self.manager.add_order(self.create_order(self.seller, 'SELL', 1, 100))
+        self.manager.add_order(self.create_order(self.seller, 'SELL', 1, 101))
+        self.assertEqual(len(self.manager.get_depth('TESTUSD', 1)[0]['asks']), 1)
+        self.assertEqual(len(self.manager.get_depth('TESTUSD', 10)[0]['asks']), 2)
+
+        # Deeper views than the cache keeps are built on every read
+        deep = MAX_CACHED_DEPTH + 1
+        self.assertIsNot(self.manager.get_depth('TESTUSD', deep)[1], self.manager.get_depth('TESTUSD', deep)[1])
+
+    def test_orderbook_endpoint_returns_cached_body(self):
+        client = Client()
+        client.force_login(self.seller)
+        self.manager.add_order(self.create_order(self.seller, 'SELL', 2, 100))
+
+        response = client.get('/orderbook/TESTUSD/?depth=5')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.manager.get_depth('TESTUSD', 5)[1])
+        self.assertEqual(client.get('/orderbook/NOPE/').status_code, 404)
+
+
+class RollingStatsTest(SimpleTestCase):
+    """Rolling figures over a three-bucket window of one-minute buckets."""
+
+    def setUp(self):
+        self.stats = RollingStats(window=180, bucket_seconds=60)
+
+    def _add(self, seconds, price, quantity):
+        self.stats.add(seconds * NANOSECONDS, price, quantity)
+
+    def _figures(self):
+        return self.stats.volume, self.stats.high, self.stats.low, self.stats.last_price
+
+    def test_buckets_leave_the_window_whole(self):
+        self._add(0, 10, 1)
+        self._add(30, 12, 2)
+        self._add(70, 8, 1)
+        self._add(130, 11, 1)
+        self.assertEqual(self._figures(), (5, 12, 8, 11))
+
+        self.stats.expire(200 * NANOSECONDS)
+        self.assertEqual(self._figures(), (2, 11, 8, 11))
+        self.stats.expire(250 * NANOSECONDS)
+        self.assertEqual(self._figures(), (1, 11, 11, 11))
+        # The last price outlives the window
+        self.stats.expire(400 * NANOSECONDS)
+        self.assertEqual(self._figures(), (0, None, None, 11))
+
+    def test_extremes_within_a_bucket(self):
+        for price in (5, 9, 7):
+            self._add(10, price, 1)
+        self._add(70, 6, 1)
+        self.assertEqual((self.stats.high, self.stats.low), (9, 5))
+        self.stats.expire(200 * NANOSECONDS)
+        self.assertEqual((self.stats.high, self.stats.low), (6, 6))
+
+    def test_late_trade_joins_the_latest_bucket(self):
+        self._add(70, 10, 1)
+        self._add(10, 20, 1)
+        self.stats.expire(200 * NANOSECONDS)
+        self.assertEqual(self._figures(), (2, 20, 10, 20))
+
+
+class TickerTest(ExchangeTestCase):
+    """The market-wide /ticker/ endpoint."""
+
+    def test_quotes_and_trade_figures(self):
+        seller = self.create_user('seller')
+        buyer = self.create_user('buyer')
+        manager = MarketManager()
+        client = Client()
+        client.force_login(buyer)
+
+        [ticker] = client.get('/ticker/').json()['tickers']
+        self.assertEqual(ticker['symbol'], 'TESTUSD')
+        self.assertEqual([ticker[k] for k in ('bid', 'ask', 'last', 'high', 'low')], [None] * 5)
+        self.assertEqual(Decimal(ticker['volume']), 0)
+
+        manager.add_order(self.create_order(seller, 'SELL', 2, 100))
+        manager.add_order(self.create_order(seller, 'SELL', 3, 102))
+        manager.add_order(self.create_order(buyer, 'BUY', 4, 102))
+        manager.add_order(self.create_order(buyer, 'BUY', 1, 99))
+
+        [ticker] = manager.get_ticker()
+        self.assertEqual(ticker['bid'], Decimal('99'))
+        self.assertEqual(ticker['ask'], Decimal('102'))
+        self.assertEqual((ticker['last'], ticker['high'], ticker['low']), (Decimal('102'), Decimal('102'), Decimal('100')))
+        self.assertEqual(ticker['volume'], Decimal('4'))
+
+        # A restart reloads the trades still inside the window
+        self._stop_market_manager()
+        self._reset_market_manager()
+        self.assertEqual(MarketManager().get_ticker(), [ticker])
+
+
+class StubTrade:
+    """The parts of an engine Trade that aggregators read"""
+
+    def __init__(self, trading_pair, seconds, price, quantity):
+        self._timestamp = int(seconds * NANOSECONDS)
+        self._price = Price(trading_pair.price_to_ticks(Decimal(price)))
+        self._quantity = trading_pair.quantity_to_lots(Decimal(quantity))
+
+    def getTimestamp(self):
+        return self._timestamp
+
+    def getPrice(self):
+        return self._price
+
+    def getQuantity(self):
+        return self._quantity
+
+
+class CandleAggregatorTest(ExchangeTestCase):
+    """OHLCV bars built from settled trades."""
+
+    # 05:00 UTC, on every interval's boundary
+    START = 1_700_000_000 - 1_700_000_000 % 86400 + 5 * 3600
+
+    def setUp(self):
+        super().setUp()
+        self.candles = CandleAggregator(lambda symbol: self.trading_pair, flush_interval=60)
+        self.addCleanup(self.candles.stop)
+
+    def _record(self, *trades):
+        self.candles.record_trades('TESTUSD', [
+            StubTrade(self.trading_pair, self.START + offset, price, quantity)
+            for offset, price, quantity in trades
+        ])
+
+    def _bars(self, interval, **kwargs):
+        bars = self.candles.get('TESTUSD', interval, start=self.START, end=self.START + 86400, **kwargs)
+        return [[start - self.START, *values] for start, *values in bars]
+
+    def test_trades_build_bars_at_every_interval(self):
+        self._record((1, 100, 2), (1, 105, 1), (30, 95, 1), (61, 101, 3))
+
+        self.assertEqual(self._bars('1m'), [[0, 100, 105, 95, 95, 4], [60, 101, 101, 101, 101, 3]])
+        self.assertEqual(self._bars('1h'), [[0, 100, 105, 95, 101, 7]])
+        self.assertEqual([bar[0] for bar in self._bars('1s')], [1, 30, 61])
+        self.assertEqual(self._bars('1m', limit=1), [[60, 101, 101, 101, 101, 3]])
+        with self.assertRaises(ValueError):
+            self.candles.get('TESTUSD', '2m')
+
+    def test_flush_upserts_changed_bars(self):
+        self._record((1, 100, 2), (30, 95, 1))
+        self.candles.flush()
+        # Two one-second bars and one bar for each longer interval
+        self.assertEqual(Candle.objects.count(), 6)
+
+        self._record((40, 110, 1))
+        self.candles.flush()
+        self.assertEqual(Candle.objects.count(), 7)
+        bar = Candle.objects.get(interval='1m')
+        self.assertEqual((bar.open, bar.high, bar.low, bar.close, bar.volume), (100, 110, 95, 110, 4))
+        # Served from the database once flushed
+        self.assertEqual(self._bars('1m'), [[0, 100, 110, 95, 110, 4]])
+
+    def test_restart_resumes_the_bar_in_progress(self):
+        now = int(time.time())
+        self.candles.record_trades('TESTUSD', [StubTrade(self.trading_pair, now, 100, 1)])
+        self.candles.stop()
+
+        candles = CandleAggregator(lambda symbol: self.trading_pair)
+        self.addCleanup(candles.stop)
+        candles.load()
+        candles.record_trades('TESTUSD', [StubTrade(self.trading_pair, now, 90, 2)])
+        [bar] = candles.get('TESTUSD', '1d', start=now - now % 86400)
+        self.assertEqual(bar[1:], [100, 100, 90, 90, 3])
+
+    def test_candles_endpoint(self):
+        client = Client()
+        client.force_login(self.create_user('reader'))
+        MarketManager().candles.record_trades('TESTUSD', [StubTrade(self.trading_pair, self.START + 1, 100, 1)])
+
+        response = client.get(f'/candles/TESTUSD/?interval=5m&start={self.START}&end={self.START + 600}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([bar[0] for bar in response.json()['candles']], [self.START])
+        self.assertEqual(client.get('/candles/TESTUSD/?interval=2m').status_code, 400)
+        self.assertEqual(client.get('/candles/NOPE/').status_code, 404)
+
+
+class PositionsTest(ExchangeTestCase):
+    """Per-account positions and PnL from settled trades."""
+
+    def setUp(self):
+        super().setUp()
+        self.seller = self.create_user('seller')
+        self.buyer = self.create_user('buyer')
+        self.other = self.create_user('other')
+        self.manager = MarketManager()
+
+    def _trade(self, buyer, seller, quantity, price):
+        self.manager.add_order(self.create_order(seller, 'SELL', quantity, price))
+        self.manager.add_order(self.create_order(buyer, 'BUY', quantity, price))
+
+    def _positions(self, user):
+        client = Client()
+        client.force_login(user)
+        response = client.get('/positions/json/')
+        self.assertEqual(response.status_code, 200)
+        return [
+            {key: value if key == 'symbol' else Decimal(value) for key, value in position.items()}
+            for position in response.json()['positions']
+        ]
+
+    def test_positions_and_pnl_per_account(self):
+        self._trade(self.buyer, self.seller, 2, 100)
+        self._trade(self.buyer, self.seller, 1, 110)
+        # Marks every position at 120
+        self._trade(self.other, self.buyer, 1, 120)
+
+        self.assertEqual(self._positions(self.buyer), [{
+            'symbol': 'TESTUSD', 'quantity': 2, 'average_price': Decimal('103.33'), 'last_price': 120,
+            'realized_pnl': Decimal('16.66666667'), 'unrealized_pnl': Decimal('33.33333333')
+        }])
+        [short] = self._positions(self.seller)
+        self.assertEqual((short['quantity'], short['realized_pnl']), (-3, 0))
+        self.assertEqual(short['unrealized_pnl'], Decimal('-50'))
+        self.assertEqual(self._positions(self.create_user('idle')), [])
+
+    def test_restart_replays_trades_into_positions(self):
+        self._trade(self.buyer, self.seller, 2, 100)
+        self._trade(self.other, self.buyer, 1, 120)
+        positions = self._positions(self.buyer)
+
+        self._stop_market_manager()
+        self._reset_market_manager()
+        self.manager = MarketManager()
+        self.assertEqual(self._positions(self.buyer), positions)
+
+
+class CursorTest(SimpleTestCase):
+    """Opaque (timestamp, id) keyset cursors."""
+
+    def test_round_trip(self):
+        timestamp = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+        cursor = views.encode_cursor(timestamp, 42)
+        self.assertNotIn('|', cursor)
+        self.assertEqual(views.decode_cursor(cursor), (timestamp, 42))
+
+    def test_malformed_cursor(self):
+        for cursor in ('', 'not base64!', views.encode_cursor(datetime.now(timezone.utc), 1)[:-4], 'eHx5'):
+            with self.assertRaisesMessage(ValueError, 'Invalid cursor'):
+                views.decode_cursor(cursor)
+
+
+class OrderPageTest(ExchangeTestCase):
+    """Keyset pages of a user's order history."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('trader')
+        self.other_pair = TradingPair.objects.create(
+            symbol='OTHERUSD', base_currency='OTHER', quote_currency='USD',
+            min_quantity='1', tick_size='0.01', lot_size='0.00000001'
+        )
+        self.orders = [self.create_order(self.user, 'BUY', 1, 100 + i) for i in range(5)]
+        self.orders[1].status = 'CANCELLED'
+        self.orders[1].save()
+        OrderModel.objects.create(
+            user=self.user, trading_pair=self.other_pair, side='SELL', quantity=1, price=100, status='NEW'
+        )
+        self.create_order(self.create_user('someone'), 'BUY', 1, 100)
+
+    def _all_pages(self, **kwargs):
+        pages = []
+        cursor = None
+        while True:
+            rows, cursor = views.order_page(self.user, cursor=cursor, limit=2, **kwargs)
+            pages.append([row['price'] for row in rows])
+            if cursor is None:
+                return pages
+
+    def test_pages_are_newest_first_without_gaps(self):
+        # Orders created in the same instant are ordered by id
+        OrderModel.objects.filter(pk__in=[o.pk for o in self.orders[1:4]]).update(
+            created_at=self.orders[1].created_at
+        )
+        self.assertEqual(self._all_pages(symbol='TESTUSD'), [[104, 103], [102, 101], [100]])
+
+        rows, _ = views.order_page(self.user, limit=10)
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]['symbol'], 'OTHERUSD')
+        self.assertEqual(set(rows[0]), {'order_id', 'symbol', 'side', 'quantity', 'price', 'status', 'created_at'})
+
+    def test_filters(self):
+        self.assertEqual(self._all_pages(status='CANCELLED'), [[101]])
+        self.assertEqual(self._all_pages(status='NEW', symbol='OTHERUSD'), [[100]])
+        with self.assertRaises(TradingPair.DoesNotExist):
+            views.order_page(self.user, symbol='NOPE')
+
+    def test_orders_endpoint(self):
+        client = Client()
+        client.force_login(self.user)
+        first = client.get('/orders/?limit=4&symbol=TESTUSD').json()
+        second = client.get(f'/orders/?limit=4&symbol=TESTUSD&cursor={first["next_cursor"]}').json()
+        self.assertEqual(len(first['orders']), 4)
+        self.assertEqual([o['order_id'] for o in second['orders']], [str(self.orders[0].order_id)])
+        self.assertIsNone(second['next_cursor'])
+
+        self.assertEqual(client.get('/orders/?cursor=bad').status_code, 400)
+        self.assertEqual(client.get('/orders/?status=OPEN').status_code, 400)
+        self.assertEqual(client.get('/orders/?limit=0').status_code, 400)
+
+
+class TradeTapeTest(ExchangeTestCase):
+    """Trade tape pages from the in-memory tail and from the database."""
+
+    def setUp(self):
+        super().setUp()
+        user = self.create_user('trader')
+        buy = self.create_order(user, 'BUY', 5, 100)
+        sell = self.create_order(user, 'SELL', 5, 100)
+        self.trades = [
+            TradeModel.objects.create(
+                buy_order=buy, sell_order=sell, trading_pair=self.trading_pair, quantity=1, price=100 + i
+            )
+            for i in range(5)
+        ]
+        # The middle three trades settled in the same instant; id breaks the tie
+        TradeModel.objects.filter(pk__in=[t.pk for t in self.trades[1:4]]).update(
+            timestamp=self.trades[1].timestamp
+        )
+        for trade in self.trades:
+            trade.refresh_from_db()
+        self.tape = TradeTape(lambda symbol: self.trading_pair, cache_size=3)
+
+    def ids(self, rows):
+        """Positions in self.trades of the trades in a page"""
+        positions = {trade.pk: i for i, trade in enumerate(self.trades)}
+        return [positions[row['id']] for row in rows]
+
+    def cursor(self, index):
+        trade = self.trades[index]
+        return trade.timestamp, trade.pk
+
+    def test_latest_trades(self):
+        with CaptureQueriesContext(connections['reader']) as queries:
+            self.assertEqual(self.ids(self.tape.page('TESTUSD', limit=3)), [4, 3, 2])
+        self.assertEqual(len(queries), 1)
+        # The tail holds three trades, so a longer page goes to the database
+        self.assertEqual(self.ids(self.tape.page('TESTUSD', limit=10)), [4, 3, 2, 1, 0])
+
+    def test_before(self):
+        self.assertEqual(self.ids(self.tape.page('TESTUSD', before=self.cursor(3), limit=2)), [2, 1])
+        self.assertEqual(self.ids(self.tape.page('TESTUSD', before=self.cursor(1), limit=2)), [0])
+        self.assertEqual(self.tape.page('TESTUSD', before=self.cursor(0)), [])
+
+    def test_since(self):
+        self.tape.page('TESTUSD')
+        # Served from the tail, which starts at trade 2
+        with CaptureQueriesContext(connections['reader']) as queries:
+            self.assertEqual(self.ids(self.tape.page('TESTUSD', since=self.cursor(2))), [3, 4])
+        self.assertEqual(len(queries), 0)
+        # Older than the tail
+        self.assertEqual(self.ids(self.tape.page('TESTUSD', since=self.cursor(0), limit=3)), [1, 2, 3])
+        self.assertEqual(self.tape.page('TESTUSD', since=self.cursor(4)), [])
+
+    def test_record_appends_to_tail(self):
+        self.tape.page('TESTUSD')
+        trade = TradeModel.objects.create(
+            buy_order=self.trades[0].buy_order, sell_order=self.trades[0].sell_order,
+            trading_pair=self.trading_pair, quantity=1, price=105
+        )
+        self.trades.append(trade)
+        self.tape.record('TESTUSD', [trade])
+        # A repeated record is ignored
+        self.tape.record('TESTUSD', [trade])
+        with CaptureQueriesContext(connections['reader']) as queries:
+            self.assertEqual(self.ids(self.tape.page('TESTUSD', limit=3)), [5, 4, 3])
+            self.assertEqual(self.ids(self.tape.page('TESTUSD', since=self.cursor(3))), [4, 5])
+        self.assertEqual(len(queries), 0)
+
+    def test_trades_endpoint(self):
+        client = Client()
+        client.force_login(User.objects.get(username='trader'))
+        first = client.get('/trades/TESTUSD/?limit=2').json()
+        self.assertEqual(self.ids(first['trades']), [4, 3])
+        older = client.get(f'/trades/TESTUSD/?limit=2&before={first["before"]}').json()
+        self.assertEqual(self.ids(older['trades']), [2, 1])
+        newer = client.get(f'/trades/TESTUSD/?since={older["since"]}').json()
+        self.assertEqual(self.ids(newer['trades']), [3, 4])
+        # Nothing newer yet; the cursor is handed back for the next poll
+        latest = client.get(f'/trades/TESTUSD/?since={first["since"]}').json()
+        self.assertEqual(latest['trades'], [])
+        self.assertEqual(latest['since'], first['since'])
+
+        self.assertEqual(
+            client.get(f'/trades/TESTUSD/?before={first["before"]}&since={first["since"]}').status_code, 400
+        )
+        self.assertEqual(client.get('/trades/TESTUSD/?before=bad').status_code, 400)
+        self.assertEqual(client.get('/trades/NOPE/').status_code, 404)
+
+
+class TradingPairUnitsTest(SimpleTestCase):
+    """Exact conversion between decimal amounts and engine ticks and lots."""
+
+    def setUp(self):
+        self.trading_pair = TradingPair(symbol='TESTUSD', tick_size=Decimal('0.01'), lot_size=Decimal('0.001'))
+
+    def test_round_trip(self):
+        self.assertEqual(self.trading_pair.price_to_ticks(Decimal('100.25')), 10025)
+        self.assertEqual(self.trading_pair.price_to_ticks('0.01'), 1)
+        self.assertEqual(self.trading_pair.price_to_ticks(3), 300)
+        self.assertEqual(self.trading_pair.quantity_to_lots(Decimal('1.5')), 1500)
+        self.assertEqual(self.trading_pair.quantity_to_lots('0.001'), 1)
+        self.assertEqual(self.trading_pair.ticks_to_price(10025), Decimal('100.25'))
+        self.assertEqual(self.trading_pair.lots_to_quantity(1500), Decimal('1.5'))
+        self.assertEqual(self.trading_pair.tick_lots_to_amount(10025 * 1500), Decimal('150.375'))
+
+    def test_rejects_amounts_between_units(self):
+        for price in ('100.251', '0.005', '100.0000000001'):
+            with self.assertRaisesMessage(ValueError, 'is not a multiple of 0.01'):
+                self.trading_pair.price_to_ticks(price)
+        # Digits past the database's eight decimal places are not rounded away
+        for quantity in ('1.0001', '1.000000001'):
+            with self.assertRaisesMessage(ValueError, 'is not a multiple of 0.001'):
+                self.trading_pair.quantity_to_lots(quantity)
+
+    def test_rejects_non_numbers(self):
+        for value in ('Infinity', 'NaN'):
+            with self.assertRaises(ValueError):
+                self.trading_pair.price_to_ticks(value)
+        with self.assertRaises(ArithmeticError):
+            self.trading_pair.quantity_to_lots('abc')
+
+
+class PlaceOrderValidationTest(ExchangeTestCase):
+    """Malformed order requests are rejected before anything is saved."""
+
+    def test_invalid_orders(self):
+        client = Client()
+        client.force_login(self.create_user('trader'))
+        valid = {'symbol': 'TESTUSD', 'side': 'BUY', 'quantity': '1', 'price': '100'}
+        for change in ({'price': 'abc'}, {'quantity': 'abc'}, {'quantity': '1.000000001'}, {'price': '100.001'}):
+            response = client.post('/place-order/', json.dumps({**valid, **change}), content_type='application/json')
+            self.assertEqual(response.status_code, 400, change)
+            self.assertIn('Invalid order parameters', response.json()['error'])
+        for field in valid:
+            data = {key: value for key, value in valid.items() if key != field}
+            response = client.post('/place-order/', json.dumps(data), content_type='application/json')
+            self.assertEqual(response.status_code, 400, field)
+        self.assertFalse(OrderModel.objects.exists())
+
+        response = client.post('/place-order/', json.dumps(valid), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
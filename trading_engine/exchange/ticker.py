@@ -0,0 +1,164 @@
+from collections import deque
+from datetime import datetime, timezone
+from threading import Lock
+import logging
+import time
+from .models import TradeModel
+
+logger = logging.getLogger(__name__)
+
+# Length of the rolling ticker window, in seconds
+TICKER_WINDOW = 24 * 60 * 60
+
+# Width of the time buckets trades are grouped into, in seconds
+BUCKET_SECONDS = 60
+
+NANOSECONDS = 1_000_000_000
+
+
+class RollingStats:
+    """Last price and rolling volume, high and low of one symbol's trades.
+
+    Trades are grouped into fixed-width time buckets and the oldest buckets
+    fall out as the window moves, so the window is exact to one bucket.
+    Volume is a running sum over the buckets. High and low are kept in
+    monotonic queues with at most one price per bucket, so every figure is
+    read in constant time and each trade costs amortized constant time.
+    Prices are in ticks and quantities in lots.
+    """
+
+    def __init__(self, window=TICKER_WINDOW, bucket_seconds=BUCKET_SECONDS):
+        self._bucket_ns = bucket_seconds * NANOSECONDS
+        self._buckets_per_window = window // bucket_seconds
+        self._volumes = deque()  # [bucket, lots], oldest first
+        self._highs = deque()  # (bucket, ticks), prices falling
+        self._lows = deque()  # (bucket, ticks), prices rising
+        self.volume = 0
+        self.last_price = None
+
+    def add(self, timestamp, price, quantity):
+        """Record one trade; timestamp is in nanoseconds since the epoch"""
+        bucket = timestamp // self._bucket_ns
+        if self._volumes and self._volumes[-1][0] >= bucket:
+            # Trades can be recorded slightly out of order; keep the buckets sorted
+            self._volumes[-1][1] += quantity
+            bucket = self._volumes[-1][0]
+        else:
+            self._volumes.append([bucket, quantity])
+        self.volume += quantity
+        self.last_price = price
+        self._push(self._highs, bucket, price, lambda kept: kept <= price)
+        self._push(self._lows, bucket, price, lambda kept: kept >= price)
+
+    @staticmethod
+    def _push(extremes, bucket, price, dominated):
+        while extremes and dominated(extremes[-1][1]):
+            extremes.pop()
+        # A surviving entry from the same bucket is the better extreme
+        if not extremes or extremes[-1][0] != bucket:
+            extremes.append((bucket, price))
+
+    def expire(self, now):
+        """Drop the buckets that have left the window ending at `now` (nanoseconds)"""
+        oldest = now // self._bucket_ns - self._buckets_per_window
+        while self._volumes and self._volumes[0][0] <= oldest:
+            self.volume -= self._volumes.popleft()[1]
+        for extremes in (self._highs, self._lows):
+            while extremes and extremes[0][0] <= oldest:
+                extremes.popleft()
+
+    @property
+    def high(self):
+        return self._highs[0][1] if self._highs else None
+
+    @property
+    def low(self):
+        return self._lows[0][1] if self._lows else None
+
+
+class Ticker:
+    """Best bid and ask plus rolling 24h trade figures for every symbol.
+
+    Trade figures are updated as trades are settled. Best prices are read
+    from a book only when its version shows it has changed since the last
+    read.
+    """
+
+    def __init__(self, market, trading_pairs):
+        """
+        Args:
+            market (Market): The engine whose books are quoted
+            trading_pairs (callable): Returns the TradingPair for a symbol
+        """
+        self._market = market
+        self._trading_pairs = trading_pairs
+        self._lock = Lock()
+        self._stats = {}
+        # symbol -> (book version, best bid, best ask)
+        self._quotes = {}
+
+    def load(self):
+        """Seed the rolling figures with the trades still inside the window"""
+        start = time.perf_counter()
+        since = time.time_ns() - TICKER_WINDOW * NANOSECONDS
+        recent = (
+            TradeModel.objects.filter(timestamp__gte=datetime.fromtimestamp(since / NANOSECONDS, timezone.utc))
+            .order_by('timestamp', 'id')
+            .values_list('trading_pair__symbol', 'timestamp', 'price', 'quantity')
+            .iterator()
+        )
+        count = 0
+        with self._lock:
+            for symbol, timestamp, price, quantity in recent:
+                trading_pair = self._trading_pairs(symbol)
+                self._stats_for(symbol).add(
+                    int(timestamp.timestamp() * NANOSECONDS),
+                    trading_pair.price_to_ticks(price),
+                    trading_pair.quantity_to_lots(quantity)
+                )
+                count += 1
+        if count:
+            logger.info(f"Loaded {count} trades into the ticker in {time.perf_counter() - start:.3f}s")
+
+    def _stats_for(self, symbol):
+        """Callers must hold self._lock"""
+        stats = self._stats.get(symbol)
+        if stats is None:
+            stats = self._stats[symbol] = RollingStats()
+        return stats
+
+    def record_trades(self, symbol, trades):
+        """Add settled engine trades to a symbol's figures"""
+        with self._lock:
+            stats = self._stats_for(symbol)
+            for trade in trades:
+                stats.add(trade.getTimestamp(), trade.getPrice().value, trade.getQuantity())
+
+    def get(self, symbol):
+        """Returns the symbol's ticker as a JSON-ready dict"""
+        trading_pair = self._trading_pairs(symbol)
+        orderbook = self._market.getOrderBook(symbol)
+        with self._lock:
+            # Take the version before the prices, so a change in between is
+            # picked up by the next read
+            version = orderbook.getVersion()
+            quote = self._quotes.get(symbol)
+            if quote is None or quote[0] != version:
+                quote = self._quotes[symbol] = (version, orderbook.getBestBid(), orderbook.getBestAsk())
+            _, bid, ask = quote
+
+            stats = self._stats_for(symbol)
+            stats.expire(time.time_ns())
+
+            def price(ticks):
+                return None if ticks is None else trading_pair.ticks_to_price(ticks)
+
+            return {
+                'symbol': symbol,
+                'bid': price(bid.price.value if bid else None),
+                'ask': price(ask.price.value if ask else None),
+                'last': price(stats.last_price),
+                'high': price(stats.high),
+                'low': price(stats.low),
+                'volume': trading_pair.lots_to_quantity(stats.volume)
+            }
@@ -3,72 +3,96 @@ TRADING_PAIRS = [
         'symbol': 'AAPLUSD',
         'base_currency': 'AAPL',
         'quote_currency': 'USD',
-        'min_quantity': '1.0'
+        'min_quantity': '1.0',
+        'tick_size': '0.01',
+        'lot_size': '0.00000001'
     },
     {
         'symbol': 'MSFTSUSD',
         'base_currency': 'MSFT',
         'quote_currency': 'USD',
-        'min_quantity': '1.0'
+        'min_quantity': '1.0',
+        'tick_size': '0.01',
+        'lot_size': '0.00000001'
     },
     {
         'symbol': 'GOOGLUSD',
         'base_currency': 'GOOGL',
         'quote_currency': 'USD',
-        'min_quantity': '1.0'
+        'min_quantity': '1.0',
+        'tick_size': '0.01',
+        'lot_size': '0.00000001'
     },
     {
         'symbol': 'AMZNUSD',
         'base_currency': 'AMZN',
         'quote_currency': 'USD',
-        'min_quantity': '1.0'
+        'min_quantity': '1.0',
+        'tick_size': '0.01',
+        'lot_size': '0.00000001'
     },
     {
         'symbol': 'NVDAUSD',
         'base_currency': 'NVDA',
         'quote_currency': 'USD',
-        'min_quantity': '1.0'
+        'min_quantity': '1.0',
+        'tick_size': '0.01',
+        'lot_size': '0.00000001'
     },
     {
         'symbol': 'METAUSD',
         'base_currency': 'META',
         'quote_currency': 'USD',
-        'min_quantity': '1.0'
+        'min_quantity': '1.0',
+        'tick_size': '0.01',
+        'lot_size': '0.00000001'
     },
     {
         'symbol': 'TSLAUSD',
         'base_currency': 'TSLA',
         'quote_currency': 'USD',
-        'min_quantity': '1.0'
+        'min_quantity': '1.0',
+        'tick_size': '0.01',
+        'lot_size': '0.00000001'
     },
     {
         'symbol': 'JPMUSD',
         'base_currency': 'JPM',
         'quote_currency': 'USD',
-        'min_quantity': '1.0'
+        'min_quantity': '1.0',
+        'tick_size': '0.01',
+        'lot_size': '0.00000001'
     },
     {
         'symbol': 'VISUSD',
         'base_currency': 'VIS',
         'quote_currency': 'USD',
-        'min_quantity': '1.0'
+        'min_quantity': '1.0',
+        'tick_size': '0.01',
+        'lot_size': '0.00000001'
     },
     {
         'symbol': 'KOUSD',
         'base_currency': 'KO',
         'quote_currency': 'USD',
-        'min_quantity': '1.0'
+        'min_quantity': '1.0',
+        'tick_size': '0.01',
+        'lot_size': '0.00000001'
     },
     {
         'symbol': 'WMTUSD',
         'base_currency': 'WMT',
         'quote_currency': 'USD',
-        'min_quantity': '1.0'
+        'min_quantity': '1.0',
+        'tick_size': '0.01',
+        'lot_size': '0.00000001'
     },
     {
         'symbol': 'DISUSD',
         'base_currency': 'DIS',
         'quote_currency': 'USD',
-        'min_quantity': '1.0'
+        'min_quantity': '1.0',
+        'tick_size': '0.01',
+        'lot_size': '0.00000001'
     }
 ]
\ No newline at end of file
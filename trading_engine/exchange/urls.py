@@ -4,8 +4,15 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),
     path('orderbook/', views.orderbook_view, name='orderbook'),
+    path('orderbook/<str:symbol>/', views.get_orderbook, name='get_orderbook'),
+    path('orders/', views.orders, name='orders'),
+    path('trades/<str:symbol>/', views.trades, name='trades'),
+    path('ticker/', views.ticker, name='ticker'),
+    path('candles/<str:symbol>/', views.candles, name='candles'),
     path('positions/', views.positions_view, name='positions'),
+    path('positions/json/', views.get_positions, name='get_positions'),
     path('place-order/', views.place_order, name='place_order'),
+    path('place-orders/', views.place_orders, name='place_orders'),
     path('cancel-order/<uuid:order_id>/', views.cancel_order, name='cancel_order'),
     path('login/', views.login_view, name='login'),
     path('register/', views.register_view, name='register'),
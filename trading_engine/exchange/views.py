@@ -1,11 +1,17 @@
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
+from django.db.models import Q
 from decimal import Decimal
+from datetime import datetime
+import base64
 from .models import OrderModel, TradingPair, Balance
 from .market_manager import MarketManager
+from .candles import MAX_CANDLES
+from asgiref.sync import sync_to_async
+import asyncio
 import json
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.forms import UserCreationForm
@@ -18,127 +24,229 @@ from django.db import transaction
 
 logger = logging.getLogger(__name__)
 
+# Number of price levels per side returned by the orderbook endpoints
+DEFAULT_BOOK_DEPTH = 10
+
+# Largest batch accepted by the bulk order endpoint
+MAX_BATCH_ORDERS = 500
+
+# Orders per page of order history, by default and at most
+ORDERS_PAGE_SIZE = 50
+MAX_ORDERS_PAGE_SIZE = 500
+
+# Trades per page of a trade tape, by default and at most
+TRADES_PAGE_SIZE = 50
+MAX_TRADES_PAGE_SIZE = 500
+
 # Initialize market manager with proper locking
 _market_manager_lock = Lock()
 def get_market_manager():
-    global market_manager
     if not hasattr(get_market_manager, 'market_manager'):
         with _market_manager_lock:
             if not hasattr(get_market_manager, 'market_manager'):
                 get_market_manager.market_manager = MarketManager()
     return get_market_manager.market_manager
 
+def serialize_trades(trades, trading_pair):
+    """Convert engine trades to JSON-ready dicts"""
+    return [{
+        'price': trading_pair.ticks_to_price(t.getPrice().value),
+        'quantity': trading_pair.lots_to_quantity(t.getQuantity()),
+        'timestamp': t.getTimestamp()
+    } for t in trades]
+
+def encode_cursor(timestamp, pk):
+    """Opaque keyset cursor for a row ordered by (timestamp, id)"""
+    return base64.urlsafe_b64encode(f'{timestamp.isoformat()}|{pk}'.encode()).decode()
+
+def decode_cursor(cursor):
+    """Returns the (timestamp, id) a keyset cursor points at.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        timestamp, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(timestamp), int(pk)
+    except (ValueError, UnicodeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+def order_page(user, cursor=None, status=None, symbol=None, limit=ORDERS_PAGE_SIZE):
+    """One page of a user's orders, newest first, by keyset pagination.
+
+    Each page is an index range scan on (user, created_at, id) that starts
+    after the cursor, so its cost does not grow with the number of older
+    orders.
+
+    Returns:
+        tuple: (list of order dicts, cursor for the next page or None)
+
+    Raises:
+        ValueError: If the cursor is malformed
+        TradingPair.DoesNotExist: If symbol is not a listed trading pair
+    """
+    symbols = dict(TradingPair.objects.values_list('id', 'symbol'))
+    orders = OrderModel.objects.filter(user=user)
+    if status:
+        orders = orders.filter(status=status)
+    if symbol:
+        orders = orders.filter(trading_pair_id=get_market_manager().get_trading_pair(symbol).id)
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        orders = orders.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    rows = list(
+        orders.order_by('-created_at', '-id')
+        .values('id', 'order_id', 'trading_pair_id', 'side', 'quantity', 'price', 'status', 'created_at')
+        [:limit + 1]
+    )
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['id'])
+    for row in rows:
+        row['symbol'] = symbols[row.pop('trading_pair_id')]
+        del row['id']
+    return rows, next_cursor
+
+def create_order(user, data):
+    """Validate an order request and save it as a NEW order.
+
+    Returns:
+        tuple: The saved OrderModel and its TradingPair
+
+    Raises:
+        TradingPair.DoesNotExist: If the symbol is not a listed trading pair
+        ValueError: If a field is missing or the order does not fit the
+            pair's tick and lot sizes
+    """
+    market_manager = get_market_manager()
+
+    # Create temporary order for validation against tick and lot sizes
+    try:
+        trading_pair = market_manager.get_trading_pair(data['symbol'])
+        Order(
+            data['symbol'],
+            Side.BUY if data['side'] == 'BUY' else Side.SELL,
+            trading_pair.quantity_to_lots(data['quantity']),
+            Price(trading_pair.price_to_ticks(data['price']))
+        )
+    except (KeyError, TypeError, ValueError, ArithmeticError, RuntimeError) as e:
+        raise ValueError(f'Invalid order parameters: {str(e)}')
+
+    order = OrderModel.objects.create(
+        user=user,
+        trading_pair=trading_pair,
+        side=data['side'],
+        quantity=data['quantity'],
+        price=data['price'],
+        status=OrderStatus.NEW.name
+    )
+    return order, trading_pair
+
 @login_required
 @csrf_exempt
-def place_order(request):
+async def place_order(request):
+    """Save an order, then wait for the matching thread to process it.
+
+    The request never holds an engine lock; only the database writes run in
+    a worker thread.
+    """
     try:
-        with transaction.atomic():
-            data = json.loads(request.body)
-            market_manager = get_market_manager()
-            
-            # Validate trading pair first
-            try:
-                trading_pair = TradingPair.objects.get(symbol=data['symbol'])
-                # Ensure orderbook exists
-                market_manager._ensure_orderbook_exists(trading_pair.symbol)
-            except TradingPair.DoesNotExist:
-                return JsonResponse({'error': 'Invalid trading pair'}, status=400)
-            
-            # Create price object for validation
-            price = Price()
-            price.value = float(data['price'])
-            
-            # Create temporary order for validation
+        data = json.loads(request.body)
+        user = await request.auser()
+        market_manager = await sync_to_async(get_market_manager)()
+        try:
+            order, trading_pair = await sync_to_async(create_order)(user, data)
+        except TradingPair.DoesNotExist:
+            return JsonResponse({'error': 'Invalid trading pair'}, status=400)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        try:
+            trades = await asyncio.wrap_future(market_manager.submit_order(order))
+        except (RuntimeError, ValueError) as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        return JsonResponse({
+            'order_id': str(order.order_id),
+            'status': 'success',
+            'trades': serialize_trades(trades, trading_pair) if trades else []
+        })
+
+    except Exception as e:
+        logger.error(f"Order placement failed: {str(e)}", exc_info=True)
+        return JsonResponse({'error': 'Internal server error'}, status=500)
+
+@login_required
+@csrf_exempt
+@require_http_methods(["POST"])
+def place_orders(request):
+    """Place a JSON array of orders in one request and one engine call.
+
+    The batch is saved and matched on the matching thread, all or nothing.
+    """
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, list) or not data:
+            return JsonResponse({'error': 'Expected a non-empty list of orders'}, status=400)
+        if len(data) > MAX_BATCH_ORDERS:
+            return JsonResponse({'error': f'At most {MAX_BATCH_ORDERS} orders per batch'}, status=400)
+
+        market_manager = get_market_manager()
+        trading_pairs = {
+            pair.symbol: pair
+            for pair in TradingPair.objects.filter(symbol__in={o.get('symbol') for o in data})
+        }
+
+        # Validate every order against its pair before writing anything
+        orders = []
+        for index, order_data in enumerate(data):
+            trading_pair = trading_pairs.get(order_data.get('symbol'))
+            if trading_pair is None:
+                return JsonResponse({'error': f'Order {index}: Invalid trading pair'}, status=400)
+            if order_data.get('side') not in ('BUY', 'SELL'):
+                return JsonResponse({'error': f'Order {index}: Invalid side'}, status=400)
             try:
-                temp_order = Order(
-                    data['symbol'],
-                    Side.BUY if data['side'] == 'BUY' else Side.SELL,
-                    float(data['quantity']),
-                    price
-                )
-            except RuntimeError as e:
-                return JsonResponse({'error': f'Invalid order parameters: {str(e)}'}, status=400)
-            
-            # Create database order
-            order = OrderModel.objects.create(
+                quantity = Decimal(str(order_data['quantity']))
+                price = Decimal(str(order_data['price']))
+                trading_pair.quantity_to_lots(quantity)
+                trading_pair.price_to_ticks(price)
+            except (KeyError, ValueError, ArithmeticError) as e:
+                return JsonResponse({'error': f'Order {index}: Invalid order parameters: {str(e)}'}, status=400)
+
+            orders.append(OrderModel(
                 user=request.user,
                 trading_pair=trading_pair,
-                side=data['side'],
-                quantity=data['quantity'],
-                price=data['price'],
+                side=order_data['side'],
+                quantity=quantity,
+                price=price,
                 status=OrderStatus.NEW.name
-            )
-            
-            try:
-                trades = market_manager.add_order(order)
-                return JsonResponse({
-                    'order_id': str(order.order_id),
-                    'status': 'success',
-                    'trades': [{
-                        'price': t.getPrice().value,
-                        'quantity': t.getQuantity(),
-                        'timestamp': t.getTimestamp()
-                    } for t in trades] if trades else []
-                })
-            except RuntimeError as e:
-                return JsonResponse({'error': str(e)}, status=400)
-                
+            ))
+
+        try:
+            trades_per_order = market_manager.add_orders(orders)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        return JsonResponse({
+            'status': 'success',
+            'orders': [{
+                'order_id': str(order.order_id),
+                'trades': serialize_trades(trades, order.trading_pair)
+            } for order, trades in zip(orders, trades_per_order)]
+        })
+
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
     except Exception as e:
-        logger.error(f"Order placement failed: {str(e)}", exc_info=True)
+        logger.error(f"Batch order placement failed: {str(e)}", exc_info=True)
         return JsonResponse({'error': 'Internal server error'}, status=500)
 
-def update_balances_for_trade(trade, trading_pair):
-    """Helper function to update balances after a trade"""
-    quantity = Decimal(str(trade.getQuantity()))
-    price = Decimal(str(trade.getPrice().value))
-    total = quantity * price
-    
-    # Get orders
-    buy_order = OrderModel.objects.get(order_id=trade.getBuyOrderId())
-    sell_order = OrderModel.objects.get(order_id=trade.getSellOrderId())
-    
-    # Update buyer balances
-    buyer_quote_balance = Balance.objects.get(
-        user=buy_order.user,
-        currency=trading_pair.quote_currency
-    )
-    buyer_base_balance = Balance.objects.get_or_create(
-        user=buy_order.user,
-        currency=trading_pair.base_currency
-    )[0]
-    
-    # Update seller balances
-    seller_quote_balance = Balance.objects.get_or_create(
-        user=sell_order.user,
-        currency=trading_pair.quote_currency
-    )[0]
-    seller_base_balance = Balance.objects.get(
-        user=sell_order.user,
-        currency=trading_pair.base_currency
-    )
-    
-    # Execute the transfer
-    buyer_quote_balance.amount -= total
-    buyer_base_balance.amount += quantity
-    seller_quote_balance.amount += total
-    seller_base_balance.amount -= quantity
-    
-    buyer_quote_balance.save()
-    buyer_base_balance.save()
-    seller_quote_balance.save()
-    seller_base_balance.save()
-    
 @login_required
 def get_positions(request):
     try:
-        positions = market_manager.market.getAllPositions()
-        return JsonResponse({
-            'positions': [{
-                'symbol': pos.getSymbol(),
-                'quantity': pos.getQuantity(),
-                'average_price': pos.getAveragePrice().value
-            } for pos in positions]
-        })
+        return JsonResponse({'positions': get_market_manager().get_positions(request.user)})
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=400)
     
@@ -146,76 +254,121 @@ def get_positions(request):
 def get_orderbook(request, symbol):
     try:
         market_manager = get_market_manager()
-        market_manager._ensure_orderbook_exists(symbol)
-        
-        with market_manager._operation_lock:
-            orderbook = market_manager.market.getOrderBook(symbol)
-            # Create copies of C++ objects immediately
-            orders = list(orderbook.getOrders())
-            
-            bids = []
-            asks = []
-            for order in orders:
-                order_data = {
-                    'price': order.getPrice().value,
-                    'quantity': order.getQuantity(),
-                    'id': order.getId()
-                }
-                if order.getSide() == Side.BUY:
-                    bids.append(order_data)
-                else:
-                    asks.append(order_data)
-                    
-            return JsonResponse({
-                'symbol': symbol,
-                'bids': sorted(bids, key=lambda x: x['price'], reverse=True),
-                'asks': sorted(asks, key=lambda x: x['price'])
-            })
+        depth = int(request.GET.get('depth', DEFAULT_BOOK_DEPTH))
+        _, body = market_manager.get_depth(symbol, depth)
+        return HttpResponse(body, content_type='application/json')
+    except TradingPair.DoesNotExist:
+        return JsonResponse({'error': 'Invalid trading pair'}, status=404)
     except RuntimeError as e:
         return JsonResponse({'error': str(e)}, status=404)
     except Exception as e:
         logger.error(f"Orderbook retrieval failed: {str(e)}", exc_info=True)
         return JsonResponse({'error': 'Internal server error'}, status=500)
     
+@login_required
+def orders(request):
+    try:
+        status = request.GET.get('status')
+        if status and status not in dict(OrderModel.ORDER_STATUS):
+            return JsonResponse({'error': f'Invalid status {status}'}, status=400)
+        limit = min(int(request.GET.get('limit', ORDERS_PAGE_SIZE)), MAX_ORDERS_PAGE_SIZE)
+        if limit < 1:
+            return JsonResponse({'error': 'limit must be at least 1'}, status=400)
+
+        rows, next_cursor = order_page(
+            request.user,
+            cursor=request.GET.get('cursor'),
+            status=status,
+            symbol=request.GET.get('symbol'),
+            limit=limit
+        )
+        return JsonResponse({'orders': rows, 'next_cursor': next_cursor})
+    except TradingPair.DoesNotExist:
+        return JsonResponse({'error': 'Invalid trading pair'}, status=404)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Order history retrieval failed: {str(e)}", exc_info=True)
+        return JsonResponse({'error': 'Internal server error'}, status=500)
+
+@login_required
+def trades(request, symbol):
+    try:
+        before = request.GET.get('before')
+        since = request.GET.get('since')
+        if before and since:
+            return JsonResponse({'error': 'Use either before or since'}, status=400)
+        limit = min(int(request.GET.get('limit', TRADES_PAGE_SIZE)), MAX_TRADES_PAGE_SIZE)
+        if limit < 1:
+            return JsonResponse({'error': 'limit must be at least 1'}, status=400)
+
+        rows = get_market_manager().tape.page(
+            symbol,
+            before=decode_cursor(before) if before else None,
+            since=decode_cursor(since) if since else None,
+            limit=limit
+        )
+        # Cursors for the next older page and for polling newer trades
+        oldest = min(rows, key=lambda t: (t['timestamp'], t['id']), default=None)
+        newest = max(rows, key=lambda t: (t['timestamp'], t['id']), default=None)
+        return JsonResponse({
+            'symbol': symbol,
+            'trades': rows,
+            'before': encode_cursor(oldest['timestamp'], oldest['id']) if oldest else before,
+            'since': encode_cursor(newest['timestamp'], newest['id']) if newest else since
+        })
+    except TradingPair.DoesNotExist:
+        return JsonResponse({'error': 'Invalid trading pair'}, status=404)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Trade retrieval failed: {str(e)}", exc_info=True)
+        return JsonResponse({'error': 'Internal server error'}, status=500)
+
+@login_required
+def ticker(request):
+    try:
+        return JsonResponse({'tickers': get_market_manager().get_ticker()})
+    except Exception as e:
+        logger.error(f"Ticker retrieval failed: {str(e)}", exc_info=True)
+        return JsonResponse({'error': 'Internal server error'}, status=500)
+
+@login_required
+def candles(request, symbol):
+    try:
+        start = request.GET.get('start')
+        end = request.GET.get('end')
+        rows = get_market_manager().candles.get(
+            symbol,
+            request.GET.get('interval', '1m'),
+            start=int(start) if start is not None else None,
+            end=int(end) if end is not None else None,
+            limit=int(request.GET.get('limit', MAX_CANDLES))
+        )
+        return JsonResponse({'symbol': symbol, 'candles': rows})
+    except TradingPair.DoesNotExist:
+        return JsonResponse({'error': 'Invalid trading pair'}, status=404)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    except Exception as e:
+        logger.error(f"Candle retrieval failed: {str(e)}", exc_info=True)
+        return JsonResponse({'error': 'Internal server error'}, status=500)
+
 @login_required
 @csrf_exempt
 def cancel_order(request, order_id):
     try:
         market_manager = get_market_manager()
-        with transaction.atomic():
-            order = OrderModel.objects.select_for_update().get(
-                order_id=order_id, 
-                user=request.user,
-                status=OrderStatus.NEW.name
-            )
-            
-            # Ensure orderbook exists before cancellation
-            market_manager._ensure_orderbook_exists(order.trading_pair.symbol)
-            
-            # Refund the reserved balance
-            if order.side == 'BUY':
-                required_currency = order.trading_pair.quote_currency
-                required_amount = order.price * order.quantity
-            else:
-                required_currency = order.trading_pair.base_currency
-                required_amount = order.quantity
-                
-            balance = Balance.objects.select_for_update().get(
-                user=request.user,
-                currency=required_currency
-            )
-            balance.amount += required_amount
-            balance.save()
-            
-            # Cancel in trading engine
-            trading_order = order.to_trading_order()
-            market_manager.market.cancelOrder(trading_order.getId())
-            
-            # Update order status using enum
-            order.status = OrderStatus.CANCELLED.name
-            order.save()
-            
-            return JsonResponse({'status': 'success'})
+        order = OrderModel.objects.select_related('trading_pair').get(
+            order_id=order_id, 
+            user=request.user,
+            status=OrderStatus.NEW.name
+        )
+
+        # Cancel on the matching thread; releases the unfilled part's funds
+        market_manager.cancel_order(order)
+
+        return JsonResponse({'status': 'success'})
             
     except OrderModel.DoesNotExist:
         return JsonResponse({'error': 'Order not found or already cancelled'}, status=404)
@@ -225,21 +378,15 @@ def cancel_order(request, order_id):
 @login_required
 def home(request):
     trading_pairs_data = list(TradingPair.objects.values('symbol', 'base_currency', 'quote_currency'))
-    orders_data = list(OrderModel.objects.filter(user=request.user).order_by('-created_at').values(
-        'order_id',
-        'trading_pair__symbol',
-        'side',
-        'quantity',
-        'price',
-        'status'
-    ))
+    # Older orders are fetched from the orders endpoint on demand
+    orders, next_cursor = order_page(request.user)
 
     return render(request, 'exchange/home.html', {
         'trading_pairs': TradingPair.objects.all(),  # For template iteration
         'trading_pairs_json': trading_pairs_data,    # For JavaScript
-        'orders': OrderModel.objects.filter(user=request.user).order_by('-created_at'),  # For template iteration
-        'orders_json': orders_data,                  # For JavaScript
-        'balances': Balance.objects.filter(user=request.user).order_by('currency')
+        'orders': orders,
+        'next_cursor': next_cursor,
+        'balances': get_market_manager().ledger.get_balances(request.user)
     })
     
 @login_required
@@ -249,28 +396,7 @@ def orderbook_view(request):
     
     try:
         market_manager = get_market_manager()
-        market_manager._ensure_orderbook_exists(symbol)
-        
-        with market_manager._operation_lock:
-            orderbook = market_manager.market.getOrderBook(symbol)
-            orders = orderbook.getOrders()
-            
-            bids = []
-            asks = []
-            for order in orders:
-                order_data = {
-                    'price': order.getPrice().value,
-                    'quantity': order.getQuantity()
-                }
-                if order.getSide() == Side.BUY:
-                    bids.append(order_data)
-                else:
-                    asks.append(order_data)
-                    
-            orderbook_data = {
-                'bids': sorted(bids, key=lambda x: x['price'], reverse=True),
-                'asks': sorted(asks, key=lambda x: x['price'])
-            }
+        orderbook_data, _ = market_manager.get_depth(symbol, DEFAULT_BOOK_DEPTH)
             
     except Exception:
         pass
@@ -284,12 +410,7 @@ def orderbook_view(request):
 @login_required
 def positions_view(request):
     try:
-        positions = market_manager.market.getAllPositions()
-        positions_data = [{
-            'symbol': pos.getSymbol(),
-            'quantity': pos.getQuantity(),
-            'average_price': pos.getAveragePrice().value
-        } for pos in positions]
+        positions_data = get_market_manager().get_positions(request.user)
     except Exception:
         positions_data = []
         
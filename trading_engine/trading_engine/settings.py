@@ -31,12 +31,15 @@ ALLOWED_HOSTS = []
 # Application definition
 
 INSTALLED_APPS = [
+    # Replaces runserver with an ASGI server so the WebSocket feed is served
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'channels',
     'exchange',
 ]
 
@@ -69,18 +72,66 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'trading_engine.wsgi.application'
+ASGI_APPLICATION = 'trading_engine.asgi.application'
+
+# Market data fan-out to WebSocket consumers stays within this process
+CHANNEL_LAYERS = {
+    'default': {
+        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+    },
+}
 
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# SQLite in WAL mode, so readers never block the writer or each other.
+# 'default' is the only connection that writes: its transactions begin
+# IMMEDIATE and are serialized across threads by the exchange.sqlite backend.
+# Reads outside a transaction go to 'reader' (see exchange.routers).
+# Connections persist for the life of their thread.
+SQLITE_PRAGMAS = 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL;'
+
 DATABASES = {
     'default': {
+        'ENGINE': 'exchange.sqlite',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': None,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_PRAGMAS,
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # WAL needs a file; an in-memory test database would lock whole tables
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    },
+    'reader': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'CONN_MAX_AGE': None,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': SQLITE_PRAGMAS + ' PRAGMA query_only=ON;',
+            'timeout': 20,
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
 }
 
+DATABASE_ROUTERS = ['exchange.routers.WriterRouter']
+
+# Engine recovery state: journal segments plus one snapshot per order book.
+# Set to None to run the engine without persistence.
+ENGINE_STATE_DIR = BASE_DIR / 'engine_state'
+
+# Seconds between background snapshots of every order book
+ENGINE_SNAPSHOT_INTERVAL = 60
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators